@@ -10,6 +10,16 @@ import sys
 from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 
+# Shared dashboard helpers live next to the Flask app modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from downsampling import METHOD_LTTB, downsample_entries  # noqa: E402
+from genesis import genesis_tracker  # noqa: E402
+from http_cache import conditional, register_http_cache  # noqa: E402
+from instrumentation import register_instrumentation  # noqa: E402
+from json_provider import register_json_provider  # noqa: E402
+from profiling import register_profiling_blueprint  # noqa: E402
+from timeseries import timeseries_store  # noqa: E402
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -65,6 +75,13 @@ def load_config():
             "EPHEMERY_DATA_DIR", os.path.join(config["EPHEMERY_BASE_DIR"], "data")
         ),
     )
+    config["LIGHTHOUSE_API_ENDPOINT"] = os.environ.get(
+        "LIGHTHOUSE_API_ENDPOINT",
+        config.get("LIGHTHOUSE_API_ENDPOINT", "http://localhost:5052"),
+    )
+    config["GETH_API_ENDPOINT"] = os.environ.get(
+        "GETH_API_ENDPOINT", config.get("GETH_API_ENDPOINT", "http://localhost:8545")
+    )
 
     return config
 
@@ -75,10 +92,19 @@ config = load_config()
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+register_json_provider(app)  # orjson with numpy and datetime support
+register_http_cache(app)  # ETags, conditional GETs and compression
+register_instrumentation(app, "dashboard_api")  # Route and span timings
+register_profiling_blueprint(app)  # Token-protected profiling, off by default
 
 # Configuration
 SCRIPTS_DIR = config["EPHEMERY_SCRIPTS_DIR"]
 DATA_DIR = config["EPHEMERY_DATA_DIR"]
+LIGHTHOUSE_API = config["LIGHTHOUSE_API_ENDPOINT"]
+GETH_API = config["GETH_API_ENDPOINT"]
+
+# Sync history written by sync_websocket.py to the shared time-series store
+SYNC_HISTORY_SERIES = "sync_websocket"
 
 
 # Utility functions
@@ -103,27 +129,37 @@ def run_command(command, timeout=60):
         return {"success": False, "error": str(e)}
 
 
+def fetch_client_status():
+    """Raw sync responses of both clients, None when either cannot be read
+
+    The unified server (unified_server.py) replaces this with the status of
+    its shared collector, so requests no longer poll the clients.
+    """
+    lighthouse_status = run_command(f"curl -s {LIGHTHOUSE_API}/eth/v1/node/syncing")
+    geth_status = run_command(
+        f"curl -s -X POST -H 'Content-Type: application/json' "
+        f'--data \'{{"jsonrpc":"2.0","method":"eth_syncing","params":[],"id":1}}\' '
+        f"{GETH_API}"
+    )
+    if not lighthouse_status["success"] or not geth_status["success"]:
+        return None
+    return json.loads(lighthouse_status["output"]), json.loads(geth_status["output"])
+
+
 # API Routes
 @app.route("/api/status", methods=["GET"])
 def get_status():
     """Get current sync status for both clients"""
-    lighthouse_status = run_command("curl -s http://localhost:5052/eth/v1/node/syncing")
-    geth_status = run_command(
-        'curl -s -X POST -H \'Content-Type: application/json\' --data \'{"jsonrpc":"2.0","method":"eth_syncing","params":[],"id":1}\' http://localhost:8545'
-    )
+    try:
+        status = fetch_client_status()
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing client response: {e}")
+        return jsonify({"success": False, "error": "Error parsing client response"})
 
-    if lighthouse_status["success"] and geth_status["success"]:
-        try:
-            lighthouse_data = json.loads(lighthouse_status["output"])
-            geth_data = json.loads(geth_status["output"])
-            return jsonify(
-                {"success": True, "lighthouse": lighthouse_data, "geth": geth_data}
-            )
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing client response: {e}")
-            return jsonify({"success": False, "error": "Error parsing client response"})
-    else:
+    if status is None:
         return jsonify({"success": False, "error": "Error fetching client status"})
+    lighthouse_data, geth_data = status
+    return jsonify({"success": True, "lighthouse": lighthouse_data, "geth": geth_data})
 
 
 @app.route("/api/restart/lighthouse", methods=["POST"])
@@ -194,37 +230,56 @@ def run_fix_script():
     return jsonify(result)
 
 
+@app.route("/api/genesis", methods=["GET"])
+def get_genesis():
+    """Get the current genesis and stored history iterations"""
+    return jsonify(genesis_tracker.status())
+
+
+def history_revision():
+    """Revision of the sync history a request reads"""
+    return timeseries_store.revision(SYNC_HISTORY_SERIES, request.args.get("genesis"))
+
+
 @app.route("/api/history", methods=["GET"])
+@conditional(history_revision)
 def get_history():
     """Get historical sync data with optional filtering"""
     try:
         # Get query parameters
         days = request.args.get("days", default=0, type=int)
-
-        # Load history data
-        history_file = os.path.join(DATA_DIR, "sync_history.json")
-        if not os.path.exists(history_file):
-            return (
-                jsonify({"success": False, "error": "No history data available"}),
-                404,
-            )
-
-        with open(history_file, "r") as f:
-            history_data = json.load(f)
+        max_points = request.args.get("max_points", default=0, type=int)
+        method = request.args.get("downsample", default=METHOD_LTTB)
+        genesis = request.args.get("genesis")
 
         # Filter by days if specified
+        cutoff_date = None
         if days > 0:
             from datetime import datetime, timedelta
 
             cutoff_date = datetime.now() - timedelta(days=days)
-            cutoff_str = cutoff_date.isoformat()
-            filtered_data = [
-                entry for entry in history_data if entry["timestamp"] >= cutoff_str
-            ]
-            return jsonify(filtered_data)
-
-        # Return all data if no filtering
-        return jsonify(history_data)
+
+        # Load history data of the current (or given) genesis
+        try:
+            history_data = timeseries_store.records(
+                SYNC_HISTORY_SERIES, start=cutoff_date, genesis=genesis
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        if not history_data and timeseries_store.count(SYNC_HISTORY_SERIES) == 0:
+            return (
+                jsonify({"success": False, "error": "No history data available"}),
+                404,
+            )
+
+        return jsonify(
+            downsample_entries(
+                history_data,
+                max_points,
+                method,
+                lambda entry: (entry.get("lighthouse") or {}).get("head_slot"),
+            )
+        )
 
     except Exception as e:
         logger.error(f"Error retrieving history data: {str(e)}")
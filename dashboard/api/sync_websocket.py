@@ -9,10 +9,35 @@ import signal
 import subprocess
 import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import websockets
 
+# Shared dashboard helpers live next to the Flask app modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from downsampling import METHOD_LTTB, downsample_entries  # noqa: E402
+from genesis import GENESIS_CHECK_INTERVAL, genesis_tracker  # noqa: E402
+from instrumentation import (  # noqa: E402
+    KIND_COLLECTOR,
+    KIND_SUBPROCESS,
+    instrumentation,
+)
+from profiling import (  # noqa: E402
+    PROFILING_SAMPLE_INTERVAL,
+    PROFILING_TRACEMALLOC_FRAMES,
+    ProfilerBusy,
+    ProfilerStateError,
+    authorized,
+    cpu_sampler,
+    memory_profiler,
+    profile_seconds,
+    profiling_enabled,
+    sample_interval,
+    task_stacks,
+    thread_stacks,
+)
+from timeseries import timeseries_store  # noqa: E402
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -81,33 +106,56 @@ DATA_DIR = config["EPHEMERY_DATA_DIR"]
 LIGHTHOUSE_API = config["LIGHTHOUSE_API_ENDPOINT"]
 GETH_API = config["GETH_API_ENDPOINT"]
 UPDATE_INTERVAL = 5  # seconds
-HISTORY_FILE = os.path.join(DATA_DIR, "sync_history.json")
+WEBSOCKET_PORT = 5001  # The dashboard pages connect to this port
+HISTORY_FILE = "sync_history.json"
+HISTORY_SERIES = "sync_websocket"
 MAX_HISTORY_ENTRIES = 1000  # Maximum number of entries to keep in history
 
+# Spans of the status updates go to INSTRUMENTATION_SPAN_FILE when it is set
+instrumentation.service = "sync_websocket"
+
+# Sync history is kept per genesis in the shared time-series store
+genesis_tracker.beacon_api = LIGHTHOUSE_API
+history_files = genesis_tracker.store(DATA_DIR, legacy=(HISTORY_FILE,))
+
+
+def import_history(genesis, files):
+    """Import a sync_history.json file written by earlier releases"""
+    history = json.loads(files[0][1])
+    return timeseries_store.append_many(
+        HISTORY_SERIES, ((entry["timestamp"], entry) for entry in history), genesis
+    )
+
+
+timeseries_store.migrate_files(
+    history_files, HISTORY_FILE, HISTORY_SERIES, import_history
+)
+
 # Global state
 connected_clients = set()
 current_sync_status = {"lighthouse": None, "geth": None, "timestamp": None}
 running = True
 
 
-# Signal handling for graceful shutdown
+# Signal handling for graceful shutdown, installed by main() only: the
+# unified server imports this module and keeps its own handlers
 def handle_shutdown(signum, frame):
     global running
     logger.info(f"Received signal {signum}. Shutting down...")
     running = False
 
 
-signal.signal(signal.SIGINT, handle_shutdown)
-signal.signal(signal.SIGTERM, handle_shutdown)
-
-
 # Utility functions
 async def run_command(command):
     """Run a shell command asynchronously and return the result"""
-    process = await asyncio.create_subprocess_shell(
-        command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    stdout, stderr = await process.communicate()
+    program = command.split()[0] if command.strip() else ""
+    with instrumentation.span(
+        KIND_SUBPROCESS, program, **{"process.command": command[:200]}
+    ):
+        process = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
 
     if process.returncode != 0:
         logger.error(
@@ -150,8 +198,11 @@ async def update_sync_status():
     """Fetch and update the current sync status"""
     global current_sync_status
 
-    lighthouse_status = await get_lighthouse_status()
-    geth_status = await get_geth_status()
+    with instrumentation.span(
+        KIND_COLLECTOR, "sync_status", route="collector:sync_status"
+    ):
+        lighthouse_status = await get_lighthouse_status()
+        geth_status = await get_geth_status()
 
     current_sync_status = {
         "lighthouse": lighthouse_status,
@@ -166,30 +217,37 @@ async def update_sync_status():
 
 
 async def save_to_history(status):
-    """Save current status to history file"""
+    """Save current status to the history of the current genesis"""
     try:
-        history = []
-
-        # Load existing history if available
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r") as f:
-                history = json.load(f)
-
         # Add new entry
-        history.append(status)
+        timeseries_store.append(HISTORY_SERIES, status["timestamp"], status)
 
         # Limit history size
-        if len(history) > MAX_HISTORY_ENTRIES:
-            history = history[-MAX_HISTORY_ENTRIES:]
-
-        # Save history
-        with open(HISTORY_FILE, "w") as f:
-            json.dump(history, f)
+        timeseries_store.trim(HISTORY_SERIES, MAX_HISTORY_ENTRIES)
 
     except Exception as e:
         logger.error(f"Error saving to history: {e}")
 
 
+async def publish_status(status, save=True):
+    """Make a status current and send it to all connected clients
+
+    Used by the unified server, whose shared collector replaces the polling
+    of status_updater(); only the leader process saves to the history.
+    """
+    global current_sync_status
+    current_sync_status = status
+    if save:
+        await save_to_history(status)
+    await broadcast(json.dumps(status))
+
+
+async def broadcast(message):
+    """Send a message to all connected clients"""
+    if connected_clients:
+        await asyncio.gather(*[client.send(message) for client in connected_clients])
+
+
 async def status_updater():
     """Background task to periodically update sync status"""
     while running:
@@ -197,11 +255,7 @@ async def status_updater():
             status = await update_sync_status()
 
             # Broadcast to all connected clients
-            if connected_clients:
-                websocket_message = json.dumps(status)
-                await asyncio.gather(
-                    *[client.send(websocket_message) for client in connected_clients]
-                )
+            await broadcast(json.dumps(status))
 
             # Wait for next update
             await asyncio.sleep(UPDATE_INTERVAL)
@@ -211,7 +265,18 @@ async def status_updater():
             await asyncio.sleep(UPDATE_INTERVAL)
 
 
-async def handle_client(websocket, path):
+async def genesis_watcher():
+    """Background task to detect network resets"""
+    loop = asyncio.get_running_loop()
+    while running:
+        try:
+            await loop.run_in_executor(None, genesis_tracker.check)
+        except Exception as e:
+            logger.error(f"Error checking genesis: {e}")
+        await asyncio.sleep(GENESIS_CHECK_INTERVAL)
+
+
+async def handle_client(websocket, path=None):
     """Handle a client WebSocket connection"""
     try:
         # Register client
@@ -231,7 +296,14 @@ async def handle_client(websocket, path):
                     if data["action"] == "get_history":
                         # Handle history request
                         days = data.get("days", 1)
-                        await handle_history_request(websocket, days)
+                        max_points = data.get("max_points", 0)
+                        method = data.get("downsample", METHOD_LTTB)
+                        genesis = data.get("genesis")
+                        await handle_history_request(
+                            websocket, days, max_points, method, genesis
+                        )
+                    elif data["action"].startswith("profile_"):
+                        await handle_profile_request(websocket, data)
             except json.JSONDecodeError:
                 logger.warning(f"Received invalid JSON: {message}")
 
@@ -245,20 +317,25 @@ async def handle_client(websocket, path):
         logger.info(f"Client disconnected. Remaining clients: {len(connected_clients)}")
 
 
-async def handle_history_request(websocket, days=1):
+def history_value(entry):
+    """Series used to pick representative history entries"""
+    lighthouse = (entry.get("lighthouse") or {}).get("data") or {}
+    return lighthouse.get("head_slot")
+
+
+async def handle_history_request(
+    websocket, days=1, max_points=0, method=METHOD_LTTB, genesis=None
+):
     """Handle a request for historical data"""
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r") as f:
-                history = json.load(f)
-
-            # Filter by days if needed
-            # This is a simplified filtering - in production you would use proper datetime filtering
+        cutoff = datetime.now() - timedelta(days=days)
+        history = timeseries_store.records(
+            HISTORY_SERIES, start=cutoff, genesis=genesis
+        )
+        if history:
             history_response = {
                 "action": "history_data",
-                "data": history[
-                    -min(days * 24 * 60 // UPDATE_INTERVAL, len(history)) :
-                ],
+                "data": downsample_entries(history, max_points, method, history_value),
             }
 
             await websocket.send(json.dumps(history_response))
@@ -271,28 +348,95 @@ async def handle_history_request(websocket, days=1):
         await websocket.send(json.dumps(error_response))
 
 
-async def main():
-    """Main entry point"""
-    # Initial status update
-    await update_sync_status()
+async def handle_profile_request(websocket, data):
+    """Handle a profile_* request; needs PROFILING_ENABLED and the token"""
+    action = data["action"]
+    if not profiling_enabled() or not authorized(data.get("token")):
+        await websocket.send(json.dumps({"action": "error", "message": "Unauthorized"}))
+        return
 
-    # Start background updater task
-    updater_task = asyncio.create_task(status_updater())
+    try:
+        if action == "profile_tasks":
+            result = task_stacks()
+        elif action == "profile_threads":
+            result = thread_stacks()
+        elif action == "profile_cpu":
+            # Sampled from a worker thread, so the event loop keeps running
+            # and shows up in the profile
+            result = await asyncio.get_running_loop().run_in_executor(
+                None,
+                cpu_sampler.profile,
+                profile_seconds(data.get("seconds", 10)),
+                sample_interval(data.get("interval", PROFILING_SAMPLE_INTERVAL)),
+                bool(data.get("idle", False)),
+            )
+        elif action == "profile_memory":
+            operation = data.get("operation", "snapshot")
+            if operation == "start":
+                result = memory_profiler.start(
+                    int(data.get("frames", PROFILING_TRACEMALLOC_FRAMES))
+                )
+            elif operation == "snapshot":
+                result = memory_profiler.snapshot(
+                    int(data.get("limit", 25)), data.get("group", "lineno")
+                )
+            elif operation == "stop":
+                result = memory_profiler.stop()
+            elif operation == "status":
+                result = memory_profiler.status()
+            else:
+                raise ValueError(f"Unknown memory operation: {operation}")
+        else:
+            raise ValueError(f"Unknown profile action: {action}")
+    except (ValueError, ProfilerBusy, ProfilerStateError) as e:
+        await websocket.send(json.dumps({"action": "error", "message": str(e)}))
+        return
+
+    await websocket.send(
+        json.dumps({"action": "profile_data", "profile": action, "data": result})
+    )
+
+
+async def serve(poll=True, reuse_port=False):
+    """Run the WebSocket server until shutdown
+
+    With poll the server fetches the client status and watches the genesis
+    itself; otherwise updates arrive through publish_status(). reuse_port
+    lets the worker processes of the unified server share the port.
+    """
+    tasks = []
+    if poll:
+        # Initial status update
+        await update_sync_status()
+
+        # Start background updater and reset detection tasks
+        tasks.append(asyncio.create_task(status_updater()))
+        tasks.append(asyncio.create_task(genesis_watcher()))
 
     # Start WebSocket server
-    async with websockets.serve(handle_client, "0.0.0.0", 5001):
-        logger.info("WebSocket server started on port 5001")
+    async with websockets.serve(
+        handle_client, "0.0.0.0", WEBSOCKET_PORT, reuse_port=reuse_port
+    ):
+        logger.info(f"WebSocket server started on port {WEBSOCKET_PORT}")
         # Run forever (or until interrupted)
         while running:
             await asyncio.sleep(1)
 
-    # Cancel updater task when shutting down
-    updater_task.cancel()
+    # Cancel background tasks when shutting down
+    for task in tasks:
+        task.cancel()
     try:
-        await updater_task
+        await asyncio.gather(*tasks)
     except asyncio.CancelledError:
         logger.info("Updater task cancelled")
 
 
+async def main():
+    """Main entry point"""
+    signal.signal(signal.SIGINT, handle_shutdown)
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    await serve()
+
+
 if __name__ == "__main__":
     asyncio.run(main())
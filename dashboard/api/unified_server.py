@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# unified_server.py - One process serving the dashboard app and every API
+#
+# The dashboard app (app.py), dashboard_api.py, validator_metrics_api.py and
+# sync_websocket.py each used to run as a process of their own, each polling
+# the clients and loading the histories separately. This server imports all
+# of them into one process: the HTTP routes are dispatched to the app that
+# defines them, the WebSocket server runs on an asyncio loop in a thread,
+# and the client status comes from the single sync_status collector of the
+# dashboard app.
+#
+#     python unified_server.py
+#     gunicorn --config ../app/gunicorn.conf.py unified_server:app
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.routing import RequestRedirect
+
+# Configure logging before the services do, the first configuration wins
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler("/var/log/ephemery/unified_server.log"),
+        logging.StreamHandler(sys.stdout),
+    ],
+)
+logger = logging.getLogger("unified_server")
+
+# The dashboard app and its helpers live next to this directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import app as dashboard  # noqa: E402
+import dashboard_api  # noqa: E402
+import sync_websocket  # noqa: E402
+import validator_metrics_api  # noqa: E402
+from genesis import genesis_tracker  # noqa: E402
+from ingestion import ingestion_scheduler  # noqa: E402
+from instrumentation import instrumentation  # noqa: E402
+
+# Configuration
+# Routes of the APIs stay reachable under these prefixes where the dashboard
+# app defines the same path (/api/status, /api/history, /health, ...)
+SYNC_API_PREFIX = "/sync-api"
+VALIDATOR_API_PREFIX = "/validator-api"
+SERVER_PORT = 8080
+PUBLISH_TIMEOUT = 10  # seconds
+
+# Every service registered itself; spans and histograms are per process
+instrumentation.service = "unified_server"
+
+# One set of client endpoints for the shared collector: LIGHTHOUSE_API_URL
+# and GETH_API_URL as for the dashboard app, else ephemery_paths.conf
+if "LIGHTHOUSE_API_URL" not in os.environ:
+    dashboard.LIGHTHOUSE_API = sync_websocket.LIGHTHOUSE_API
+if "GETH_API_URL" not in os.environ:
+    dashboard.GETH_API = sync_websocket.GETH_API
+genesis_tracker.beacon_api = dashboard.LIGHTHOUSE_API
+
+
+def lighthouse_response(status):
+    """Beacon node syncing response of a collected status, None if unreachable"""
+    lighthouse = status["lighthouse"]
+    if lighthouse.get("is_syncing") is None:
+        return None
+    return {"data": lighthouse}
+
+
+def geth_response(status):
+    """eth_syncing response of a collected status, None if unreachable"""
+    geth = status["geth"]
+    if geth.get("is_syncing") is None:
+        return None
+    result = False
+    if geth["is_syncing"]:
+        result = {
+            "currentBlock": hex(geth["current_block"]),
+            "highestBlock": hex(geth["highest_block"]),
+            "startingBlock": hex(geth["starting_block"]),
+        }
+    return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+
+def shared_client_status():
+    """Raw client responses for dashboard_api.py, from the shared collector"""
+    status = dashboard.latest_status
+    lighthouse, geth = lighthouse_response(status), geth_response(status)
+    if lighthouse is None or geth is None:
+        return None
+    return lighthouse, geth
+
+
+def shared_sync_data():
+    """Beacon node sync status for validator_metrics_api.py"""
+    return (lighthouse_response(dashboard.latest_status) or {}).get("data")
+
+
+# Requests of the APIs read the shared status instead of polling the clients
+dashboard_api.fetch_client_status = shared_client_status
+validator_metrics_api.fetch_sync_data = shared_sync_data
+
+# WebSocket server of sync_websocket.py, fed by the shared collector. The
+# worker processes of a gunicorn server share the port, each sending to the
+# clients connected to it
+websocket_loop = asyncio.new_event_loop()
+
+
+def run_websocket_loop():
+    """Run the event loop of the WebSocket server"""
+    asyncio.set_event_loop(websocket_loop)
+    websocket_loop.run_forever()
+
+
+def websocket_done(future):
+    """Log a WebSocket server that could not start or stopped with an error"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"WebSocket server stopped: {future.exception()}")
+
+
+def publish_status(save):
+    """Send the latest collected status to the WebSocket clients"""
+    status = dashboard.latest_status
+    message = {
+        "lighthouse": lighthouse_response(status),
+        "geth": geth_response(status),
+        "timestamp": status["timestamp"],
+    }
+    try:
+        asyncio.run_coroutine_threadsafe(
+            sync_websocket.publish_status(message, save), websocket_loop
+        ).result(PUBLISH_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error publishing sync status: {e}")
+
+
+def collect_sync_status():
+    """Collect the client status once for every service of the process"""
+    reachable = dashboard.collect_sync_status()
+    # The leader also keeps the sync_websocket history of dashboard_api.py
+    publish_status(save=True)
+    return reachable
+
+
+def follow_sync_status():
+    """Adopt the leader's status, and pass it on when it changed"""
+    previous = dashboard.latest_status["timestamp"]
+    dashboard.follow_sync_status()
+    if dashboard.latest_status["timestamp"] != previous:
+        publish_status(save=False)
+
+
+threading.Thread(target=run_websocket_loop, name="websocket-loop", daemon=True).start()
+asyncio.run_coroutine_threadsafe(
+    sync_websocket.serve(poll=False, reuse_port=True), websocket_loop
+).add_done_callback(websocket_done)
+
+# Replace the sync_status collector of the dashboard app
+ingestion_scheduler.register(
+    "sync_status",
+    collect_sync_status,
+    dashboard.SYNC_STATUS_INTERVAL,
+    max_backoff=120,
+    follow=follow_sync_status,
+)
+
+
+class RouteDispatcher:
+    """WSGI application handing each request to the first app routing it"""
+
+    def __init__(self, *apps):
+        self.apps = apps
+
+    def resolve(self, environ):
+        """The app with a rule for the path and method, else the first one
+        with a rule for the path, which answers 405, else the first one"""
+        path_only = None
+        for app in self.apps:
+            try:
+                app.url_map.bind_to_environ(environ).match()
+            except NotFound:
+                continue
+            except MethodNotAllowed:
+                if path_only is None:
+                    path_only = app
+                continue
+            except RequestRedirect:
+                pass
+            return app
+        return path_only if path_only is not None else self.apps[0]
+
+    def __call__(self, environ, start_response):
+        return self.resolve(environ)(environ, start_response)
+
+
+# The dashboard app wins shared paths, the APIs keep them under a prefix
+app = DispatcherMiddleware(
+    RouteDispatcher(dashboard.app, dashboard_api.app, validator_metrics_api.app),
+    {
+        SYNC_API_PREFIX: dashboard_api.app,
+        VALIDATOR_API_PREFIX: validator_metrics_api.app,
+    },
+)
+
+if __name__ == "__main__":
+    # Development server; production runs gunicorn with gunicorn.conf.py
+    from werkzeug.serving import run_simple
+
+    run_simple("0.0.0.0", SERVER_PORT, app, threaded=True)
@@ -10,6 +10,7 @@ import json
 import logging
 import os
 import subprocess
+import sys
 import time
 from pathlib import Path
 
@@ -17,6 +18,15 @@ import requests
 from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 
+# Shared dashboard helpers live next to the Flask app modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from genesis import genesis_tracker, split_by_genesis  # noqa: E402
+from http_cache import conditional, register_http_cache  # noqa: E402
+from instrumentation import instrumentation, register_instrumentation  # noqa: E402
+from json_provider import register_json_provider  # noqa: E402
+from profiling import register_profiling_blueprint  # noqa: E402
+from timeseries import timeseries_store, to_epoch  # noqa: E402
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -92,6 +102,10 @@ os.makedirs(METRICS_DIR, exist_ok=True)
 # Create Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+register_json_provider(app)  # orjson with numpy and datetime support
+register_http_cache(app)  # ETags, conditional GETs and compression
+register_instrumentation(app, "validator_metrics_api")  # Route and span timings
+register_profiling_blueprint(app)  # Token-protected profiling, off by default
 
 # Metrics cache to reduce filesystem reads
 metrics_cache = {
@@ -115,8 +129,63 @@ DEFAULT_ALERT_SETTINGS = {
 SETTINGS_FILE = os.path.join(METRICS_DIR, "alert_settings.json")
 VALIDATOR_DETAILS_DIR = os.path.join(METRICS_DIR, "validator_details")
 
+# Validator history is written by advanced_validator_monitoring.sh and
+# copied into the shared time-series store, which keeps it per genesis
+HISTORY_DIR = os.path.join(METRICS_DIR, "history")
+VALIDATOR_HISTORY_FILE = os.path.join(HISTORY_DIR, "validator_history.json")
+VALIDATOR_HISTORY_SERIES = "validator_history"
+# Same as HISTORY_LIMIT of advanced_validator_monitoring.sh
+VALIDATOR_HISTORY_MAX_ENTRIES = 1000
+
 # Ensure directories exist
 os.makedirs(VALIDATOR_DETAILS_DIR, exist_ok=True)
+os.makedirs(HISTORY_DIR, exist_ok=True)
+
+# Modification time of the history file when it was last ingested
+ingested_history_mtime = None
+
+
+def ingest_validator_history():
+    """Copy new entries of the current genesis from the history file into the
+    store, keeping the newest VALIDATOR_HISTORY_MAX_ENTRIES"""
+    global ingested_history_mtime
+    try:
+        mtime = os.stat(VALIDATOR_HISTORY_FILE).st_mtime
+    except OSError:
+        logger.warning(f"History file not found at {VALIDATOR_HISTORY_FILE}")
+        return
+    if mtime == ingested_history_mtime:
+        return
+
+    try:
+        with instrumentation.file_span("load", VALIDATOR_HISTORY_FILE), open(
+            VALIDATOR_HISTORY_FILE, "r"
+        ) as f:
+            history = json.load(f)
+        if not isinstance(history, list):
+            return
+        # Entries from before a reset belong to the previous network
+        since = split_by_genesis(history, genesis_tracker.current)[1]
+        # The script rewrites the whole file, only store what is new
+        genesis = timeseries_store.key()
+        newest = timeseries_store.range(
+            VALIDATOR_HISTORY_SERIES, limit=1, genesis=genesis
+        )
+        if newest:
+            since = [
+                entry for entry in since if to_epoch(entry["timestamp"]) > newest[0][0]
+            ]
+        if timeseries_store.append_many(
+            VALIDATOR_HISTORY_SERIES,
+            ((entry["timestamp"], entry) for entry in since),
+            genesis,
+        ):
+            timeseries_store.trim(
+                VALIDATOR_HISTORY_SERIES, VALIDATOR_HISTORY_MAX_ENTRIES, genesis
+            )
+        ingested_history_mtime = mtime
+    except Exception as e:
+        logger.exception(f"Error reading history file: {e}")
 
 
 # Load alert settings from file or use defaults
@@ -124,7 +193,9 @@ def load_alert_settings():
     """Load alert settings from file or use defaults."""
     if os.path.exists(SETTINGS_FILE):
         try:
-            with open(SETTINGS_FILE, "r") as f:
+            with instrumentation.file_span("load", SETTINGS_FILE), open(
+                SETTINGS_FILE, "r"
+            ) as f:
                 return json.load(f)
         except Exception as e:
             logger.error(f"Error loading alert settings: {e}")
@@ -135,7 +206,9 @@ def load_alert_settings():
 def save_alert_settings(settings):
     """Save alert settings to file."""
     try:
-        with open(SETTINGS_FILE, "w") as f:
+        with instrumentation.file_span("save", SETTINGS_FILE), open(
+            SETTINGS_FILE, "w"
+        ) as f:
             json.dump(settings, f, indent=2)
         return True
     except Exception as e:
@@ -212,7 +285,9 @@ def get_validator_metrics():
 
     # Read metrics from file
     try:
-        with open(metrics_file, "r") as f:
+        with instrumentation.file_span("load", metrics_file), open(
+            metrics_file, "r"
+        ) as f:
             metrics = json.load(f)
 
         # Update the cache
@@ -225,22 +300,18 @@ def get_validator_metrics():
         return None
 
 
-def get_validator_history():
-    """Get historical validator metrics."""
-    history_file = os.path.join(METRICS_DIR, "history/validator_history.json")
+def get_validator_history(genesis=None):
+    """Get historical validator metrics of the current (or given) genesis."""
+    ingest_validator_history()
+    return timeseries_store.records(VALIDATOR_HISTORY_SERIES, genesis=genesis)
 
-    if not os.path.exists(history_file):
-        logger.warning(f"History file not found at {history_file}")
-        # Return empty history
-        return []
 
-    try:
-        with open(history_file, "r") as f:
-            history = json.load(f)
-        return history
-    except Exception as e:
-        logger.exception(f"Error reading history file: {e}")
-        return []
+def validator_history_revision():
+    """Revision of the validator history a request reads."""
+    ingest_validator_history()
+    return timeseries_store.revision(
+        VALIDATOR_HISTORY_SERIES, request.args.get("genesis")
+    )
 
 
 def get_validator_alerts():
@@ -258,7 +329,9 @@ def get_validator_alerts():
 
         # Only read the 10 most recent alerts
         for file_path in list(alert_files)[:10]:
-            with open(file_path, "r") as f:
+            with instrumentation.file_span("load", file_path), open(
+                file_path, "r"
+            ) as f:
                 alert = json.load(f)
                 alerts.append(alert)
 
@@ -340,7 +413,9 @@ def get_validator_details(validator_index):
 
     if os.path.exists(detail_file):
         try:
-            with open(detail_file, "r") as f:
+            with instrumentation.file_span("load", detail_file), open(
+                detail_file, "r"
+            ) as f:
                 details = json.load(f)
 
             # Check if details are fresh enough (less than 1 hour old)
@@ -366,12 +441,14 @@ def get_validator_details(validator_index):
         validator_data = response.json().get("data", {})
 
         # Get performance history if available
-        history_file = os.path.join(METRICS_DIR, "history", "validator_history.json")
+        history_file = VALIDATOR_HISTORY_FILE
         balance_history = []
 
         if os.path.exists(history_file):
             try:
-                with open(history_file, "r") as f:
+                with instrumentation.file_span("load", history_file), open(
+                    history_file, "r"
+                ) as f:
                     history = json.load(f)
                     # Filter for this validator if individual data is available
                     if (
@@ -408,7 +485,9 @@ def get_validator_details(validator_index):
 
         # Cache the details
         try:
-            with open(detail_file, "w") as f:
+            with instrumentation.file_span("save", detail_file), open(
+                detail_file, "w"
+            ) as f:
                 json.dump(details, f, indent=2)
         except Exception as e:
             logger.error(f"Error caching validator details: {e}")
@@ -419,6 +498,18 @@ def get_validator_details(validator_index):
         return None
 
 
+def fetch_sync_data():
+    """Beacon node sync status, None when the node does not answer
+
+    The unified server (unified_server.py) replaces this with the status of
+    its shared collector.
+    """
+    response = requests.get(f"{BEACON_ENDPOINT}/eth/v1/node/syncing", timeout=5)
+    if response.status_code != 200:
+        return None
+    return response.json().get("data", {})
+
+
 def generate_performance_metrics():
     """Generate advanced performance metrics for validators."""
     try:
@@ -429,9 +520,8 @@ def generate_performance_metrics():
 
         # Get beacon node sync status
         try:
-            response = requests.get(f"{BEACON_ENDPOINT}/eth/v1/node/syncing", timeout=5)
-            if response.status_code == 200:
-                sync_data = response.json().get("data", {})
+            sync_data = fetch_sync_data()
+            if sync_data is not None:
                 head_slot = int(sync_data.get("head_slot", 0))
                 sync_distance = int(sync_data.get("sync_distance", 0))
             else:
@@ -496,9 +586,13 @@ def api_advanced_metrics():
 
 
 @app.route("/api/history", methods=["GET"])
+@conditional(validator_history_revision)
 def api_history():
     """API endpoint to get historical validator metrics."""
-    history = get_validator_history()
+    try:
+        history = get_validator_history(request.args.get("genesis"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(history)
 
 
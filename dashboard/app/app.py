@@ -8,12 +8,21 @@ import os
 import time
 
 import requests
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from downsampling import METHOD_LTTB, downsample_entries
 from flask import Flask, jsonify, render_template, request
-
-# Import Obol SquadStaking module
+from genesis import GENESIS_CHECK_INTERVAL, genesis_tracker
+from http_cache import conditional, register_http_cache
+from ingestion import ingestion_scheduler
+from instrumentation import register_instrumentation
+from json_provider import register_json_provider
+from lazy import LazyObject
+
+# Import Obol SquadStaking and Lido CSM modules
 from obol_integration import register_obol_blueprint
+from profiling import register_profiling_blueprint
+from profitability_calculator import register_profitability_blueprint
+from queue_monitoring import register_queue_blueprint
+from timeseries import timeseries_store
 
 # Configure logging
 logging.basicConfig(
@@ -23,24 +32,60 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Fast JSON encoding, ETags, conditional GETs and compression for every
+# route and blueprint, and route and span timings on /metrics
+register_json_provider(app)
+register_http_cache(app)
+register_instrumentation(app, "dashboard")
+
 # Register Obol SquadStaking blueprint
 register_obol_blueprint(app)
 
+# Register Lido CSM blueprints
+register_queue_blueprint(app)
+register_profitability_blueprint(app)
+
+# On-demand profiling, only when PROFILING_ENABLED and PROFILING_TOKEN are set
+register_profiling_blueprint(app)
+
 # Configuration
 LIGHTHOUSE_API = os.environ.get(
     "LIGHTHOUSE_API_URL", "http://host.docker.internal:5052"
 )
 GETH_API = os.environ.get("GETH_API_URL", "http://host.docker.internal:8545")
 DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+SYNC_STATUS_INTERVAL = int(os.environ.get("SYNC_STATUS_INTERVAL", "15"))
+SYNC_HISTORY_INTERVAL = 300  # 5 minutes
+SYNC_HISTORY_SERIES = "sync_history"
+# Shared with the other worker processes of a production server
+SYNC_STATUS_META = "sync_status:latest"
+GENESIS_META = "genesis:current"
+SYNC_HISTORY_MAX_ENTRIES = 1000
+
+SYNC_HISTORY_FILE = "sync_history.json"
+
+
+def import_sync_history(genesis, files):
+    """Import a sync_history.json file into the time-series store"""
+    history = json.loads(files[0][1])
+    return timeseries_store.append_many(
+        SYNC_HISTORY_SERIES, ((entry["timestamp"], entry) for entry in history), genesis
+    )
+
 
-# Ensure data directory exists
-os.makedirs(DATA_DIR, exist_ok=True)
-SYNC_HISTORY_FILE = os.path.join(DATA_DIR, "sync_history.json")
+def open_sync_history_files():
+    """Genesis store of DATA_DIR, importing the sync history files written by
+    earlier releases once; only the leader migrates"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    files = genesis_tracker.store(DATA_DIR, legacy=(SYNC_HISTORY_FILE,))
+    timeseries_store.migrate_files(
+        files, SYNC_HISTORY_FILE, SYNC_HISTORY_SERIES, import_sync_history
+    )
+    return files
 
-# Initialize sync history if it doesn't exist
-if not os.path.exists(SYNC_HISTORY_FILE):
-    with open(SYNC_HISTORY_FILE, "w") as f:
-        json.dump([], f)
+
+# Sync history files, opened on first use or by the warmup below
+sync_history_files = LazyObject(open_sync_history_files, "sync_history_files")
 
 
 def get_lighthouse_status():
@@ -119,38 +164,101 @@ def get_geth_status():
         }
 
 
+# Latest client status, replaced as a whole by the sync_status collector
+latest_status = {
+    "lighthouse": {
+        "is_syncing": None,
+        "head_slot": "Unknown",
+        "sync_distance": "Unknown",
+    },
+    "geth": {
+        "is_syncing": None,
+        "current_block": "Unknown",
+        "highest_block": "Unknown",
+        "starting_block": "Unknown",
+    },
+    "timestamp": None,
+}
+
+
+def collect_sync_status():
+    """Fetch the current client status, False when neither client answers"""
+    global latest_status
+    lighthouse_status = get_lighthouse_status()
+    geth_status = get_geth_status()
+
+    latest_status = {
+        "lighthouse": lighthouse_status.get("data", {}),
+        "geth": geth_status,
+        "timestamp": datetime.datetime.now().isoformat(),
+    }
+    try:
+        timeseries_store.set_meta(SYNC_STATUS_META, json.dumps(latest_status))
+    except Exception as e:
+        logger.error(f"Error sharing sync status: {str(e)}")
+    return (
+        latest_status["lighthouse"].get("is_syncing") is not None
+        or geth_status.get("is_syncing") is not None
+    )
+
+
+def check_genesis():
+    """Scheduled genesis check, shares the result with the other workers"""
+    reachable = genesis_tracker.check()
+    genesis = genesis_tracker.current
+    if genesis is not None:
+        timeseries_store.set_meta(GENESIS_META, str(genesis))
+    return reachable
+
+
+def follow_genesis():
+    """Adopt the genesis the leader process detected, rolling over on resets"""
+    stored = timeseries_store.get_meta(GENESIS_META)
+    if stored is not None:
+        genesis_tracker.update(int(stored), "leader")
+
+
+def follow_sync_status():
+    """Adopt the status the leader process collected last"""
+    global latest_status
+    stored = timeseries_store.get_meta(SYNC_STATUS_META)
+    if stored is not None:
+        latest_status = json.loads(stored)
+
+
+def sync_history_value(entry):
+    """Series used to pick representative sync history entries"""
+    return (entry.get("lighthouse") or {}).get("head_slot")
+
+
 def update_sync_history():
-    """Update sync history with current status"""
+    """Update sync history with the latest collected status"""
     try:
-        lighthouse_status = get_lighthouse_status()
-        geth_status = get_geth_status()
+        status = latest_status
+        if status["timestamp"] is None:
+            # No status collected yet
+            return False
 
         timestamp = datetime.datetime.now().isoformat()
 
-        # Load existing history
-        with open(SYNC_HISTORY_FILE, "r") as f:
-            history = json.load(f)
-
-        # Add new entry
-        history.append(
+        # Add new entry to the current genesis
+        timeseries_store.append(
+            SYNC_HISTORY_SERIES,
+            timestamp,
             {
                 "timestamp": timestamp,
-                "lighthouse": lighthouse_status.get("data", {}),
-                "geth": geth_status,
-            }
+                "lighthouse": status["lighthouse"],
+                "geth": status["geth"],
+            },
         )
 
-        # Keep only last 1000 entries to prevent file from growing too large
-        if len(history) > 1000:
-            history = history[-1000:]
-
-        # Save updated history
-        with open(SYNC_HISTORY_FILE, "w") as f:
-            json.dump(history, f)
+        # Keep only the last entries to bound the history
+        timeseries_store.trim(SYNC_HISTORY_SERIES, SYNC_HISTORY_MAX_ENTRIES)
 
         logger.info(f"Updated sync history at {timestamp}")
     except Exception as e:
         logger.error(f"Error updating sync history: {str(e)}")
+        return False
 
 
 # Routes
@@ -166,43 +274,66 @@ def history_page():
     return render_template("history.html")
 
 
+@app.route("/health")
+def health():
+    """Liveness endpoint, answers before any data has been loaded"""
+    return jsonify({"status": "ok", "timestamp": datetime.datetime.now().isoformat()})
+
+
 @app.route("/api/status")
 def status():
     """API endpoint for current status"""
-    lighthouse_status = get_lighthouse_status()
-    geth_status = get_geth_status()
+    return jsonify(latest_status)
 
-    return jsonify(
-        {
-            "lighthouse": lighthouse_status.get("data", {}),
-            "geth": geth_status,
-            "timestamp": datetime.datetime.now().isoformat(),
-        }
-    )
+
+@app.route("/api/ingestion")
+def ingestion_stats():
+    """API endpoint for background collector statistics"""
+    return jsonify(ingestion_scheduler.stats())
+
+
+@app.route("/api/genesis")
+def genesis():
+    """API endpoint for the current genesis and stored iterations"""
+    return jsonify(genesis_tracker.status())
+
+
+def sync_history_revision():
+    """Revision of the sync history a request reads"""
+    # Until the warmup is done, wait for the files of earlier releases
+    sync_history_files.get()
+    return timeseries_store.revision(SYNC_HISTORY_SERIES, request.args.get("genesis"))
 
 
 @app.route("/api/history")
+@conditional(sync_history_revision)
 def history():
     """API endpoint for sync history"""
     try:
         # Optional parameters for filtering
         limit = request.args.get("limit", 100, type=int)
         days = request.args.get("days", 0, type=int)
-
-        with open(SYNC_HISTORY_FILE, "r") as f:
-            full_history = json.load(f)
+        max_points = request.args.get("max_points", 0, type=int)
+        method = request.args.get("downsample", METHOD_LTTB)
+        genesis = request.args.get("genesis")
 
         # Filter by days if specified
         if days > 0:
             cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
-            cutoff_str = cutoff_date.isoformat()
-            filtered_history = [
-                entry for entry in full_history if entry["timestamp"] >= cutoff_str
-            ]
-            return jsonify(filtered_history)
-
-        # Return the most recent entries
-        return jsonify(full_history[-limit:])
+            filtered_history = timeseries_store.records(
+                SYNC_HISTORY_SERIES, start=cutoff_date, genesis=genesis
+            )
+        else:
+            # Return the most recent entries
+            filtered_history = timeseries_store.records(
+                SYNC_HISTORY_SERIES, limit=limit, genesis=genesis
+            )
+
+        return jsonify(
+            downsample_entries(filtered_history, max_points, method, sync_history_value)
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         logger.error(f"Error retrieving sync history: {str(e)}")
         return jsonify([])
@@ -213,8 +344,9 @@ def metrics():
     """Metrics endpoint for Prometheus scraping"""
     try:
         # Get the latest status
-        lighthouse_status = get_lighthouse_status()
-        geth_status = get_geth_status()
+        status = latest_status
+        lighthouse_status = {"data": status["lighthouse"]}
+        geth_status = status["geth"]
 
         # Build metrics output
         lines = []
@@ -269,28 +401,46 @@ def metrics():
         else:
             lines.append("geth_highest_block 0")
 
+        # Background collector metrics
+        lines.extend(ingestion_scheduler.prometheus_lines())
+
         return "\n".join(lines), 200, {"Content-Type": "text/plain"}
     except Exception as e:
         logger.error(f"Error generating metrics: {str(e)}")
         return "# Error generating metrics", 500, {"Content-Type": "text/plain"}
 
 
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=update_sync_history,
-    trigger=IntervalTrigger(minutes=5),
-    id="update_sync_history",
-    name="Update sync history every 5 minutes",
-    replace_existing=True,
+# Detect network resets, histories roll over to a new genesis partition
+ingestion_scheduler.register(
+    "genesis",
+    check_genesis,
+    GENESIS_CHECK_INTERVAL,
+    max_backoff=600,
+    follow=follow_genesis,
+)
+
+# Schedule sync status collection, requests only read the latest result
+ingestion_scheduler.register(
+    "sync_status",
+    collect_sync_status,
+    SYNC_STATUS_INTERVAL,
+    max_backoff=120,
+    follow=follow_sync_status,
 )
+ingestion_scheduler.register(
+    "sync_history", update_sync_history, SYNC_HISTORY_INTERVAL, run_on_start=False
+)
+
+# Migrate the sync history files in the background, like the blueprints'
+# histories, so importing the app does no file I/O
+sync_history_files.warmup()
 
 # Start the scheduler
-scheduler.start()
+ingestion_scheduler.start()
 
 if __name__ == "__main__":
-    # Update sync history on startup
-    update_sync_history()
-
-    # Start the Flask app
-    app.run(host="0.0.0.0", port=8080, debug=True)
+    # Development server; production runs gunicorn with gunicorn.conf.py.
+    # The reloader would import this module, and start the collectors, in a
+    # second process
+    debug = os.environ.get("FLASK_DEBUG", "false").lower() in ("1", "true")
+    app.run(host="0.0.0.0", port=8080, debug=debug, use_reloader=False)
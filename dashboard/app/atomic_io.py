@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Atomic File Writes for the Ephemery Dashboard
+Files are written to a temporary file in the same directory and renamed
+over the target, so readers (and a crash mid-write) only ever see the old
+or the new complete file, never a partially written one.
+"""
+
+import contextlib
+import json
+import os
+import stat
+import tempfile
+from typing import IO, Any, Iterator, Optional
+
+from instrumentation import instrumentation
+
+# Mode for newly created files, matching open() with the usual 022 umask
+DEFAULT_FILE_MODE = 0o644
+
+
+@contextlib.contextmanager
+def atomic_write(
+    path: str, mode: str = "w", newline: Optional[str] = None
+) -> Iterator[IO[Any]]:
+    """Open a temporary file that replaces `path` when the block succeeds"""
+    with instrumentation.file_span("save", path):
+        with _atomic_write(path, mode, newline) as f:
+            yield f
+
+
+@contextlib.contextmanager
+def _atomic_write(path: str, mode: str, newline: Optional[str]) -> Iterator[IO[Any]]:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    # Keep the permissions of the file being replaced
+    try:
+        file_mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        file_mode = DEFAULT_FILE_MODE
+
+    try:
+        kwargs = {} if "b" in mode else {"newline": newline}
+        with os.fdopen(fd, mode, **kwargs) as f:
+            os.chmod(tmp_path, file_mode)
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_json_atomic(path: str, data: Any, **kwargs: Any) -> None:
+    """Serialize `data` as JSON and atomically replace `path`"""
+    with atomic_write(path) as f:
+        json.dump(data, f, **kwargs)
+
+
+def write_csv_atomic(frame: Any, path: str, **kwargs: Any) -> None:
+    """Write a DataFrame as CSV and atomically replace `path`"""
+    with atomic_write(path, newline="") as f:
+        frame.to_csv(f, **kwargs)
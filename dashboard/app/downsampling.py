@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Downsampling helpers for the dashboard history endpoints
+Reduces long histories to roughly the number of points a chart can draw,
+either with time-bucket aggregates or Largest-Triangle-Three-Buckets (LTTB)
+decimation. All heavy lifting is done with NumPy.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+
+from lazy import lazy_import
+
+# Heavy dependencies are imported on first use to keep startup fast
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+# Supported downsampling methods
+METHOD_LTTB = "lttb"
+METHOD_BUCKET = "bucket"
+METHODS = (METHOD_LTTB, METHOD_BUCKET)
+
+
+def timestamps_to_seconds(values: Any) -> np.ndarray:
+    """Convert ISO strings or datetime-like values to float epoch seconds"""
+    array = np.asarray(values, dtype="datetime64[ms]")
+    return array.astype(np.int64) / 1000.0
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Select `threshold` point indices with Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if threshold >= n or n < 3:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])[:threshold]
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Missing values would poison the triangle areas, use the mean instead
+    missing = np.isnan(y)
+    if missing.any():
+        y = np.where(missing, np.nanmean(y) if not missing.all() else 0.0, y)
+
+    # First and last points are always kept, the rest is split evenly
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket == threshold - 3:
+            next_x, next_y = x[-1], y[-1]
+        else:
+            next_end = edges[bucket + 2]
+            next_x = x[end:next_end].mean()
+            next_y = y[end:next_end].mean()
+
+        # Pick the point forming the largest triangle with the previously
+        # selected point and the average of the next bucket
+        area = np.abs(
+            (x[anchor] - next_x) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (next_y - y[anchor])
+        )
+        anchor = start + int(np.argmax(area))
+        selected[bucket + 1] = anchor
+
+    return selected
+
+
+def bucket_ids(x: np.ndarray, buckets: int) -> np.ndarray:
+    """Assign each point to one of `buckets` equal-width time buckets"""
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.int64)
+    span = x[-1] - x[0]
+    if span <= 0:
+        return np.zeros(len(x), dtype=np.int64)
+    ids = ((x - x[0]) / span * buckets).astype(np.int64)
+    return np.minimum(ids, buckets - 1)
+
+
+def bucket_last_indices(x: np.ndarray, buckets: int) -> np.ndarray:
+    """Index of the most recent point in every non-empty time bucket"""
+    ids = bucket_ids(x, buckets)
+    if len(ids) == 0:
+        return np.arange(0)
+    return np.flatnonzero(np.diff(ids, append=ids[-1] + 1))
+
+
+def downsample_frame(
+    frame: pd.DataFrame,
+    max_points: int,
+    method: str = METHOD_LTTB,
+    value_column: Optional[str] = None,
+    time_column: str = "timestamp",
+) -> pd.DataFrame:
+    """Reduce a time-sorted frame to at most `max_points` rows.
+
+    ``lttb`` keeps the original rows that best preserve the shape of
+    `value_column`; ``bucket`` returns the mean of every time bucket.
+    """
+    if max_points <= 0 or len(frame) <= max_points:
+        return frame
+
+    x = timestamps_to_seconds(frame[time_column].to_numpy())
+    if method == METHOD_BUCKET:
+        ids = bucket_ids(x, max_points)
+        return frame.groupby(ids).mean(numeric_only=False).reset_index(drop=True)
+
+    column = value_column or frame.columns.drop(time_column)[0]
+    y = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=float)
+    return frame.iloc[lttb_indices(x, y, max_points)]
+
+
+def downsample_entries(
+    entries: List[Dict[str, Any]],
+    max_points: int,
+    method: str = METHOD_LTTB,
+    value: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    time_key: str = "timestamp",
+) -> List[Dict[str, Any]]:
+    """Reduce a time-sorted list of JSON history entries to `max_points`.
+
+    Entries are nested documents that cannot be averaged, so ``bucket``
+    keeps the most recent entry of each time bucket. ``lttb`` uses `value`
+    to extract the series whose shape should be preserved.
+    """
+    if max_points <= 0 or len(entries) <= max_points:
+        return entries
+
+    x = timestamps_to_seconds([entry[time_key] for entry in entries])
+    if method == METHOD_BUCKET or value is None:
+        indices = bucket_last_indices(x, max_points)
+    else:
+        y = pd.to_numeric(
+            pd.Series([value(entry) for entry in entries], dtype=object),
+            errors="coerce",
+        ).to_numpy(dtype=float)
+        indices = lttb_indices(x, y, max_points)
+
+    return [entries[i] for i in indices]
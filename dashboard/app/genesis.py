@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Genesis-Aware History Partitioning for the Ephemery Dashboard
+Ephemery resets to a new genesis periodically. Histories are stored in one
+partition per iteration (``<data dir>/genesis-<genesis_time>/``) so queries
+only ever see the current network by default, a reset rolls every history
+over instantly, and prior iterations are compacted into tar.gz archives.
+"""
+
+import datetime
+import fnmatch
+import logging
+import os
+import shutil
+import tarfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from atomic_io import atomic_write
+from instrumentation import instrumentation
+from leader import is_leader
+
+logger = logging.getLogger(__name__)
+
+# Constants
+GENESIS_BEACON_API = os.environ.get(
+    "GENESIS_BEACON_API",
+    os.environ.get("BEACON_API_ENDPOINT", "http://localhost:5052"),
+)
+# Written by scripts/core/ephemery_reset_handler.sh, only ever read here
+GENESIS_TIME_FILE = os.environ.get(
+    "GENESIS_TIME_FILE",
+    os.path.join(
+        os.environ.get("EPHEMERY_DATA_DIR", "/opt/ephemery/data"), "last_genesis_time"
+    ),
+)
+GENESIS_CHECK_INTERVAL = int(os.environ.get("GENESIS_CHECK_INTERVAL", "60"))
+GENESIS_ARCHIVE_KEEP = int(os.environ.get("GENESIS_ARCHIVE_KEEP", "10"))
+GENESIS_PARTITIONING = os.environ.get("GENESIS_PARTITIONING", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+GENESIS_REQUEST_TIMEOUT = 5
+
+PARTITION_PREFIX = "genesis-"
+ARCHIVE_DIR = "archive"
+ARCHIVE_SUFFIX = ".tar.gz"
+# Partition for data collected before the genesis is known
+UNKNOWN_GENESIS = "unknown"
+# Partition for files written before partitioning existed
+LEGACY_GENESIS = "legacy"
+
+
+def parse_genesis_time(value: Any) -> Optional[int]:
+    """Genesis time as unix seconds, from seconds or an ISO-8601 timestamp"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text in ("0", "null"):
+        return None
+    try:
+        return int(float(text))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        logger.warning(f"Unrecognized genesis time: {text}")
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+def genesis_key(genesis: Optional[Any]) -> str:
+    """Validated partition key for a genesis time or special iteration name"""
+    if genesis is None:
+        return UNKNOWN_GENESIS
+    key = str(genesis)
+    # Keys end up in paths, so only accept what partitions are named by
+    if not key.isdigit() and key not in (UNKNOWN_GENESIS, LEGACY_GENESIS):
+        raise ValueError(f"Invalid genesis: {key}")
+    return key
+
+
+def split_by_genesis(
+    entries: List[Dict[str, Any]], genesis: Optional[int], field: str = "timestamp"
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split entries with ISO-8601 timestamps into (before, since) a genesis"""
+    if genesis is None:
+        return [], list(entries)
+    before, since = [], []
+    for entry in entries:
+        timestamp = parse_genesis_time(entry.get(field))
+        (before if timestamp is not None and timestamp < genesis else since).append(
+            entry
+        )
+    return before, since
+
+
+class GenesisStore:
+    """Genesis partitions of one data directory.
+
+    Only one process should own a directory (``owner=True``): the owner
+    migrates legacy files and archives prior iterations, while other
+    processes only read from it. Of several worker processes serving the
+    same app, only the leader owns its directories.
+    """
+
+    def __init__(
+        self,
+        tracker: "GenesisTracker",
+        base_dir: str,
+        legacy: Tuple[str, ...] = (),
+        owner: bool = True,
+        keep: int = GENESIS_ARCHIVE_KEEP,
+    ):
+        self.tracker = tracker
+        self.base_dir = base_dir
+        self.legacy = legacy
+        self._owner = owner
+        self.keep = keep
+        self._lock = threading.Lock()
+        if self.owner:
+            self.migrate_legacy()
+
+    @property
+    def owner(self) -> bool:
+        """Whether this process maintains the directory"""
+        return self._owner and is_leader()
+
+    @property
+    def location(self) -> str:
+        """Where this store keeps its iterations"""
+        return os.path.abspath(self.base_dir)
+
+    def key(self, genesis: Optional[Any] = None) -> str:
+        """Partition key for a genesis, the current one by default"""
+        if genesis is None:
+            genesis = self.tracker.current
+        if genesis is None and not self.owner:
+            # Readers follow the newest iteration their writer has started
+            genesis = self.latest_key()
+        return genesis_key(genesis)
+
+    def directory(self, genesis: Optional[Any] = None, create: bool = True) -> str:
+        """Directory holding one iteration's files"""
+        if not GENESIS_PARTITIONING:
+            return self.base_dir
+        path = os.path.join(self.base_dir, f"{PARTITION_PREFIX}{self.key(genesis)}")
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    def latest_key(self) -> Optional[str]:
+        """Newest live genesis partition, if any"""
+        if not os.path.isdir(self.base_dir):
+            return None
+        keys = [
+            entry.name[len(PARTITION_PREFIX) :]
+            for entry in os.scandir(self.base_dir)
+            if entry.is_dir() and entry.name.startswith(PARTITION_PREFIX)
+        ]
+        keys = [key for key in keys if key.isdigit()]
+        return max(keys, key=int) if keys else None
+
+    def path(self, name: str, genesis: Optional[Any] = None) -> str:
+        """Path of a history file in the current (or given) iteration"""
+        return os.path.join(self.directory(genesis), name)
+
+    def archive_path(self, key: str) -> str:
+        """Path of the compacted archive of a prior iteration"""
+        return os.path.join(
+            self.base_dir, ARCHIVE_DIR, f"{PARTITION_PREFIX}{key}{ARCHIVE_SUFFIX}"
+        )
+
+    def iterations(self) -> List[Dict[str, Any]]:
+        """Every stored iteration, live partitions and archives"""
+        found: Dict[str, Dict[str, Any]] = {}
+        archive_dir = os.path.join(self.base_dir, ARCHIVE_DIR)
+        if os.path.isdir(archive_dir):
+            for entry in os.scandir(archive_dir):
+                name = entry.name
+                if name.startswith(PARTITION_PREFIX) and name.endswith(ARCHIVE_SUFFIX):
+                    key = name[len(PARTITION_PREFIX) : -len(ARCHIVE_SUFFIX)]
+                    found[key] = {
+                        "genesis": key,
+                        "archived": True,
+                        "size_bytes": entry.stat().st_size,
+                    }
+        if os.path.isdir(self.base_dir):
+            for entry in os.scandir(self.base_dir):
+                if entry.is_dir() and entry.name.startswith(PARTITION_PREFIX):
+                    key = entry.name[len(PARTITION_PREFIX) :]
+                    found[key] = {"genesis": key, "archived": False, "size_bytes": None}
+
+        current = self.key()
+        for key, info in found.items():
+            info["current"] = key == current
+        return sorted(found.values(), key=lambda info: info["genesis"])
+
+    def read_files(
+        self, pattern: str, genesis: Optional[Any] = None
+    ) -> List[Tuple[str, bytes]]:
+        """Read (name, content) of files matching `pattern` in one iteration,
+        from its live partition or its archive"""
+        key = self.key(genesis)
+        directory = self.directory(key, create=False)
+        if os.path.isdir(directory):
+            files = []
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, directory)
+                    if fnmatch.fnmatch(relative, pattern):
+                        with instrumentation.file_span("load", path), open(
+                            path, "rb"
+                        ) as f:
+                            files.append((relative, f.read()))
+            return sorted(files)
+
+        archive = self.archive_path(key)
+        if not os.path.exists(archive):
+            return []
+        files = []
+        with tarfile.open(archive, "r:gz") as tar:
+            for member in tar.getmembers():
+                if member.isfile() and fnmatch.fnmatch(member.name, pattern):
+                    files.append((member.name, tar.extractfile(member).read()))
+        return sorted(files)
+
+    def read(self, name: str, genesis: Optional[Any] = None) -> Optional[bytes]:
+        """Read one file of an iteration, None if it does not exist"""
+        files = self.read_files(name, genesis)
+        return files[0][1] if files else None
+
+    def migrate_legacy(self) -> None:
+        """Move unpartitioned files from older releases into their own iteration"""
+        if not GENESIS_PARTITIONING:
+            return
+        present = [
+            name
+            for name in self.legacy
+            if os.path.exists(os.path.join(self.base_dir, name))
+        ]
+        if not present:
+            return
+
+        # Legacy files may mix several iterations, keep them apart; the
+        # time-series store splits their samples by timestamp on import
+        target = self.directory(LEGACY_GENESIS)
+        for name in present:
+            try:
+                shutil.move(
+                    os.path.join(self.base_dir, name), os.path.join(target, name)
+                )
+            except OSError as e:
+                logger.error(f"Error migrating {name} in {self.base_dir}: {e}")
+        logger.info(f"Moved legacy history {present} to {target}")
+
+    def adopt_unknown(self, genesis: Any) -> None:
+        """Move data collected before the genesis was known into its partition"""
+        source = self.directory(UNKNOWN_GENESIS, create=False)
+        if not GENESIS_PARTITIONING or not os.path.isdir(source):
+            return
+
+        target = self.directory(genesis)
+        for name in os.listdir(source):
+            destination = os.path.join(target, name)
+            if os.path.exists(destination):
+                logger.warning(f"Not adopting {name}, {destination} exists")
+                continue
+            shutil.move(os.path.join(source, name), destination)
+        shutil.rmtree(source, ignore_errors=True)
+
+    def archive_previous(self) -> int:
+        """Compact every non-current iteration into a tar.gz archive and prune
+        archives beyond `keep`, returning the number of iterations archived"""
+        if not GENESIS_PARTITIONING or not os.path.isdir(self.base_dir):
+            return 0
+
+        with self._lock:
+            current = self.key()
+            archived = 0
+            for entry in list(os.scandir(self.base_dir)):
+                if not entry.is_dir() or not entry.name.startswith(PARTITION_PREFIX):
+                    continue
+                key = entry.name[len(PARTITION_PREFIX) :]
+                if key in (current, UNKNOWN_GENESIS):
+                    continue
+
+                archive = self.archive_path(key)
+                try:
+                    os.makedirs(os.path.dirname(archive), exist_ok=True)
+                    with atomic_write(archive, "wb") as f:
+                        with tarfile.open(fileobj=f, mode="w:gz") as tar:
+                            for name in sorted(os.listdir(entry.path)):
+                                tar.add(os.path.join(entry.path, name), arcname=name)
+                    shutil.rmtree(entry.path)
+                    archived += 1
+                    logger.info(f"Archived genesis {key} history to {archive}")
+                except Exception as e:
+                    logger.error(f"Error archiving genesis {key} history: {e}")
+
+            self.prune_archives()
+            return archived
+
+    def prune_archives(self) -> None:
+        """Delete the oldest archives beyond `keep`"""
+        archives = [info for info in self.iterations() if info["archived"]]
+        archives.sort(
+            key=lambda info: os.path.getmtime(self.archive_path(info["genesis"]))
+        )
+        for info in archives[: max(0, len(archives) - self.keep)]:
+            try:
+                os.remove(self.archive_path(info["genesis"]))
+            except OSError as e:
+                logger.error(f"Error pruning genesis archive {info['genesis']}: {e}")
+
+
+class GenesisTracker:
+    """Tracks the current genesis time and rolls histories over on resets.
+
+    The genesis comes from the reset handler's ``last_genesis_time`` file,
+    which is re-read whenever it changes, and from the beacon node when
+    `check()` runs as a collector. Rollover listeners run synchronously and
+    must only swap in empty in-memory state; archiving prior iterations
+    happens in a background thread.
+    """
+
+    def __init__(
+        self,
+        beacon_api: str = GENESIS_BEACON_API,
+        time_file: str = GENESIS_TIME_FILE,
+    ):
+        self.beacon_api = beacon_api
+        self.time_file = time_file
+        self._lock = threading.Lock()
+        self._genesis: Optional[int] = None
+        self._time_file_mtime: Optional[float] = None
+        self._listeners: List[Callable[[Optional[int], int], None]] = []
+        # Anything with owner, location, iterations(), adopt_unknown() and
+        # archive_previous(), e.g. GenesisStore or TimeSeriesStore
+        self._stores: Dict[str, Any] = {}
+        self.source: Optional[str] = None
+        self.rollovers = 0
+        self.last_rollover: Optional[float] = None
+
+        # Only the local file is read here; never the network
+        self.read_time_file()
+
+    @property
+    def current(self) -> Optional[int]:
+        """Current genesis time, picking up resets recorded by the reset handler"""
+        self.read_time_file()
+        return self._genesis
+
+    def read_time_file(self) -> None:
+        """Re-read the reset handler's genesis file if it changed"""
+        try:
+            mtime = os.stat(self.time_file).st_mtime
+        except OSError:
+            return
+        if mtime == self._time_file_mtime:
+            return
+        self._time_file_mtime = mtime
+
+        try:
+            with open(self.time_file, "r") as f:
+                genesis = parse_genesis_time(f.read())
+        except OSError as e:
+            logger.warning(f"Error reading {self.time_file}: {e}")
+            return
+        if genesis is not None:
+            self.update(genesis, "reset_handler")
+
+    def fetch_genesis(self) -> Optional[int]:
+        """Genesis time reported by the beacon node"""
+        try:
+            response = requests.get(
+                f"{self.beacon_api}/eth/v1/beacon/genesis",
+                timeout=GENESIS_REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+            return parse_genesis_time(response.json()["data"]["genesis_time"])
+        except Exception as e:
+            logger.warning(f"Error fetching genesis from beacon node: {e}")
+            return None
+
+    def check(self) -> bool:
+        """Scheduled genesis check, False when the beacon node is unreachable"""
+        self.read_time_file()
+        genesis = self.fetch_genesis()
+        if genesis is None:
+            return False
+        self.update(genesis, "beacon")
+        return True
+
+    def update(self, genesis: int, source: str) -> bool:
+        """Record the current genesis, rolling over if it changed"""
+        with self._lock:
+            previous = self._genesis
+            if genesis == previous:
+                return False
+            if previous is not None and genesis < previous:
+                # A stale source (e.g. a lagging beacon node) never rolls back
+                logger.warning(f"Ignoring older genesis {genesis} from {source}")
+                return False
+            self._genesis = genesis
+            self.source = source
+            stores = list(self._stores.values())
+            listeners = list(self._listeners)
+            if previous is not None:
+                self.rollovers += 1
+                self.last_rollover = datetime.datetime.now().timestamp()
+
+        if previous is None:
+            logger.info(f"Genesis {genesis} detected from {source}")
+            for store in stores:
+                if store.owner:
+                    store.adopt_unknown(genesis)
+        else:
+            logger.info(f"Network reset: genesis {previous} -> {genesis} ({source})")
+            for listener in listeners:
+                try:
+                    listener(previous, genesis)
+                except Exception as e:
+                    logger.error(f"Error in genesis rollover listener: {e}")
+
+        threading.Thread(
+            target=self.archive_all, name="genesis-archive", daemon=True
+        ).start()
+        return True
+
+    def on_rollover(self, listener: Callable[[Optional[int], int], None]) -> None:
+        """Call `listener(previous, current)` when the network resets"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def store(
+        self, base_dir: str, legacy: Tuple[str, ...] = (), owner: bool = True
+    ) -> GenesisStore:
+        """Partitioned store for a data directory, one per directory"""
+        key = os.path.abspath(base_dir)
+        with self._lock:
+            store = self._stores.get(key)
+        if store is None:
+            store = GenesisStore(self, base_dir, legacy, owner)
+            with self._lock:
+                store = self._stores.setdefault(key, store)
+        return store
+
+    def attach(self, store: Any) -> None:
+        """Manage another store's iterations on genesis changes"""
+        with self._lock:
+            self._stores.setdefault(store.location, store)
+
+    def archive_all(self) -> None:
+        """Archive prior iterations of every owned store"""
+        for store in list(self._stores.values()):
+            if store.owner:
+                store.archive_previous()
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the current genesis and stored iterations for API responses"""
+        genesis = self.current
+        return {
+            "genesis_time": genesis,
+            "genesis": (
+                datetime.datetime.fromtimestamp(
+                    genesis, datetime.timezone.utc
+                ).isoformat()
+                if genesis is not None
+                else None
+            ),
+            "source": self.source,
+            "partitioning": GENESIS_PARTITIONING,
+            "rollovers": self.rollovers,
+            "last_rollover": self.last_rollover,
+            "stores": {
+                store.location: store.iterations()
+                for store in list(self._stores.values())
+            },
+        }
+
+
+# Shared tracker used by every dashboard module
+genesis_tracker = GenesisTracker()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Configuration for the Dashboard Services
+Production serving with a pool of threaded worker processes, for the
+dashboard app and the API scripts alike:
+
+    gunicorn --config gunicorn.conf.py app:app
+    SERVING_BIND=0.0.0.0:5000 gunicorn --config ../app/gunicorn.conf.py \\
+        --chdir ../api validator_metrics_api:app
+
+Every worker imports the app itself. The background collectors run in one
+worker only, the holder of the ingestion leader lock (see leader.py); the
+other workers load what it stored, and take over when it exits. Workers
+publish their metrics to a directory of their server, so /metrics and
+/api/metrics report all workers whichever one serves the scrape (see
+worker_metrics.py).
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+
+# Constants
+SERVING_BIND = os.environ.get("SERVING_BIND", "0.0.0.0:8080")
+# One worker per CPU, each holds its own copy of the histories
+SERVING_WORKERS = int(
+    os.environ.get("SERVING_WORKERS", str(min(os.cpu_count() or 1, 4)))
+)
+SERVING_THREADS = int(os.environ.get("SERVING_THREADS", "8"))
+SERVING_TIMEOUT = int(os.environ.get("SERVING_TIMEOUT", "60"))
+SERVING_MAX_REQUESTS = int(os.environ.get("SERVING_MAX_REQUESTS", "0"))
+SERVING_LOG_LEVEL = os.environ.get("SERVING_LOG_LEVEL", "info")
+
+bind = SERVING_BIND
+workers = SERVING_WORKERS
+# Threads share a worker's in-memory histories and caches; processes add
+# CPU parallelism for the pandas and numpy heavy routes
+worker_class = "gthread"
+threads = SERVING_THREADS
+timeout = SERVING_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+# Recycled workers hand leadership over like crashed ones
+max_requests = SERVING_MAX_REQUESTS
+max_requests_jitter = SERVING_MAX_REQUESTS // 10
+# Collector threads and SQLite connections must not be created before fork
+preload_app = False
+accesslog = "-"
+errorlog = "-"
+loglevel = SERVING_LOG_LEVEL
+
+
+def on_starting(server):
+    """Give the workers of this server a leader lock and metrics directory
+    of their own"""
+    if not os.environ.get("INGESTION_LEADER_LOCK"):
+        os.environ["INGESTION_LEADER_LOCK"] = os.path.join(
+            tempfile.gettempdir(), f"dashboard-ingestion-{os.getpid()}.lock"
+        )
+    server.log.info(f"Ingestion leader lock: {os.environ['INGESTION_LEADER_LOCK']}")
+
+    if not os.environ.get("METRICS_MULTIPROC_DIR"):
+        os.environ["METRICS_MULTIPROC_DIR"] = os.path.join(
+            tempfile.gettempdir(), f"dashboard-metrics-{os.getpid()}"
+        )
+    path = os.environ["METRICS_MULTIPROC_DIR"]
+    os.makedirs(path, exist_ok=True)
+    # Counters restart with the server, drop the workers of a previous one
+    for snapshot in glob.glob(os.path.join(path, "*.json")):
+        try:
+            os.remove(snapshot)
+        except OSError:
+            pass
+    server.log.info(f"Worker metrics directory: {path}")
+
+
+def on_exit(server):
+    """Remove the lock file and metrics directory created in on_starting"""
+    path = os.environ.get("INGESTION_LEADER_LOCK", "")
+    if path.endswith(f"dashboard-ingestion-{os.getpid()}.lock"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    path = os.environ.get("METRICS_MULTIPROC_DIR", "")
+    if path.endswith(f"dashboard-metrics-{os.getpid()}"):
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+HTTP Caching and Compression for the Dashboard APIs
+Responses carry ETags so polling clients get 304 Not Modified while the data
+is unchanged, and JSON and text bodies are compressed with brotli or gzip
+when the client accepts it. History endpoints derive their ETag from the
+data revision, so an unchanged history is neither queried nor serialized.
+"""
+
+import functools
+import gzip
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Constants
+HTTP_COMPRESSION = os.environ.get("HTTP_COMPRESSION", "true").lower() == "true"
+HTTP_COMPRESSION_MIN_SIZE = int(os.environ.get("HTTP_COMPRESSION_MIN_SIZE", "1024"))
+HTTP_GZIP_LEVEL = int(os.environ.get("HTTP_GZIP_LEVEL", "6"))
+HTTP_BROTLI_QUALITY = int(os.environ.get("HTTP_BROTLI_QUALITY", "4"))
+# Revision ETags also change every interval, which bounds how long relative
+# windows such as ?days=1 can be served from a client cache
+HTTP_REVALIDATE_INTERVAL = int(os.environ.get("HTTP_REVALIDATE_INTERVAL", "60"))
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/plain",
+)
+
+
+def make_etag(*parts: Any) -> str:
+    """Short stable hash of the given values"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def revision_etag(revision: Any) -> str:
+    """ETag for the current request at a data revision"""
+    bucket = int(time.time() // HTTP_REVALIDATE_INTERVAL)
+    args = sorted(request.args.items(multi=True))
+    return make_etag(request.path, args, revision, bucket)
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching conditional request"""
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def conditional(revision: Callable[[], Any]) -> Callable:
+    """Decorate a view whose response only depends on `revision()` and the
+    query string; the view is skipped when the client's ETag still matches.
+
+    Errors computing the revision, such as an invalid ``?genesis=``, fall
+    through to the view so it can report them.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Response:
+            try:
+                etag: Optional[str] = revision_etag(revision())
+            except ValueError:
+                etag = None
+            except Exception as e:
+                logger.warning(f"Error computing revision of {request.path}: {e}")
+                etag = None
+
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                return not_modified(etag)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if etag is not None and response.status_code == 200:
+                response.set_etag(etag, weak=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def compress(response: Response) -> Response:
+    """Compress the body with the best encoding the client accepts"""
+    if (
+        not HTTP_COMPRESSION
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    # The body differs by encoding even when it is sent uncompressed
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < HTTP_COMPRESSION_MIN_SIZE:
+        return response
+
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding == "br":
+        data = brotli.compress(data, quality=HTTP_BROTLI_QUALITY)
+    elif encoding == "gzip":
+        data = gzip.compress(data, compresslevel=HTTP_GZIP_LEVEL, mtime=0)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def finalize_response(response: Response) -> Response:
+    """Add an ETag, answer conditional requests and compress the body"""
+    if (
+        request.method in ("GET", "HEAD")
+        and response.status_code == 200
+        and not response.direct_passthrough
+        and not response.is_streamed
+    ):
+        # Weak, since the same ETag is sent for every content encoding
+        if "ETag" not in response.headers:
+            response.add_etag(weak=True)
+        response.headers.setdefault("Cache-Control", "no-cache")
+        response.make_conditional(request)
+
+    return compress(response)
+
+
+def register_http_cache(app: Flask) -> None:
+    """Install ETag handling and compression on a Flask app"""
+    if "http_cache" in app.extensions:
+        return
+    app.extensions["http_cache"] = True
+    app.after_request(finalize_response)
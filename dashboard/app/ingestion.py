@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Ingestion Scheduler Module for the Ephemery Dashboard
+A single scheduler owns every background collector (sync status, Obol
+metrics, CSM queue and profitability data, ETH price). Collectors run on
+jittered intervals in a bounded worker pool, never overlap with themselves,
+back off while their upstream is failing and record timing metrics, so
+request handlers only ever read what the collectors have stored.
+
+Served by several worker processes, only the leader (see leader.py) runs
+the collectors. The other workers run each collector's optional `follow`
+function instead, which loads what the leader stored into their own
+in-memory state, every INGESTION_FOLLOW_INTERVAL seconds so they lag the
+leader by seconds rather than by a collection interval.
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from instrumentation import KIND_COLLECTOR, instrumentation
+from leader import is_leader, leader_lock
+from worker_metrics import worker_metrics
+
+logger = logging.getLogger(__name__)
+
+# Constants
+INGESTION_MAX_WORKERS = int(os.environ.get("INGESTION_MAX_WORKERS", "4"))
+INGESTION_JITTER_SECONDS = int(os.environ.get("INGESTION_JITTER_SECONDS", "15"))
+INGESTION_MAX_BACKOFF_SECONDS = int(
+    os.environ.get("INGESTION_MAX_BACKOFF_SECONDS", "1800")
+)
+# Seconds between follow runs of processes other than the leader, at most
+INGESTION_FOLLOW_INTERVAL = int(os.environ.get("INGESTION_FOLLOW_INTERVAL", "5"))
+# Collectors registered with run_on_start fire within this many seconds
+INGESTION_START_SPREAD_SECONDS = 5
+# Collector attributes shared with the other workers, and those of them summed
+SNAPSHOT_COUNTERS = ("runs", "failures", "skipped_overlap")
+SNAPSHOT_ATTRIBUTES = SNAPSHOT_COUNTERS + (
+    "last_duration",
+    "last_started",
+    "last_success",
+)
+
+
+class Collector:
+    """A named periodic data collection task with run statistics.
+
+    `func` signals an upstream failure by raising or by returning ``False``;
+    any other return value counts as success. Consecutive failures push the
+    next allowed run out exponentially, up to `max_backoff` seconds.
+
+    `follow` is what processes other than the leader run instead, typically
+    a cheap check whether `func` stored anything new, and a reload if so.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval: float,
+        jitter: float = INGESTION_JITTER_SECONDS,
+        max_backoff: float = INGESTION_MAX_BACKOFF_SECONDS,
+        follow: Optional[Callable[[], Any]] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.follow = follow
+        self.interval = interval
+        self.jitter = min(jitter, interval / 2)
+        self.max_backoff = max_backoff
+        self._running = threading.Lock()
+
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.skipped_overlap = 0
+        self.skipped_backoff = 0
+        self.follows = 0
+        self.total_duration = 0.0
+        self.last_duration: Optional[float] = None
+        self.max_duration = 0.0
+        self.last_started: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.backoff_until = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether a run is currently in progress"""
+        return self._running.locked()
+
+    def run(self, force: bool = False) -> bool:
+        """Run the collector unless it is already running or backing off.
+
+        A forced run ignores the backoff, and waits for a run in progress
+        instead of skipping: it returns the result of that run.
+        """
+        if not force and time.time() < self.backoff_until:
+            self.skipped_backoff += 1
+            return False
+
+        if not self._running.acquire(blocking=False):
+            if not force:
+                self.skipped_overlap += 1
+                logger.debug(f"Collector {self.name} still running, skipping")
+                return False
+            runs = self.runs
+            self._running.acquire()
+            if self.runs != runs:
+                # The run in progress fetched the data just now
+                self._running.release()
+                return self.last_error is None
+
+        try:
+            self.last_started = time.time()
+            start = time.perf_counter()
+            try:
+                # Upstream calls and file access of the run are grouped under it
+                with instrumentation.span(
+                    KIND_COLLECTOR, self.name, route=f"collector:{self.name}"
+                ):
+                    result = self.func()
+                error = "upstream unavailable" if result is False else None
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Error running collector {self.name}: {e}")
+            duration = time.perf_counter() - start
+
+            self.runs += 1
+            self.total_duration += duration
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            self.last_error = error
+
+            if error is None:
+                self.consecutive_failures = 0
+                self.backoff_until = 0.0
+                self.last_success = time.time()
+                return True
+
+            self.failures += 1
+            self.consecutive_failures += 1
+            delay = min(
+                self.max_backoff,
+                self.interval * 2 ** (self.consecutive_failures - 1),
+            )
+            self.backoff_until = time.time() + delay
+            return False
+        finally:
+            self._running.release()
+
+    def run_follow(self) -> None:
+        """Run `follow` unless it is missing or the collector is running"""
+        if self.follow is None:
+            return
+        if not self._running.acquire(blocking=False):
+            self.skipped_overlap += 1
+            return
+        try:
+            self.follow()
+            self.follows += 1
+        except Exception as e:
+            logger.error(f"Error following collector {self.name}: {e}")
+        finally:
+            self._running.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Run statistics for API responses and metrics"""
+        return {
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "skipped_overlap": self.skipped_overlap,
+            "skipped_backoff": self.skipped_backoff,
+            "follows": self.follows,
+            "last_duration_seconds": self.last_duration,
+            "avg_duration_seconds": (
+                self.total_duration / self.runs if self.runs else None
+            ),
+            "max_duration_seconds": self.max_duration,
+            "last_started": self.last_started,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "backoff_until": self.backoff_until or None,
+        }
+
+
+class IngestionScheduler:
+    """Owns every dashboard collector and the worker pool that runs them"""
+
+    def __init__(self, max_workers: int = INGESTION_MAX_WORKERS):
+        self.collectors: Dict[str, Collector] = {}
+        self.scheduler = BackgroundScheduler(
+            executors={"default": ThreadPoolExecutor(max_workers)},
+            job_defaults={"coalesce": True, "max_instances": 1},
+        )
+        self._lock = threading.Lock()
+        self.leader: Optional[bool] = None
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval: float,
+        run_on_start: bool = True,
+        jitter: float = INGESTION_JITTER_SECONDS,
+        max_backoff: float = INGESTION_MAX_BACKOFF_SECONDS,
+        follow: Optional[Callable[[], Any]] = None,
+    ) -> Collector:
+        """Register (or replace) a collector and schedule it"""
+        collector = Collector(name, func, interval, jitter, max_backoff, follow)
+        options = {}
+        if run_on_start:
+            # Spread the first runs so collectors do not all start at once
+            options["next_run_time"] = datetime.datetime.now() + datetime.timedelta(
+                seconds=random.uniform(0, INGESTION_START_SPREAD_SECONDS)
+            )
+
+        follow_id = f"{name}:follow"
+        follow_interval = min(interval, INGESTION_FOLLOW_INTERVAL)
+        with self._lock:
+            self.collectors[name] = collector
+            self.scheduler.add_job(
+                self._collect,
+                args=(collector,),
+                trigger=IntervalTrigger(seconds=interval, jitter=collector.jitter),
+                id=name,
+                name=f"Collect {name} every {interval} seconds",
+                replace_existing=True,
+                **options,
+            )
+            if follow is not None and leader_lock.enabled:
+                self.scheduler.add_job(
+                    self._follow,
+                    args=(collector,),
+                    trigger=IntervalTrigger(seconds=follow_interval),
+                    id=follow_id,
+                    name=f"Follow {name} every {follow_interval} seconds",
+                    replace_existing=True,
+                    next_run_time=datetime.datetime.now(),
+                )
+            elif self.scheduler.get_job(follow_id) is not None:
+                self.scheduler.remove_job(follow_id)
+        return collector
+
+    def _collect(self, collector: Collector) -> None:
+        """Scheduled collection, only the leader collects"""
+        if self.is_leader():
+            collector.run()
+
+    def _follow(self, collector: Collector) -> None:
+        """Scheduled follow run of the other processes"""
+        if not self.is_leader():
+            collector.run_follow()
+
+    def is_leader(self) -> bool:
+        """Whether this process collects, taking over from a leader that exited"""
+        leader = is_leader()
+        if leader != self.leader:
+            if leader_lock.enabled:
+                role = "running" if leader else "following"
+                logger.info(f"Process {os.getpid()} is {role} the collectors")
+            self.leader = leader
+        return leader
+
+    def start(self) -> None:
+        """Start the scheduler if it is not running yet"""
+        with self._lock:
+            if not self.scheduler.running:
+                self.scheduler.start()
+                atexit.register(self.shutdown)
+        worker_metrics.register("ingestion", self.snapshot)
+
+    def shutdown(self) -> None:
+        """Stop the scheduler without waiting for running collectors"""
+        with self._lock:
+            if self.scheduler.running:
+                self.scheduler.shutdown(wait=False)
+
+    def run_now(self, name: str) -> bool:
+        """Run a collector synchronously, e.g. for a manual refresh.
+
+        Manual refreshes run in whichever process serves the request. While
+        a scheduled run is in progress they wait for it and return its
+        result rather than starting another one.
+        """
+        return self.collectors[name].run(force=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics for every registered collector"""
+        stats = {}
+        for name, collector in list(self.collectors.items()):
+            job = self.scheduler.get_job(name)
+            stats[name] = collector.stats()
+            stats[name]["next_run"] = (
+                job.next_run_time.isoformat()
+                if job is not None and getattr(job, "next_run_time", None)
+                else None
+            )
+        return stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Role and collector counters of this process, see worker_metrics.py"""
+        return {
+            "leader": bool(self.leader),
+            "collectors": {
+                name: {
+                    attribute: getattr(collector, attribute)
+                    for attribute in SNAPSHOT_ATTRIBUTES
+                }
+                for name, collector in list(self.collectors.items())
+            },
+        }
+
+    def merged_snapshot(self) -> Dict[str, Any]:
+        """Snapshot of all workers of the server: counters are summed, the
+        last run is the latest of any worker, leader counts live leaders"""
+        self.is_leader()
+        snapshots = worker_metrics.snapshots("ingestion") or [(self.snapshot(), True)]
+        leaders = 0
+        collectors: Dict[str, Dict[str, Any]] = {}
+        for snapshot, alive in snapshots:
+            leaders += int(alive and snapshot["leader"])
+            for name, values in snapshot["collectors"].items():
+                merged = collectors.setdefault(
+                    name, dict.fromkeys(SNAPSHOT_ATTRIBUTES, None)
+                )
+                for attribute in SNAPSHOT_COUNTERS:
+                    merged[attribute] = (merged[attribute] or 0) + values[attribute]
+                if (values["last_started"] or 0) > (merged["last_started"] or 0):
+                    merged["last_started"] = values["last_started"]
+                    merged["last_duration"] = values["last_duration"]
+                if (values["last_success"] or 0) > (merged["last_success"] or 0):
+                    merged["last_success"] = values["last_success"]
+        return {"leader": leaders, "collectors": collectors}
+
+    def prometheus_lines(self) -> List[str]:
+        """Collector statistics of all workers in Prometheus text format"""
+        metrics = [
+            ("runs_total", "counter", "Collector runs", "runs"),
+            ("failures_total", "counter", "Failed collector runs", "failures"),
+            (
+                "skipped_total",
+                "counter",
+                "Runs skipped because the previous run was still in progress",
+                "skipped_overlap",
+            ),
+            (
+                "last_duration_seconds",
+                "gauge",
+                "Duration of the last collector run",
+                "last_duration",
+            ),
+            (
+                "last_success_timestamp_seconds",
+                "gauge",
+                "Unix time of the last successful run",
+                "last_success",
+            ),
+        ]
+
+        snapshot = self.merged_snapshot()
+        lines = [
+            "# HELP dashboard_ingestion_leader Number of processes running the "
+            "collectors",
+            "# TYPE dashboard_ingestion_leader gauge",
+            f"dashboard_ingestion_leader {snapshot['leader']}",
+        ]
+        for suffix, metric_type, description, attribute in metrics:
+            lines.append(f"# HELP dashboard_collector_{suffix} {description}")
+            lines.append(f"# TYPE dashboard_collector_{suffix} {metric_type}")
+            for name, values in snapshot["collectors"].items():
+                value = values[attribute] or 0
+                lines.append(
+                    f'dashboard_collector_{suffix}{{collector="{name}"}} {value}'
+                )
+        return lines
+
+
+# Shared scheduler used by every dashboard module
+ingestion_scheduler = IngestionScheduler()
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Request and Span Instrumentation for the Dashboard Services
+Every request is timed per route, and spans time the work done on its
+behalf: upstream calls made with requests, subprocesses, file reads and
+writes and time-series store queries. Durations are kept as Prometheus
+histograms labelled with the route or collector they ran for and served on
+/metrics. When INSTRUMENTATION_SPAN_FILE is set,
+finished spans are also appended to it in the OTLP/JSON format of the
+OpenTelemetry file exporter, one trace per line.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from flask import Flask, Response, g, request
+from worker_metrics import worker_metrics
+
+logger = logging.getLogger(__name__)
+
+# Constants
+INSTRUMENTATION_ENABLED = (
+    os.environ.get("INSTRUMENTATION_ENABLED", "true").lower() == "true"
+)
+INSTRUMENTATION_METRICS_PATH = os.environ.get(
+    "INSTRUMENTATION_METRICS_PATH", "/metrics"
+)
+# Upper bounds of the histogram buckets in seconds
+INSTRUMENTATION_BUCKETS = tuple(
+    sorted(
+        float(bound)
+        for bound in os.environ.get(
+            "INSTRUMENTATION_BUCKETS",
+            "0.001,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10",
+        ).split(",")
+        if bound.strip()
+    )
+)
+# OTLP/JSON file finished spans are appended to, empty to disable
+INSTRUMENTATION_SPAN_FILE = os.environ.get("INSTRUMENTATION_SPAN_FILE", "")
+# Spans kept per trace, a request touching more files only exports the first
+INSTRUMENTATION_MAX_SPANS = int(os.environ.get("INSTRUMENTATION_MAX_SPANS", "256"))
+
+# Route label of spans outside of any request or collector run
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+
+# Span kinds, mapped to the OpenTelemetry SpanKind they are exported as
+KIND_REQUEST = "request"
+KIND_HTTP = "http"
+KIND_SUBPROCESS = "subprocess"
+KIND_FILE = "file"
+KIND_STORE = "store"
+KIND_COLLECTOR = "collector"
+OTLP_SPAN_KINDS = {
+    KIND_REQUEST: 2,  # SERVER
+    KIND_HTTP: 3,  # CLIENT
+    KIND_SUBPROCESS: 3,
+    KIND_STORE: 3,
+    KIND_FILE: 1,  # INTERNAL
+    KIND_COLLECTOR: 1,
+}
+OTLP_STATUS_OK = 1
+OTLP_STATUS_ERROR = 2
+
+
+def escape_label(value: Any) -> str:
+    """Label value escaped for the Prometheus text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Prometheus histogram with a fixed set of label names"""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Tuple[str, ...],
+        buckets: Tuple[float, ...] = INSTRUMENTATION_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def snapshot(self) -> List[List[Any]]:
+        """[label values, per-bucket counts, sum, count] of every series"""
+        with self._lock:
+            return [
+                [list(labels), list(counts), total, count]
+                for labels, (counts, total, count) in self._series.items()
+            ]
+
+    def prometheus_lines(
+        self, snapshots: Optional[List[List[List[Any]]]] = None
+    ) -> List[str]:
+        """Histogram in Prometheus text format, the sum of `snapshots` of
+        several processes if given"""
+        merged: Dict[Tuple[str, ...], List[Any]] = {}
+        for snapshot in [self.snapshot()] if snapshots is None else snapshots:
+            for labels, counts, total, count in snapshot:
+                series = merged.setdefault(
+                    tuple(labels), [[0] * len(self.buckets), 0.0, 0]
+                )
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total, count) in sorted(merged.items()):
+            label_text = ",".join(
+                f'{name}="{escape_label(value)}"'
+                for name, value in zip(self.labelnames, labels)
+            )
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound!r}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Span:
+    """One timed operation, nested in the span that was current when it started"""
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        parent: Optional["Span"],
+        attributes: Dict[str, Any],
+        route: Optional[str] = None,
+    ):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.route = route or (parent.route if parent else BACKGROUND_ROUTE)
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.token: Optional[contextvars.Token] = None
+
+
+# Span the current request, task or thread is working in
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "dashboard_current_span", default=None
+)
+
+
+class Instrumentation:
+    """Route and span histograms of one service, and the span exporter"""
+
+    def __init__(
+        self,
+        service: str = "dashboard",
+        span_file: str = INSTRUMENTATION_SPAN_FILE,
+        enabled: bool = INSTRUMENTATION_ENABLED,
+    ):
+        self.service = service
+        self.span_file = span_file
+        self.enabled = enabled
+        self.request_durations = Histogram(
+            "dashboard_request_duration_seconds",
+            "Duration of HTTP requests by route",
+            ("service", "method", "route", "status"),
+        )
+        self.span_durations = Histogram(
+            "dashboard_span_duration_seconds",
+            "Duration of upstream calls, subprocesses, file and store access "
+            "by the route they ran for",
+            ("service", "route", "kind", "name"),
+        )
+        # Exported spans of unfinished traces, by trace id
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._libraries_instrumented = False
+
+    def start_span(
+        self, kind: str, name: str, route: Optional[str] = None, **attributes: Any
+    ) -> Optional[Span]:
+        """Start a span and make it current; None when disabled"""
+        if not self.enabled:
+            return None
+        span = Span(kind, name, current_span.get(), attributes, route)
+        span.token = current_span.set(span)
+        return span
+
+    def end_span(
+        self, span: Optional[Span], error: Optional[BaseException] = None
+    ) -> None:
+        """Record a span started with start_span in the current context"""
+        if span is None:
+            return
+        duration = time.perf_counter() - span.start
+        if span.token is not None:
+            current_span.reset(span.token)
+        if error is not None and span.error is None:
+            span.error = f"{type(error).__name__}: {error}"
+
+        if span.kind == KIND_REQUEST:
+            self.request_durations.observe(
+                (
+                    self.service,
+                    span.attributes.get("http.method", ""),
+                    span.route,
+                    str(span.attributes.get("http.status_code", 500)),
+                ),
+                duration,
+            )
+        else:
+            self.span_durations.observe(
+                (self.service, span.route, span.kind, span.name), duration
+            )
+        if self.span_file:
+            self._export(span, span.start_ns + int(duration * 1e9))
+
+    @contextlib.contextmanager
+    def span(
+        self, kind: str, name: str, route: Optional[str] = None, **attributes: Any
+    ) -> Iterator[Optional[Span]]:
+        """Time the block as a span nested in the current one"""
+        span = self.start_span(kind, name, route, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        self.end_span(span)
+
+    def file_span(self, operation: str, path: Any) -> Any:
+        """Span of a file read or write, named by format and operation, e.g.
+        json.load"""
+        extension = os.path.splitext(str(path))[1].lstrip(".") or "file"
+        return self.span(
+            KIND_FILE, f"{extension}.{operation}", **{"file.path": str(path)}
+        )
+
+    def traced(self, kind: str, name: Optional[str] = None) -> Callable:
+        """Decorator timing every call of a function as a span"""
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(kind, name or func.__name__):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Histogram series of this process, see worker_metrics.py"""
+        return {
+            "request_durations": self.request_durations.snapshot(),
+            "span_durations": self.span_durations.snapshot(),
+        }
+
+    def prometheus_lines(self) -> List[str]:
+        """Histograms of all workers of the server"""
+        snapshots = [
+            snapshot for snapshot, _ in worker_metrics.snapshots("instrumentation")
+        ] or [self.snapshot()]
+        return self.request_durations.prometheus_lines(
+            [snapshot["request_durations"] for snapshot in snapshots]
+        ) + self.span_durations.prometheus_lines(
+            [snapshot["span_durations"] for snapshot in snapshots]
+        )
+
+    def _export(self, span: Span, end_ns: int) -> None:
+        """Queue a finished span, writing its trace once the root finishes"""
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": f"{span.kind} {span.name}",
+            "kind": OTLP_SPAN_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": otlp_attributes(
+                dict(span.attributes, **{"dashboard.route": span.route})
+            ),
+            "status": (
+                {"code": OTLP_STATUS_ERROR, "message": span.error}
+                if span.error
+                else {"code": OTLP_STATUS_OK}
+            ),
+        }
+        if span.parent is not None:
+            record["parentSpanId"] = span.parent.span_id
+            with self._lock:
+                spans = self._pending.setdefault(span.trace_id, [])
+                if len(spans) < INSTRUMENTATION_MAX_SPANS:
+                    spans.append(record)
+            return
+
+        with self._lock:
+            spans = self._pending.pop(span.trace_id, [])
+        spans.append(record)
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": otlp_attributes(
+                                {"service.name": self.service}
+                            )
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "dashboard.instrumentation"},
+                                "spans": spans,
+                            }
+                        ],
+                    }
+                ]
+            }
+        )
+        try:
+            with self._lock, open(self.span_file, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write spans to {self.span_file}: {e}")
+
+    def instrument_libraries(self) -> None:
+        """Time every requests call and subprocess.run of the process"""
+        if self._libraries_instrumented or not self.enabled:
+            return
+        self._libraries_instrumented = True
+        session_request = requests.Session.request
+        subprocess_run = subprocess.run
+
+        @functools.wraps(session_request)
+        def traced_request(
+            session: Any, method: str, url: Any, *args: Any, **kwargs: Any
+        ):
+            parsed = requests.utils.urlparse(str(url))
+            with self.span(
+                KIND_HTTP,
+                f"{str(method).upper()} {parsed.netloc}",
+                **{"http.method": str(method).upper(), "http.url": str(url)},
+            ) as span:
+                response = session_request(session, method, url, *args, **kwargs)
+                if span is not None:
+                    span.attributes["http.status_code"] = response.status_code
+                return response
+
+        @functools.wraps(subprocess_run)
+        def traced_run(*args: Any, **kwargs: Any):
+            command = args[0] if args else kwargs.get("args", "")
+            if isinstance(command, (list, tuple)):
+                words = [str(word) for word in command]
+            else:
+                words = str(command).split()
+            program = os.path.basename(words[0]) if words else ""
+            with self.span(
+                KIND_SUBPROCESS, program, **{"process.command": " ".join(words)[:200]}
+            ) as span:
+                result = subprocess_run(*args, **kwargs)
+                if span is not None:
+                    span.attributes["process.exit_code"] = result.returncode
+                return result
+
+        requests.Session.request = traced_request
+        subprocess.run = traced_run
+
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Attributes as OTLP/JSON key-value pairs"""
+    pairs = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        pairs.append({"key": key, "value": typed})
+    return pairs
+
+
+def register_instrumentation(app: Flask, service: Optional[str] = None) -> None:
+    """Time every request of `app` and serve the histograms on /metrics"""
+    if not instrumentation.enabled:
+        return
+    instrumentation.service = service or app.name
+    instrumentation.instrument_libraries()
+    worker_metrics.register("instrumentation", instrumentation.snapshot)
+
+    @app.before_request
+    def start_request_span() -> None:
+        rule = request.url_rule
+        g.instrumentation_span = instrumentation.start_span(
+            KIND_REQUEST,
+            request.endpoint or UNMATCHED_ROUTE,
+            route=rule.rule if rule is not None else UNMATCHED_ROUTE,
+            **{"http.method": request.method, "http.target": request.full_path},
+        )
+
+    @app.after_request
+    def record_status(response: Response) -> Response:
+        span = g.get("instrumentation_span")
+        if span is not None:
+            span.attributes["http.status_code"] = response.status_code
+            if response.status_code >= 500:
+                span.error = response.status
+        return response
+
+    @app.teardown_request
+    def end_request_span(error: Optional[BaseException]) -> None:
+        instrumentation.end_span(g.pop("instrumentation_span", None), error)
+
+    def metrics() -> Response:
+        """Route and span histograms for Prometheus scraping"""
+        body = "\n".join(instrumentation.prometheus_lines()) + "\n"
+        return Response(body, mimetype="text/plain")
+
+    app.add_url_rule(INSTRUMENTATION_METRICS_PATH, "instrumentation_metrics", metrics)
+
+
+# Shared instrumentation of the process
+instrumentation = Instrumentation()
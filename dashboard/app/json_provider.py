@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization for the Dashboard Flask Apps
+A Flask JSON provider that encodes responses with orjson when it is
+installed and with the standard library encoder otherwise. Both handle numpy
+and pandas scalars and arrays, and write datetimes as ISO-8601 strings.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import logging
+import os
+import uuid
+from typing import Any
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is the fallback
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# "auto" uses orjson when it is installed, "json" forces the standard library
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto").lower()
+ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+)
+
+
+def json_default(value: Any) -> Any:
+    """Encode values neither JSON encoder handles natively"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        # NaT is a datetime that is not equal to itself
+        return None if value != value else value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "tolist"):
+        # numpy scalars and arrays, pandas Series and Index
+        return value.tolist()
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class DashboardJSONProvider(DefaultJSONProvider):
+    """JSON provider using orjson when available, the standard library otherwise.
+
+    orjson writes NaN and infinity as null where the standard library writes
+    the non-standard NaN and Infinity literals.
+    """
+
+    default = staticmethod(json_default)
+    sort_keys = False
+
+    def __init__(self, app: Flask, encoder: str = JSON_ENCODER):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and encoder != "json"
+
+    def encode(self, obj: Any, indent: bool = False) -> bytes:
+        """Serialize to UTF-8 encoded JSON"""
+        if self.use_orjson:
+            options = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+            try:
+                return orjson.dumps(obj, default=json_default, option=options)
+            except TypeError as e:
+                # e.g. integers beyond 64 bits, which the fallback handles
+                logger.debug(f"orjson could not encode response, falling back: {e}")
+
+        if indent:
+            return self.dumps(obj, indent=2).encode()
+        return self.dumps(obj, separators=(",", ":")).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize to a string; keyword arguments select the standard library"""
+        if not kwargs and self.use_orjson:
+            return self.encode(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Serialize the arguments into an application/json response"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self.encode(obj, indent) + b"\n", mimetype=self.mimetype
+        )
+
+
+def register_json_provider(app: Flask) -> None:
+    """Serialize the responses of `app` with the dashboard JSON provider"""
+    if not isinstance(app.json, DashboardJSONProvider):
+        app.json = DashboardJSONProvider(app)
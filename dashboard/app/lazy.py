@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Lazy Initialization Helpers for the Ephemery Dashboard
+Defers heavy imports (pandas, numpy) and expensive module-level singletons
+until they are first used, and lets blueprints warm them up in the
+background so the Flask app can start serving immediately.
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import types
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule(types.ModuleType):
+    """Module placeholder that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        """Import the module and adopt its namespace"""
+        with self.__dict__["_lazy_lock"]:
+            module = importlib.import_module(self.__name__)
+            # Later lookups hit the instance dict and skip __getattr__
+            self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return `name` if it is already imported, otherwise a LazyModule"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+class LazyObject:
+    """Proxy that constructs its target with `factory` on first use.
+
+    Construction is guarded by a lock so concurrent first requests and the
+    background warmup share a single instance.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: Optional[str] = None):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "lazy"))
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def ready(self) -> bool:
+        """Whether the target has been constructed"""
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """Return the target, constructing it on first call"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+                    logger.info(f"Initialized {self._name}")
+        return instance
+
+    def warmup(
+        self, callback: Optional[Callable[[Any], Any]] = None
+    ) -> threading.Thread:
+        """Construct the target in a background thread, then run `callback`"""
+
+        def run():
+            try:
+                instance = self.get()
+                if callback is not None:
+                    callback(instance)
+            except Exception as e:
+                logger.error(f"Error warming up {self._name}: {e}")
+
+        thread = threading.Thread(target=run, name=f"warmup-{self._name}", daemon=True)
+        thread.start()
+        return thread
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.get(), name, value)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Leader Election for Multi-Process Serving
+When the dashboard is served by several worker processes, exactly one of
+them may run the background collectors and maintain the data directories.
+Workers compete for an exclusive flock() on INGESTION_LEADER_LOCK; the
+kernel releases it when the holder exits, and the next worker that asks
+takes over. Without a lock path every process is its own leader, which is
+what a single `python app.py` process needs.
+"""
+
+import fcntl
+import logging
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Constants
+INGESTION_LEADER_LOCK = os.environ.get("INGESTION_LEADER_LOCK", "")
+
+
+class LeaderLock:
+    """Non-blocking exclusive file lock marking the leader process"""
+
+    def __init__(self, path: str = INGESTION_LEADER_LOCK):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether processes compete for leadership at all"""
+        return bool(self.path)
+
+    def acquire(self) -> bool:
+        """Whether this process is the leader, taking over a free lock"""
+        if not self.path:
+            return True
+        with self._lock:
+            if self._fd is not None and self._pid != os.getpid():
+                # Inherited through fork, the lock belongs to the parent
+                os.close(self._fd)
+                self._fd = None
+            if self._fd is not None:
+                return True
+
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError as e:
+                logger.error(f"Error opening leader lock {self.path}: {e}")
+                return False
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+
+            # The holder's pid, for operators looking at the file
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()}\n".encode())
+            self._fd = fd
+            self._pid = os.getpid()
+            logger.info(f"Process {self._pid} is the leader ({self.path})")
+            return True
+
+    def release(self) -> None:
+        """Give up leadership, another process takes over on its next try"""
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = None
+
+
+# Shared lock of this process
+leader_lock = LeaderLock()
+
+
+def is_leader() -> bool:
+    """Whether this process runs the collectors and owns the data directories"""
+    return leader_lock.acquire()
@@ -7,17 +7,24 @@ This module provides integration with Obol's distributed validator technology (D
 for the Ephemery dashboard, including metrics collection, analysis, and visualization.
 """
 
+from __future__ import annotations
+
 import datetime
 import json
 import logging
 import os
-import time
+import sqlite3
+import threading
 
-import numpy as np
-import pandas as pd
 import requests
-from apscheduler.schedulers.background import BackgroundScheduler
+from downsampling import METHOD_LTTB, downsample_entries
 from flask import Blueprint, current_app, jsonify, render_template, request
+from genesis import genesis_tracker
+from http_cache import conditional, register_http_cache
+from ingestion import ingestion_scheduler
+from json_provider import register_json_provider
+from lazy import LazyObject
+from timeseries import timeseries_store
 
 # Configure logging
 logging.basicConfig(
@@ -37,42 +44,113 @@ DATA_DIR = os.environ.get("EPHEMERY_DATA_DIR", "/opt/ephemery/data")
 OBOL_DATA_DIR = os.path.join(DATA_DIR, "obol")
 METRICS_DATA_DIR = os.path.join(DATA_DIR, "metrics")
 
+# Samples kept per series: 30 days at 5-minute intervals
+MAX_HISTORY_ENTRIES = 8640
+METRICS_HISTORY_FILE = "obol_metrics_history.json"
+# Time-series store series for each metrics source
+METRICS_SERIES = {"charon": "obol_charon", "validator": "obol_validator"}
+
+# Prometheus endpoints of the Charon client and the validator client
+CHARON_METRICS_ENDPOINT = os.environ.get(
+    "CHARON_METRICS_ENDPOINT", "http://localhost:3620/metrics"
+)
+VALIDATOR_METRICS_ENDPOINT = os.environ.get(
+    "VALIDATOR_METRICS_ENDPOINT", "http://localhost:5064/metrics"
+)
+BEACON_API_ENDPOINT = os.environ.get("BEACON_API_ENDPOINT", "http://localhost:5052")
+
 # Ensure directories exist
 os.makedirs(OBOL_DATA_DIR, exist_ok=True)
 os.makedirs(METRICS_DATA_DIR, exist_ok=True)
 
 
 class ObolMetricsCollector:
-    """Class to collect and analyze Obol SquadStaking metrics"""
+    """Class to collect and analyze Obol SquadStaking metrics
+
+    `metrics_history` is a copy-on-write snapshot: collect_metrics() builds
+    a new dict of new lists under `_write_lock` and swaps it in with a
+    single assignment, so readers never block and never see torn state.
+
+    Samples are appended to the shared time-series store per genesis; a
+    network reset swaps in an empty history.
+    """
 
     def __init__(self):
-        self.charon_metrics_endpoint = "http://localhost:3620/metrics"
-        self.validator_metrics_endpoint = "http://localhost:5064/metrics"
-        self.beacon_api_endpoint = "http://localhost:5052"
-        self.metrics_history_file = os.path.join(
-            METRICS_DATA_DIR, "obol_metrics_history.json"
+        self._write_lock = threading.Lock()
+        self.charon_metrics_endpoint = CHARON_METRICS_ENDPOINT
+        self.validator_metrics_endpoint = VALIDATOR_METRICS_ENDPOINT
+        self.beacon_api_endpoint = BEACON_API_ENDPOINT
+        # History files written by earlier releases, imported once
+        self.history_files = genesis_tracker.store(
+            METRICS_DATA_DIR, legacy=(METRICS_HISTORY_FILE,)
         )
+        self._import_history_files()
+        # Read first, so samples stored during the load trigger a reload
+        self._history_revision = self._metrics_revision()
         self.metrics_history = self._load_metrics_history()
+        genesis_tracker.on_rollover(self.reset_metrics_history)
+
+    def _import_history_files(self):
+        """Import obol_metrics_history.json files into the time-series store"""
+
+        def importer(genesis, files):
+            history = json.loads(files[0][1])
+            return sum(
+                timeseries_store.append_many(
+                    METRICS_SERIES[source],
+                    ((entry["timestamp"], entry) for entry in history.get(source, [])),
+                    genesis,
+                )
+                for source in METRICS_SERIES
+            )
+
+        timeseries_store.migrate_files(
+            self.history_files, METRICS_HISTORY_FILE, "obol_metrics", importer
+        )
 
-    def _load_metrics_history(self):
-        """Load metrics history from file"""
-        if os.path.exists(self.metrics_history_file):
-            try:
-                with open(self.metrics_history_file, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                logger.error(f"Error loading metrics history: {e}")
-                return {"charon": [], "validator": []}
+    def _load_metrics_history(self, genesis=None):
+        """Load the metrics history of the current (or given) genesis"""
+        try:
+            return {
+                source: timeseries_store.records(
+                    series, limit=MAX_HISTORY_ENTRIES, genesis=genesis
+                )
+                for source, series in METRICS_SERIES.items()
+            }
+        except sqlite3.Error as e:
+            logger.error(f"Error loading metrics history: {e}")
         return {"charon": [], "validator": []}
 
-    def _save_metrics_history(self):
-        """Save metrics history to file"""
+    def _metrics_revision(self):
+        """Revisions of the stored metrics series"""
+        return tuple(
+            timeseries_store.revision(series) for series in METRICS_SERIES.values()
+        )
+
+    def reload_metrics_history(self):
+        """Reload the history if another process changed it in the store"""
+        revision = self._metrics_revision()
+        if revision == self._history_revision:
+            return
+        history = self._load_metrics_history()
+        with self._write_lock:
+            self.metrics_history = history
+            self._history_revision = revision
+
+    def _save_metrics_entry(self, source, entry):
+        """Append one sample to the store, keeping the last 30 days of data"""
         try:
-            with open(self.metrics_history_file, "w") as f:
-                json.dump(self.metrics_history, f)
-        except IOError as e:
+            series = METRICS_SERIES[source]
+            timeseries_store.append(series, entry["timestamp"], entry)
+            timeseries_store.trim(series, MAX_HISTORY_ENTRIES)
+        except Exception as e:
             logger.error(f"Error saving metrics history: {e}")
 
+    def reset_metrics_history(self, previous_genesis, genesis):
+        """Start an empty history when the network resets"""
+        with self._write_lock:
+            self.metrics_history = {"charon": [], "validator": []}
+
     def fetch_prometheus_metrics(self, endpoint):
         """Fetch metrics from Prometheus endpoint"""
         try:
@@ -149,33 +227,21 @@ class ObolMetricsCollector:
         )
         validator_metrics = self.parse_prometheus_metrics(validator_metrics_text)
 
-        # Store metrics with timestamp
-        if charon_metrics:
-            self.metrics_history["charon"].append(
-                {"timestamp": timestamp, "metrics": charon_metrics}
-            )
-
-            # Keep only last 30 days of data
-            if (
-                len(self.metrics_history["charon"]) > 8640
-            ):  # 30 days at 5-minute intervals
-                self.metrics_history["charon"] = self.metrics_history["charon"][-8640:]
-
-        if validator_metrics:
-            self.metrics_history["validator"].append(
-                {"timestamp": timestamp, "metrics": validator_metrics}
-            )
-
-            # Keep only last 30 days of data
-            if (
-                len(self.metrics_history["validator"]) > 8640
-            ):  # 30 days at 5-minute intervals
-                self.metrics_history["validator"] = self.metrics_history["validator"][
-                    -8640:
-                ]
-
-        # Save updated history
-        self._save_metrics_history()
+        # Store metrics with timestamp in a new snapshot, keeping only the
+        # last 30 days of data
+        with self._write_lock:
+            history = dict(self.metrics_history)
+            for source, metrics in (
+                ("charon", charon_metrics),
+                ("validator", validator_metrics),
+            ):
+                if metrics:
+                    entry = {"timestamp": timestamp, "metrics": metrics}
+                    entries = history[source] + [entry]
+                    history[source] = entries[-MAX_HISTORY_ENTRIES:]
+                    # Only the new sample is written
+                    self._save_metrics_entry(source, entry)
+            self.metrics_history = history
 
         return {
             "timestamp": timestamp,
@@ -185,61 +251,100 @@ class ObolMetricsCollector:
 
     def get_latest_metrics(self):
         """Get the latest collected metrics"""
-        if not self.metrics_history["charon"] or not self.metrics_history["validator"]:
-            return self.collect_metrics()
+        history = self.metrics_history
+        if not history["charon"] or not history["validator"]:
+            # Nothing collected yet, the ingestion scheduler fills this in
+            return {"timestamp": None, "charon": {}, "validator": {}}
 
         return {
-            "timestamp": self.metrics_history["charon"][-1]["timestamp"],
-            "charon": self.metrics_history["charon"][-1]["metrics"],
-            "validator": self.metrics_history["validator"][-1]["metrics"],
+            "timestamp": history["charon"][-1]["timestamp"],
+            "charon": history["charon"][-1]["metrics"],
+            "validator": history["validator"][-1]["metrics"],
         }
 
-    def get_metrics_history(self, days=DEFAULT_HISTORY_DAYS):
+    def get_metrics_history(
+        self, days=DEFAULT_HISTORY_DAYS, max_points=0, method=METHOD_LTTB, genesis=None
+    ):
         """Get metrics history for the specified number of days"""
+        end_time = datetime.datetime.now().isoformat()
+        if genesis is None:
+            history = self.metrics_history
+        else:
+            # Prior iterations are read from their partition or archive and
+            # windowed back from their last sample
+            history = self._load_metrics_history(genesis)
+            end_time = max(
+                [entry["timestamp"] for entry in history["charon"][-1:]]
+                + [entry["timestamp"] for entry in history["validator"][-1:]]
+                or [end_time]
+            )
         cutoff_time = (
-            datetime.datetime.now() - datetime.timedelta(days=days)
+            datetime.datetime.fromisoformat(end_time) - datetime.timedelta(days=days)
         ).isoformat()
 
         charon_history = [
-            entry
-            for entry in self.metrics_history["charon"]
-            if entry["timestamp"] >= cutoff_time
+            entry for entry in history["charon"] if entry["timestamp"] >= cutoff_time
         ]
 
         validator_history = [
-            entry
-            for entry in self.metrics_history["validator"]
-            if entry["timestamp"] >= cutoff_time
+            entry for entry in history["validator"] if entry["timestamp"] >= cutoff_time
         ]
 
-        return {"charon": charon_history, "validator": validator_history}
-
-    def calculate_consensus_rate(self):
-        """Calculate consensus rate from metrics history"""
-        if not self.metrics_history["charon"]:
-            return 0.0
+        # Decimate to the requested number of points per series
+        charon_history = downsample_entries(
+            charon_history,
+            max_points,
+            method,
+            lambda entry: self.consensus_rate_from_metrics(entry["metrics"]),
+        )
+        validator_history = downsample_entries(
+            validator_history,
+            max_points,
+            method,
+            lambda entry: self.effectiveness_from_metrics(entry["metrics"]),
+        )
 
-        # Look for consensus metrics in the latest data
-        latest_metrics = self.metrics_history["charon"][-1]["metrics"]
+        return {"charon": charon_history, "validator": validator_history}
 
+    @staticmethod
+    def consensus_rate_from_metrics(metrics):
+        """Consensus success rate (%) from one set of Charon metrics, if known"""
         # Extract consensus success and failure counts
         consensus_success = 0
         consensus_total = 0
 
-        if "charon_consensus_count" in latest_metrics:
-            for item in latest_metrics["charon_consensus_count"]:
-                if item["labels"].get("result") == "success":
-                    consensus_success += item["value"]
-                consensus_total += item["value"]
+        for item in metrics.get("charon_consensus_count", []):
+            if item["labels"].get("result") == "success":
+                consensus_success += item["value"]
+            consensus_total += item["value"]
 
         if consensus_total == 0:
-            return 0.0
+            return None
 
         return (consensus_success / consensus_total) * 100
 
+    @staticmethod
+    def effectiveness_from_metrics(metrics):
+        """Attestation effectiveness (%) from one set of validator metrics"""
+        values = metrics.get("validator_effectiveness", [])
+        return values[-1]["value"] * 100 if values else None
+
+    def calculate_consensus_rate(self):
+        """Calculate consensus rate from metrics history"""
+        charon_history = self.metrics_history["charon"]
+        if not charon_history:
+            return 0.0
+
+        # Look for consensus metrics in the latest data
+        latest_metrics = charon_history[-1]["metrics"]
+        consensus_rate = self.consensus_rate_from_metrics(latest_metrics)
+
+        return consensus_rate if consensus_rate is not None else 0.0
+
     def calculate_duty_performance(self):
         """Calculate duty performance metrics"""
-        if not self.metrics_history["validator"]:
+        validator_history = self.metrics_history["validator"]
+        if not validator_history:
             return {
                 "attestation_effectiveness": 0.0,
                 "missed_attestations": 0,
@@ -247,7 +352,7 @@ class ObolMetricsCollector:
             }
 
         # Look for duty metrics in the latest data
-        latest_metrics = self.metrics_history["validator"][-1]["metrics"]
+        latest_metrics = validator_history[-1]["metrics"]
 
         # Extract attestation and block metrics
         attestation_effectiveness = 0.0
@@ -367,17 +472,19 @@ class ObolMetricsCollector:
         }
 
 
-# Create metrics collector instance
-metrics_collector = ObolMetricsCollector()
+# Metrics collector instance, created on first use or by the blueprint warmup
+metrics_collector = LazyObject(ObolMetricsCollector, "metrics_collector")
 
-# Schedule metrics collection
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    metrics_collector.collect_metrics,
-    "interval",
-    seconds=DEFAULT_REFRESH_INTERVAL,
-    id="obol_metrics_collection",
-)
+
+def collect_metrics() -> bool:
+    """Scheduled metrics collection, False when no endpoint answered"""
+    metrics = metrics_collector.collect_metrics()
+    return bool(metrics["charon"] or metrics["validator"])
+
+
+def follow_metrics() -> None:
+    """Pick up the metrics the leader process collected"""
+    metrics_collector.reload_metrics_history()
 
 
 @obol_bp.route("/")
@@ -398,30 +505,53 @@ def get_analysis():
     return jsonify(metrics_collector.get_comprehensive_analysis())
 
 
+def history_revision():
+    """Revision of the metrics history a request reads"""
+    genesis = request.args.get("genesis")
+    return [
+        timeseries_store.revision(series, genesis) for series in METRICS_SERIES.values()
+    ]
+
+
 @obol_bp.route("/api/history")
+@conditional(history_revision)
 def get_history():
     """API endpoint to get metrics history"""
     days = request.args.get("days", DEFAULT_HISTORY_DAYS, type=int)
-    return jsonify(metrics_collector.get_metrics_history(days))
+    max_points = request.args.get("max_points", 0, type=int)
+    method = request.args.get("downsample", METHOD_LTTB)
+    genesis = request.args.get("genesis")
+    try:
+        history = metrics_collector.get_metrics_history(
+            days, max_points, method, genesis
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(history)
 
 
 @obol_bp.route("/api/refresh", methods=["POST"])
 def refresh_metrics():
     """API endpoint to manually refresh metrics"""
-    metrics = metrics_collector.collect_metrics()
-    return jsonify({"status": "success", "metrics": metrics})
+    if not ingestion_scheduler.run_now("obol_metrics"):
+        return jsonify({"status": "error", "message": "Metrics collection failed"}), 502
+    return jsonify(
+        {"status": "success", "metrics": metrics_collector.get_latest_metrics()}
+    )
 
 
 def register_obol_blueprint(app):
     """Register the Obol blueprint with the Flask app"""
     app.register_blueprint(obol_bp)
-
-    # Start the scheduler if it's not already running
-    if not scheduler.running:
-        scheduler.start()
-
-    # Register shutdown function to stop scheduler when app stops
-    @app.teardown_appcontext
-    def shutdown_scheduler(exception=None):
-        if scheduler.running:
-            scheduler.shutdown()
+    register_json_provider(app)
+    register_http_cache(app)
+
+    # Load the metrics history in the background
+    metrics_collector.warmup()
+    ingestion_scheduler.register(
+        "obol_metrics",
+        collect_metrics,
+        DEFAULT_REFRESH_INTERVAL,
+        follow=follow_metrics,
+    )
+    ingestion_scheduler.start()
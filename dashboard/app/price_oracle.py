@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Price Oracle Module
+Cached ETH/USD price provider for the profitability calculator. Prices come
+from pluggable sources, are cached in memory and on disk with a TTL and are
+refreshed by the eth_price ingestion collector, so callers never block on the
+network.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from atomic_io import write_json_atomic
+from instrumentation import instrumentation
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+PRICE_SOURCES = os.environ.get("PRICE_SOURCES", "coingecko")
+PRICE_FIXTURE_FILE = os.environ.get("PRICE_FIXTURE_FILE", "")
+PRICE_STATIC_USD = os.environ.get("PRICE_STATIC_USD", "")
+PRICE_CACHE_TTL = int(os.environ.get("PRICE_CACHE_TTL", "300"))
+PRICE_MIN_FETCH_INTERVAL = int(os.environ.get("PRICE_MIN_FETCH_INTERVAL", "30"))
+PRICE_REQUEST_TIMEOUT = 5
+COINGECKO_PRICE_URL = os.environ.get(
+    "COINGECKO_PRICE_URL",
+    "https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd",
+)
+
+
+class PriceSource:
+    """Base class for ETH/USD price sources"""
+
+    name = "base"
+
+    def fetch(self) -> float:
+        """Return the current ETH price in USD or raise"""
+        raise NotImplementedError
+
+
+class CoinGeckoSource(PriceSource):
+    """Price from the CoinGecko simple price API"""
+
+    name = "coingecko"
+
+    def __init__(
+        self, url: str = COINGECKO_PRICE_URL, timeout: float = PRICE_REQUEST_TIMEOUT
+    ):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self) -> float:
+        """Fetch the price over HTTP"""
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return float(response.json()["ethereum"]["usd"])
+
+
+class FilePriceSource(PriceSource):
+    """Price from a local file, for offline use and fixtures.
+
+    The file may hold a bare number, ``{"eth_price": ...}`` or the CoinGecko
+    response shape ``{"ethereum": {"usd": ...}}``.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str = PRICE_FIXTURE_FILE):
+        self.path = path
+
+    def fetch(self) -> float:
+        """Read the price from disk"""
+        with instrumentation.file_span("load", self.path), open(self.path, "r") as f:
+            data = json.loads(f.read())
+
+        if isinstance(data, dict):
+            if "ethereum" in data:
+                return float(data["ethereum"]["usd"])
+            return float(data["eth_price"])
+        return float(data)
+
+
+class StaticPriceSource(PriceSource):
+    """Fixed price, mainly for tests and development"""
+
+    name = "static"
+
+    def __init__(self, price: float):
+        self.price = float(price)
+
+    def fetch(self) -> float:
+        """Return the configured price"""
+        return self.price
+
+
+def sources_from_env(spec: str = PRICE_SOURCES) -> List[PriceSource]:
+    """Build the source chain from a comma-separated list such as ``file,coingecko``"""
+    sources: List[PriceSource] = []
+    for name in (part.strip().lower() for part in spec.split(",")):
+        if name == CoinGeckoSource.name:
+            sources.append(CoinGeckoSource())
+        elif name == FilePriceSource.name:
+            if PRICE_FIXTURE_FILE:
+                sources.append(FilePriceSource(PRICE_FIXTURE_FILE))
+            else:
+                logger.warning("Price source 'file' requires PRICE_FIXTURE_FILE")
+        elif name == StaticPriceSource.name:
+            try:
+                sources.append(StaticPriceSource(float(PRICE_STATIC_USD)))
+            except ValueError:
+                logger.warning(
+                    "Price source 'static' requires a numeric PRICE_STATIC_USD"
+                )
+        elif name:
+            logger.warning(f"Unknown price source: {name}")
+    return sources
+
+
+class PriceOracle:
+    """TTL-cached ETH price with single-flight fetches"""
+
+    def __init__(
+        self,
+        sources: Optional[List[PriceSource]] = None,
+        cache_file: Optional[str] = None,
+        ttl: int = PRICE_CACHE_TTL,
+        min_fetch_interval: int = PRICE_MIN_FETCH_INTERVAL,
+    ):
+        self.sources = sources if sources is not None else sources_from_env()
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.min_fetch_interval = min_fetch_interval
+
+        self._lock = threading.Lock()
+        # Held for the duration of a fetch so concurrent refreshes coalesce
+        self._fetch_lock = threading.Lock()
+
+        self._price: Optional[float] = None
+        self._source: Optional[str] = None
+        self._updated_at = 0.0
+        self._last_attempt = 0.0
+        self._last_error: Optional[str] = None
+
+        # Only the on-disk cache is read here; never the network
+        self.load_cache()
+
+    def load_cache(self) -> None:
+        """Load the last persisted price, even if it has expired"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with instrumentation.file_span("load", self.cache_file), open(
+                self.cache_file, "r"
+            ) as f:
+                data = json.load(f)
+            with self._lock:
+                self._price = float(data["price"])
+                self._source = data.get("source")
+                self._updated_at = float(data.get("updated_at", 0))
+        except Exception as e:
+            logger.warning(f"Error loading price cache: {e}")
+
+    def save_cache(self) -> None:
+        """Persist the current price atomically"""
+        if not self.cache_file:
+            return
+
+        with self._lock:
+            data = {
+                "price": self._price,
+                "source": self._source,
+                "updated_at": self._updated_at,
+            }
+        try:
+            write_json_atomic(self.cache_file, data)
+        except Exception as e:
+            logger.warning(f"Error saving price cache: {e}")
+
+    @property
+    def age(self) -> float:
+        """Seconds since the cached price was fetched"""
+        return time.time() - self._updated_at
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the cached price is missing or older than the TTL"""
+        return self._price is None or self.age > self.ttl
+
+    def get_price(self, fallback: Optional[float] = None) -> Optional[float]:
+        """Return the cached price without blocking, or `fallback` if none"""
+        with self._lock:
+            return self._price if self._price is not None else fallback
+
+    def refresh(self, force: bool = False) -> Optional[float]:
+        """Fetch a new price from the first working source.
+
+        Only one fetch runs at a time; callers arriving while a fetch is in
+        flight wait for it and share its result. Fetches are rate limited to
+        one per `min_fetch_interval` seconds unless `force` is set.
+        """
+        if not self._fetch_lock.acquire(blocking=False):
+            # Another thread is fetching, wait for its result
+            with self._fetch_lock:
+                return self.get_price()
+
+        try:
+            now = time.time()
+            if not force and now - self._last_attempt < self.min_fetch_interval:
+                return self.get_price()
+            self._last_attempt = now
+
+            for source in self.sources:
+                try:
+                    price = source.fetch()
+                except Exception as e:
+                    self._last_error = f"{source.name}: {e}"
+                    logger.warning(f"Error fetching ETH price from {source.name}: {e}")
+                    continue
+
+                with self._lock:
+                    self._price = price
+                    self._source = source.name
+                    self._updated_at = time.time()
+                self._last_error = None
+                self.save_cache()
+                return price
+
+            return self.get_price()
+        finally:
+            self._fetch_lock.release()
+
+    def refresh_if_stale(self) -> Optional[float]:
+        """Refresh only when the cached price has expired"""
+        if self.is_stale:
+            return self.refresh()
+        return self.get_price()
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the cached price for API responses"""
+        with self._lock:
+            price, source, updated_at = self._price, self._source, self._updated_at
+
+        return {
+            "price": price,
+            "source": source,
+            "updated_at": updated_at or None,
+            "age_seconds": self.age if updated_at else None,
+            "stale": self.is_stale,
+            "sources": [s.name for s in self.sources],
+            "last_error": self._last_error,
+        }
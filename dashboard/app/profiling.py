@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+On-demand Profiling for the Dashboard Services
+Disabled unless PROFILING_ENABLED is true and PROFILING_TOKEN is set. Callers
+that present the token get statistical CPU profiles of every thread over a
+requested number of seconds, tracemalloc allocation snapshots with the
+difference to the previous snapshot, and stack dumps of all threads and
+asyncio tasks. Flask apps serve them under /debug/profile; the WebSocket
+server offers the same through profile_* actions.
+"""
+
+import asyncio
+import collections
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Flask, Response, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+# Constants
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")
+PROFILING_PATH = os.environ.get("PROFILING_PATH", "/debug/profile")
+PROFILING_MAX_SECONDS = float(os.environ.get("PROFILING_MAX_SECONDS", "60"))
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get("PROFILING_SAMPLE_INTERVAL", "0.005"))
+PROFILING_TRACEMALLOC_FRAMES = int(os.environ.get("PROFILING_TRACEMALLOC_FRAMES", "25"))
+PROFILING_TOP_LIMIT = 50
+MIN_SAMPLE_INTERVAL = 0.001
+
+# Innermost Python frames of threads blocked waiting for work, by file and
+# function; their samples are dropped unless idle threads are requested
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("connection.py", "wait"),
+    # concurrent.futures workers block in the C-level work queue
+    ("thread.py", "_worker"),
+}
+MEMORY_GROUPS = ("lineno", "filename", "traceback")
+# tracemalloc's own and import machinery allocations
+MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class ProfilerStateError(Exception):
+    """Raised when an operation needs a profiler state it is not in"""
+
+
+def profiling_enabled() -> bool:
+    """Whether profiling is switched on and protected by a token"""
+    return PROFILING_ENABLED and bool(PROFILING_TOKEN)
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Whether `token` is the profiling token"""
+    if not profiling_enabled() or not token:
+        return False
+    return hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+
+def short_path(filename: str) -> str:
+    """Path of a source file relative to the sys.path entry it was loaded from"""
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return os.path.relpath(filename, best) if best else filename
+
+
+def code_label(code: Any, cache: Dict[Any, str]) -> str:
+    """Function label used to aggregate samples, e.g. get (queue.py:154)"""
+    label = cache.get(code)
+    if label is None:
+        path = short_path(code.co_filename)
+        label = f"{code.co_name} ({path}:{code.co_firstlineno})"
+        cache[code] = label
+    return label
+
+
+class CpuSampler:
+    """Statistical profiler sampling the stacks of all threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(
+        self,
+        seconds: float,
+        interval: float = PROFILING_SAMPLE_INTERVAL,
+        include_idle: bool = False,
+    ) -> Dict[str, Any]:
+        """Sample every thread but the calling one for `seconds`.
+
+        Returns the most frequent functions by own (self) and inclusive
+        (total) samples, samples per thread and the stacks in collapsed
+        format, as read by flamegraph.pl and speedscope.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A CPU profile is already running")
+        try:
+            own = threading.get_ident()
+            # Names are collected while sampling, short-lived threads are
+            # gone by the end
+            names: Dict[int, str] = {}
+            stacks: Dict[Tuple[int, Tuple[Any, ...]], int] = collections.Counter()
+            rounds = idle = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            while time.perf_counter() < deadline:
+                rounds += 1
+                frames = sys._current_frames()
+                if not names.keys() >= frames.keys():
+                    names.update(
+                        (thread.ident, thread.name) for thread in threading.enumerate()
+                    )
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    codes = []
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    leaf = codes[0]
+                    if (
+                        not include_idle
+                        and (os.path.basename(leaf.co_filename), leaf.co_name)
+                        in IDLE_FRAMES
+                    ):
+                        idle += 1
+                        continue
+                    stacks[(ident, tuple(reversed(codes)))] += 1
+                time.sleep(interval)
+            duration = time.perf_counter() - started
+        finally:
+            self._lock.release()
+
+        labels: Dict[Any, str] = {}
+        own_samples: Dict[str, int] = collections.Counter()
+        total_samples: Dict[str, int] = collections.Counter()
+        threads: Dict[str, int] = collections.Counter()
+        collapsed = []
+        for (ident, codes), count in stacks.items():
+            thread = names.get(ident, f"thread-{ident}")
+            frames = [code_label(code, labels) for code in codes]
+            threads[thread] += count
+            own_samples[frames[-1]] += count
+            # Recursive functions count once per sample
+            for label in set(frames):
+                total_samples[label] += count
+            collapsed.append(f"{thread};{';'.join(frames)} {count}")
+
+        samples = sum(threads.values())
+
+        def top(counter: Dict[str, int]) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "function": label,
+                    "samples": count,
+                    "percent": round(100 * count / samples, 2),
+                }
+                for label, count in counter.most_common(PROFILING_TOP_LIMIT)
+            ]
+
+        return {
+            "duration_seconds": round(duration, 3),
+            "interval_seconds": interval,
+            "rounds": rounds,
+            "samples": samples,
+            "idle_samples": idle,
+            "threads": dict(threads.most_common()),
+            "top_self": top(own_samples),
+            "top_total": top(total_samples),
+            "collapsed": "\n".join(sorted(collapsed)) + "\n",
+        }
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots, each compared with the previous one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "has_baseline": self._previous is not None,
+        }
+
+    def start(self, frames: int = PROFILING_TRACEMALLOC_FRAMES) -> Dict[str, Any]:
+        """Start tracing allocations, keeping `frames` frames per allocation"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._previous = None
+                logger.info(f"tracemalloc started with {frames} frames")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop tracing and drop the baseline snapshot"""
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("tracemalloc stopped")
+            self._previous = None
+        return self.status()
+
+    def snapshot(self, limit: int = 25, group: str = "lineno") -> Dict[str, Any]:
+        """Largest allocation sites, and their growth since the last snapshot"""
+        if group not in MEMORY_GROUPS:
+            raise ValueError(f"group must be one of {', '.join(MEMORY_GROUPS)}")
+        if not tracemalloc.is_tracing():
+            raise ProfilerStateError("tracemalloc is not running, start it first")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+        with self._lock:
+            previous, self._previous = self._previous, snapshot
+
+        result = self.status()
+        result["group"] = group
+        result["top"] = [
+            allocation_stat(stat) for stat in snapshot.statistics(group)[:limit]
+        ]
+        if previous is not None:
+            result["diff"] = [
+                allocation_stat(stat)
+                for stat in snapshot.compare_to(previous, group)[:limit]
+            ]
+        return result
+
+
+def allocation_stat(stat: Any) -> Dict[str, Any]:
+    """tracemalloc Statistic or StatisticDiff as a dict"""
+    frames = [
+        f"{short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback
+    ]
+    result = {
+        "location": frames[0] if frames else "",
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if len(frames) > 1:
+        result["traceback"] = frames
+    if hasattr(stat, "size_diff"):
+        result["size_diff_bytes"] = stat.size_diff
+        result["count_diff"] = stat.count_diff
+    return result
+
+
+def format_frames(frame: Any, limit: int = 50) -> List[str]:
+    """Innermost-last stack of a frame, e.g. app.py:120 in status"""
+    stack = []
+    while frame is not None and len(stack) < limit:
+        code = frame.f_code
+        stack.append(
+            f"{short_path(code.co_filename)}:{frame.f_lineno} in {code.co_name}"
+        )
+        frame = frame.f_back
+    return list(reversed(stack))
+
+
+def thread_stacks() -> List[Dict[str, Any]]:
+    """Current stack of every thread"""
+    frames = sys._current_frames()
+    return [
+        {
+            "name": thread.name,
+            "ident": thread.ident,
+            "daemon": thread.daemon,
+            "stack": format_frames(frames.get(thread.ident)),
+        }
+        for thread in threading.enumerate()
+    ]
+
+
+def task_stacks(
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> List[Dict[str, Any]]:
+    """State and suspended stack of every asyncio task; call from the loop"""
+    tasks = []
+    for task in asyncio.all_tasks(loop):
+        stack = []
+        for frame in task.get_stack():
+            code = frame.f_code
+            stack.append(
+                f"{short_path(code.co_filename)}:{frame.f_lineno} in {code.co_name}"
+            )
+        coroutine = task.get_coro()
+        tasks.append(
+            {
+                "name": task.get_name(),
+                "coroutine": getattr(coroutine, "__qualname__", repr(coroutine)),
+                "done": task.done(),
+                "cancelled": task.cancelled(),
+                "stack": stack,
+            }
+        )
+    return sorted(tasks, key=lambda task: task["name"])
+
+
+def profile_seconds(value: Any) -> float:
+    """Validated profile duration"""
+    seconds = float(value)
+    if not 0 < seconds <= PROFILING_MAX_SECONDS:
+        raise ValueError(f"seconds must be in (0, {PROFILING_MAX_SECONDS:g}]")
+    return seconds
+
+
+def sample_interval(value: Any) -> float:
+    """Validated sampling interval"""
+    return max(MIN_SAMPLE_INTERVAL, float(value))
+
+
+# Shared profilers of the process
+cpu_sampler = CpuSampler()
+memory_profiler = MemoryProfiler()
+
+profiling_bp = Blueprint("profiling", __name__, url_prefix=PROFILING_PATH)
+
+
+@profiling_bp.before_request
+def check_token():
+    """Require the profiling token as bearer token or X-Profiling-Token"""
+    header = request.headers.get("Authorization", "")
+    token = header[7:] if header.startswith("Bearer ") else None
+    if not authorized(token or request.headers.get("X-Profiling-Token")):
+        response = jsonify({"error": "Unauthorized"})
+        response.headers["WWW-Authenticate"] = "Bearer"
+        return response, 401
+    return None
+
+
+@profiling_bp.errorhandler(ValueError)
+def invalid_parameter(error):
+    return jsonify({"error": str(error)}), 400
+
+
+@profiling_bp.errorhandler(ProfilerBusy)
+def profiler_busy(error):
+    return jsonify({"error": str(error)}), 409
+
+
+@profiling_bp.errorhandler(ProfilerStateError)
+def profiler_state(error):
+    return jsonify({"error": str(error)}), 409
+
+
+@profiling_bp.route("/cpu")
+def cpu_profile():
+    """Sample all threads for ?seconds=, as JSON or ?format=collapsed"""
+    profile = cpu_sampler.profile(
+        profile_seconds(request.args.get("seconds", "10")),
+        sample_interval(request.args.get("interval", PROFILING_SAMPLE_INTERVAL)),
+        request.args.get("idle", "false").lower() == "true",
+    )
+    if request.args.get("format") == "collapsed":
+        return Response(profile["collapsed"], mimetype="text/plain")
+    profile.pop("collapsed")
+    return jsonify(profile)
+
+
+@profiling_bp.route("/threads")
+def threads():
+    return jsonify(thread_stacks())
+
+
+@profiling_bp.route("/memory")
+def memory_status():
+    return jsonify(memory_profiler.status())
+
+
+@profiling_bp.route("/memory/start", methods=["POST"])
+def memory_start():
+    frames = int(request.args.get("frames", PROFILING_TRACEMALLOC_FRAMES))
+    if frames < 1:
+        raise ValueError("frames must be at least 1")
+    return jsonify(memory_profiler.start(frames))
+
+
+@profiling_bp.route("/memory/snapshot", methods=["POST"])
+def memory_snapshot():
+    """Top allocation sites, with the diff to the previous snapshot"""
+    return jsonify(
+        memory_profiler.snapshot(
+            int(request.args.get("limit", "25")),
+            request.args.get("group", "lineno"),
+        )
+    )
+
+
+@profiling_bp.route("/memory/stop", methods=["POST"])
+def memory_stop():
+    return jsonify(memory_profiler.stop())
+
+
+def register_profiling_blueprint(app: Flask) -> None:
+    """Serve the profiling routes when profiling is enabled"""
+    if not PROFILING_ENABLED:
+        return
+    if not PROFILING_TOKEN:
+        logger.warning("PROFILING_ENABLED is set without PROFILING_TOKEN, ignoring")
+        return
+    app.register_blueprint(profiling_bp)
+    logger.info(f"Profiling enabled at {PROFILING_PATH}")
@@ -4,17 +4,37 @@ Profitability Calculator Module for Lido CSM
 This module provides functionality to calculate and visualize validator profitability.
 """
 
+from __future__ import annotations
+
 import datetime
+import hashlib
+import io
 import json
 import logging
+import math
 import os
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-import numpy as np
-import pandas as pd
 import requests
+from atomic_io import write_json_atomic
 from flask import Blueprint, current_app, jsonify, render_template, request
+from genesis import genesis_tracker
+from http_cache import register_http_cache
+from ingestion import ingestion_scheduler
+from instrumentation import instrumentation
+from json_provider import register_json_provider
+from lazy import LazyObject, lazy_import
+from price_oracle import PriceOracle
+from serialization import ORIENT_RECORDS, frame_to_json, requested_orient
+from timeseries import records_frame, timeseries_store
+
+# Heavy dependencies are imported on first use to keep startup fast
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 # Configure logging
 logging.basicConfig(
@@ -29,22 +49,87 @@ profitability_bp = Blueprint("profitability", __name__, url_prefix="/profitabili
 DEFAULT_ANALYSIS_PERIOD_DAYS = 90
 DEFAULT_FORECAST_DAYS = 365
 DEFAULT_ETH_PRICE = 3500  # Default ETH price in USD
+DEFAULT_REWARDS_DAILY = 0.00175  # ETH per validator per day
+DEFAULT_REWARD_DECAY_RATE = 0.995  # 0.5% reduction in rewards per month
+DEFAULT_ETH_PRICE_GROWTH_RATE = 1.01  # 1% increase in ETH price per month
+MAX_FORECAST_MONTHS = 1200
+# Most rates per list and growth x decay x months of one scenario grid
+MAX_SCENARIO_RATES = 20
+MAX_SCENARIO_CELLS = 50000
+MAX_OPTIMIZATION_COUNT = 10000
+DEFAULT_SIMULATION_PATHS = 10000
+MAX_SIMULATION_PATHS = 100000
+# Most paths x months of one simulation, each array of that size is 8 MB
+MAX_SIMULATION_CELLS = 1000000
+SIMULATION_PERCENTILES = (5, 25, 50, 75, 95)
+SIMULATION_CACHE_SIZE = 32
+# Most months of all cached simulations, e.g. two at MAX_FORECAST_MONTHS
+SIMULATION_CACHE_MONTHS = 2400
+DEFAULT_PRICE_VOLATILITY_MONTHLY = 0.2  # Used until there is enough history
+DEFAULT_REWARD_VOLATILITY_MONTHLY = 0.05
 PROFITABILITY_DATA_DIR = os.environ.get(
     "PROFITABILITY_DATA_DIR", "/var/lib/ephemery/data/lido-csm/profitability"
 )
 CSM_API_ENDPOINT = os.environ.get("CSM_API_ENDPOINT", "http://localhost:9000")
+PERFORMANCE_REFRESH_INTERVAL = int(
+    os.environ.get("PERFORMANCE_REFRESH_INTERVAL", "3600")
+)
+PRICE_REFRESH_INTERVAL = int(os.environ.get("PRICE_REFRESH_INTERVAL", "300"))
 BEACON_API_ENDPOINT = os.environ.get("BEACON_API_ENDPOINT", "http://localhost:5052")
+PERFORMANCE_HISTORY_FILE = "performance_history.csv"
+PERFORMANCE_HISTORY_SERIES = "performance"
+PERFORMANCE_HISTORY_COLUMNS = [
+    "timestamp",
+    "validator_count",
+    "attestation_rate",
+    "proposal_rate",
+    "avg_balance",
+    "avg_rewards_daily",
+    "eth_price",
+]
 
 
 class ProfitabilityCalculator:
-    """Class for calculating validator profitability"""
+    """Class for calculating validator profitability
+
+    `performance_history` and `cost_inputs` are copy-on-write snapshots:
+    writers build new objects under `_write_lock` and swap them in with a
+    single assignment, so readers never block and never see torn state.
 
-    def __init__(self, data_dir: str = PROFITABILITY_DATA_DIR):
+    Performance history is kept per genesis, cost inputs and the price
+    cache are shared by every iteration.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = PROFITABILITY_DATA_DIR,
+        price_oracle: Optional[PriceOracle] = None,
+    ):
         self.data_dir = data_dir
+        self._write_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
         self.ensure_data_dir()
+        # History files written by earlier releases, imported once
+        self.history_files = genesis_tracker.store(
+            data_dir, legacy=(PERFORMANCE_HISTORY_FILE,)
+        )
+        self.cost_inputs_file = os.path.join(data_dir, "cost_inputs.json")
+        self._cost_inputs_mtime = self.cost_inputs_mtime()
         self.cost_inputs = self.load_cost_inputs()
+        # Read first, so samples stored during the load trigger a reload
+        self._history_revision = timeseries_store.revision(PERFORMANCE_HISTORY_SERIES)
         self.performance_history = self.load_performance_history()
-        self.eth_price = self.fetch_eth_price()
+        # The oracle only reads its disk cache here, prices are fetched
+        # by the ingestion scheduler or update_performance_history()
+        self.price_oracle = price_oracle or PriceOracle(
+            cache_file=os.path.join(self.data_dir, "eth_price.json")
+        )
+        # Whether the last fetch reached the CSM API (vs. placeholder data)
+        self.upstream_available = True
+        self._simulation_cache: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = (
+            OrderedDict()
+        )
+        genesis_tracker.on_rollover(self.reset_performance_history)
 
     def ensure_data_dir(self) -> None:
         """Ensure the data directory exists"""
@@ -52,7 +137,7 @@ class ProfitabilityCalculator:
 
     def load_cost_inputs(self) -> Dict[str, float]:
         """Load cost inputs from configuration"""
-        config_file = os.path.join(self.data_dir, "cost_inputs.json")
+        config_file = self.cost_inputs_file
 
         if not os.path.exists(config_file):
             # Create default cost inputs
@@ -68,13 +153,14 @@ class ProfitabilityCalculator:
                 "validator_exit_cost": 100.0,
             }
 
-            with open(config_file, "w") as f:
-                json.dump(default_costs, f, indent=2)
+            write_json_atomic(config_file, default_costs, indent=2)
 
             return default_costs
 
         try:
-            with open(config_file, "r") as f:
+            with instrumentation.file_span("load", config_file), open(
+                config_file, "r"
+            ) as f:
                 return json.load(f)
         except Exception as e:
             logger.error(f"Error loading cost inputs: {e}")
@@ -93,76 +179,99 @@ class ProfitabilityCalculator:
 
     def save_cost_inputs(self, cost_inputs: Dict[str, float]) -> None:
         """Save cost inputs to configuration"""
-        config_file = os.path.join(self.data_dir, "cost_inputs.json")
+        config_file = self.cost_inputs_file
         try:
-            with open(config_file, "w") as f:
-                json.dump(cost_inputs, f, indent=2)
-            self.cost_inputs = cost_inputs
+            cost_inputs = dict(cost_inputs)
+            with self._write_lock:
+                write_json_atomic(config_file, cost_inputs, indent=2)
+                self.cost_inputs = cost_inputs
+                self._cost_inputs_mtime = self.cost_inputs_mtime()
         except Exception as e:
             logger.error(f"Error saving cost inputs: {e}")
 
-    def load_performance_history(self) -> pd.DataFrame:
-        """Load historical performance data"""
-        history_file = os.path.join(self.data_dir, "performance_history.csv")
-
-        if not os.path.exists(history_file):
-            # Create empty dataframe with expected columns
-            df = pd.DataFrame(
-                columns=[
-                    "timestamp",
-                    "validator_count",
-                    "attestation_rate",
-                    "proposal_rate",
-                    "avg_balance",
-                    "avg_rewards_daily",
-                    "eth_price",
-                ]
+    def cost_inputs_mtime(self) -> Optional[int]:
+        """Modification time of the cost inputs file, None if it is missing"""
+        try:
+            return os.stat(self.cost_inputs_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload_cost_inputs(self) -> None:
+        """Pick up cost inputs another worker process saved"""
+        mtime = self.cost_inputs_mtime()
+        if mtime is None or mtime == self._cost_inputs_mtime:
+            return
+        cost_inputs = self.load_cost_inputs()
+        with self._write_lock:
+            self.cost_inputs = cost_inputs
+            self._cost_inputs_mtime = mtime
+
+    def import_history_files(self) -> None:
+        """Import performance_history.csv files into the time-series store"""
+
+        def importer(genesis: str, files: List[Tuple[str, bytes]]) -> int:
+            frame = pd.read_csv(io.BytesIO(files[0][1]), parse_dates=["timestamp"])
+            return timeseries_store.append_frame(
+                PERFORMANCE_HISTORY_SERIES, frame, genesis
             )
-            df.to_csv(history_file, index=False)
-            return df
 
+        timeseries_store.migrate_files(
+            self.history_files,
+            PERFORMANCE_HISTORY_FILE,
+            PERFORMANCE_HISTORY_SERIES,
+            importer,
+        )
+
+    def load_performance_history(self) -> pd.DataFrame:
+        """Load historical performance data of the current genesis"""
+        self.import_history_files()
         try:
-            return pd.read_csv(history_file, parse_dates=["timestamp"])
-        except Exception as e:
+            records = timeseries_store.records(PERFORMANCE_HISTORY_SERIES)
+        except sqlite3.Error as e:
             logger.error(f"Error loading performance history: {e}")
-            # Return empty dataframe
-            return pd.DataFrame(
-                columns=[
-                    "timestamp",
-                    "validator_count",
-                    "attestation_rate",
-                    "proposal_rate",
-                    "avg_balance",
-                    "avg_rewards_daily",
-                    "eth_price",
-                ]
-            )
-
-    def save_performance_history(self) -> None:
-        """Save performance history to disk"""
-        history_file = os.path.join(self.data_dir, "performance_history.csv")
+            records = []
+        return records_frame(records, PERFORMANCE_HISTORY_COLUMNS)
+
+    def reload_performance_history(self) -> None:
+        """Reload the history if another process changed it in the store"""
+        revision = timeseries_store.revision(PERFORMANCE_HISTORY_SERIES)
+        if revision == self._history_revision:
+            return
+        history = self.load_performance_history()
+        with self._write_lock:
+            self.performance_history = history
+            self._history_revision = revision
+
+    def save_performance_sample(self, row: Dict[str, Any]) -> None:
+        """Append one performance sample to the time-series store"""
         try:
-            self.performance_history.to_csv(history_file, index=False)
-        except Exception as e:
+            timeseries_store.append(PERFORMANCE_HISTORY_SERIES, row["timestamp"], row)
+        except sqlite3.Error as e:
             logger.error(f"Error saving performance history: {e}")
 
+    def reset_performance_history(self, previous_genesis: int, genesis: int) -> None:
+        """Start an empty history when the network resets"""
+        with self._write_lock:
+            self.performance_history = self.performance_history.iloc[0:0]
+        with self._cache_lock:
+            self._simulation_cache.clear()
+
+    @property
+    def eth_price(self) -> float:
+        """Current ETH price from the oracle cache, never blocks on the network"""
+        return float(self.price_oracle.get_price(self.last_known_eth_price()))
+
+    def last_known_eth_price(self) -> float:
+        """Last price recorded in the performance history, or the default"""
+        history = self.performance_history
+        if not history.empty:
+            return float(history["eth_price"].iloc[-1])
+        return DEFAULT_ETH_PRICE
+
     def fetch_eth_price(self) -> float:
-        """Fetch current ETH price from API"""
-        try:
-            # Try to fetch from a price API
-            response = requests.get(
-                "https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd",
-                timeout=5,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return float(data["ethereum"]["usd"])
-        except Exception as e:
-            logger.warning(f"Error fetching ETH price: {e}")
-            # Use default or last known price
-            if not self.performance_history.empty:
-                return self.performance_history["eth_price"].iloc[-1]
-            return DEFAULT_ETH_PRICE
+        """Refresh the ETH price through the oracle if the cached one expired"""
+        price = self.price_oracle.refresh_if_stale()
+        return float(price) if price is not None else self.last_known_eth_price()
 
     def fetch_validator_performance(self) -> Dict[str, Any]:
         """Fetch current validator performance metrics"""
@@ -172,9 +281,11 @@ class ProfitabilityCalculator:
                 f"{CSM_API_ENDPOINT}/api/v1/validators/performance", timeout=10
             )
             response.raise_for_status()
+            self.upstream_available = True
             return response.json()
         except Exception as e:
             logger.warning(f"Error fetching validator performance: {e}")
+            self.upstream_available = False
             # Return dummy data for development/testing
             return {
                 "validator_count": 10,
@@ -188,6 +299,7 @@ class ProfitabilityCalculator:
     def update_performance_history(self) -> None:
         """Update performance history with current data"""
         current_data = self.fetch_validator_performance()
+        eth_price = self.fetch_eth_price()
 
         # Convert timestamp to datetime
         if isinstance(current_data.get("timestamp"), int):
@@ -196,73 +308,72 @@ class ProfitabilityCalculator:
             timestamp = pd.Timestamp.now()
 
         # Create new row
-        new_row = pd.DataFrame(
-            [
+        row = {
+            "timestamp": timestamp,
+            "validator_count": current_data.get("validator_count", 0),
+            "attestation_rate": current_data.get("attestation_rate", 0),
+            "proposal_rate": current_data.get("proposal_rate", 0),
+            "avg_balance": current_data.get("avg_balance", 32),
+            "avg_rewards_daily": current_data.get("avg_rewards_daily", 0),
+            "eth_price": eth_price,
+        }
+        new_row = pd.DataFrame([row], columns=PERFORMANCE_HISTORY_COLUMNS)
+
+        with self._write_lock:
+            # Append to history, remove duplicates and sort, then publish
+            history = pd.concat([self.performance_history, new_row], ignore_index=True)
+            self.performance_history = history.drop_duplicates(
+                subset=["timestamp"]
+            ).sort_values("timestamp")
+
+        # Only the new sample is written
+        self.save_performance_sample(row)
+
+    def cost_input_values(
+        self, cost_inputs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Stored cost inputs with optional overrides (scalars or arrays)"""
+        merged = dict(self.cost_inputs)
+        if cost_inputs:
+            merged.update(
                 {
-                    "timestamp": timestamp,
-                    "validator_count": current_data.get("validator_count", 0),
-                    "attestation_rate": current_data.get("attestation_rate", 0),
-                    "proposal_rate": current_data.get("proposal_rate", 0),
-                    "avg_balance": current_data.get("avg_balance", 32),
-                    "avg_rewards_daily": current_data.get("avg_rewards_daily", 0),
-                    "eth_price": self.eth_price,
+                    name: np.asarray(value, dtype=float)
+                    for name, value in cost_inputs.items()
                 }
-            ]
-        )
-
-        # Append to history
-        self.performance_history = pd.concat(
-            [self.performance_history, new_row], ignore_index=True
-        )
-
-        # Remove duplicates and sort
-        self.performance_history = self.performance_history.drop_duplicates(
-            subset=["timestamp"]
-        ).sort_values("timestamp")
+            )
+        return merged
 
-        # Save updated history
-        self.save_performance_history()
+    def cost_components(
+        self, validator_counts: Any, cost_inputs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Price-independent monthly cost components for one or more counts"""
+        counts = np.asarray(validator_counts, dtype=float)
+        inputs = self.cost_input_values(cost_inputs)
 
-    def calculate_monthly_costs(self, validator_count: int = 1) -> Dict[str, float]:
-        """Calculate monthly operational costs"""
         # Fixed costs (per validator)
-        hardware_cost = (
-            self.cost_inputs.get("hardware_cost_monthly", 100.0) * validator_count
-        )
+        hardware_cost = inputs.get("hardware_cost_monthly", 100.0) * counts
 
         # Variable costs (scale with validator count but not linearly)
-        power_cost = self.cost_inputs.get("power_cost_monthly", 20.0) * (
-            1 + (validator_count - 1) * 0.5
-        )
-        bandwidth_cost = self.cost_inputs.get("bandwidth_cost_monthly", 30.0) * (
-            1 + (validator_count - 1) * 0.3
+        power_cost = inputs.get("power_cost_monthly", 20.0) * (1 + (counts - 1) * 0.5)
+        bandwidth_cost = inputs.get("bandwidth_cost_monthly", 30.0) * (
+            1 + (counts - 1) * 0.3
         )
 
         # Maintenance costs
-        maintenance_hours = self.cost_inputs.get("maintenance_hours_monthly", 5.0) * (
-            1 + (validator_count - 1) * 0.2
+        maintenance_hours = inputs.get("maintenance_hours_monthly", 5.0) * (
+            1 + (counts - 1) * 0.2
         )
-        maintenance_cost = maintenance_hours * self.cost_inputs.get(
+        maintenance_cost = maintenance_hours * inputs.get(
             "maintenance_hourly_rate", 50.0
         )
 
         # Bond opportunity cost
-        bond_amount = 2.0 * validator_count  # Assuming 2 ETH bond per validator
-        annual_opportunity_percentage = self.cost_inputs.get(
+        bond_amount = 2.0 * counts  # Assuming 2 ETH bond per validator
+        annual_opportunity_percentage = inputs.get(
             "bond_opportunity_cost_annual_percentage", 5.0
         )
         monthly_opportunity_percentage = annual_opportunity_percentage / 12
         bond_opportunity_cost_eth = bond_amount * (monthly_opportunity_percentage / 100)
-        bond_opportunity_cost_usd = bond_opportunity_cost_eth * self.eth_price
-
-        # Total costs
-        total_cost_usd = (
-            hardware_cost
-            + power_cost
-            + bandwidth_cost
-            + maintenance_cost
-            + bond_opportunity_cost_usd
-        )
 
         return {
             "hardware_cost_usd": hardware_cost,
@@ -270,27 +381,50 @@ class ProfitabilityCalculator:
             "bandwidth_cost_usd": bandwidth_cost,
             "maintenance_cost_usd": maintenance_cost,
             "bond_opportunity_cost_eth": bond_opportunity_cost_eth,
+            "fixed_cost_usd": hardware_cost
+            + power_cost
+            + bandwidth_cost
+            + maintenance_cost,
+        }
+
+    def calculate_monthly_costs(self, validator_count: int = 1) -> Dict[str, float]:
+        """Calculate monthly operational costs"""
+        components = self.cost_components(validator_count)
+        bond_opportunity_cost_eth = float(components["bond_opportunity_cost_eth"])
+        bond_opportunity_cost_usd = bond_opportunity_cost_eth * self.eth_price
+
+        # Total costs
+        total_cost_usd = float(components["fixed_cost_usd"]) + bond_opportunity_cost_usd
+
+        return {
+            "hardware_cost_usd": float(components["hardware_cost_usd"]),
+            "power_cost_usd": float(components["power_cost_usd"]),
+            "bandwidth_cost_usd": float(components["bandwidth_cost_usd"]),
+            "maintenance_cost_usd": float(components["maintenance_cost_usd"]),
+            "bond_opportunity_cost_eth": bond_opportunity_cost_eth,
             "bond_opportunity_cost_usd": bond_opportunity_cost_usd,
             "total_cost_usd": total_cost_usd,
             "total_cost_eth": total_cost_usd / self.eth_price,
         }
 
-    def calculate_monthly_revenue(self, validator_count: int = 1) -> Dict[str, float]:
-        """Calculate monthly revenue based on historical performance"""
-        if self.performance_history.empty:
+    def average_daily_rewards(self) -> float:
+        """Average daily rewards per validator over the last 30 days of history"""
+        history = self.performance_history
+        if history.empty:
             # Use default values if no history
-            avg_rewards_daily = 0.00175  # ETH per validator per day
-        else:
-            # Calculate average daily rewards from recent history (last 30 days)
-            cutoff_time = pd.Timestamp.now() - pd.Timedelta(days=30)
-            recent_data = self.performance_history[
-                self.performance_history["timestamp"] >= cutoff_time
-            ]
+            return DEFAULT_REWARDS_DAILY
 
-            if recent_data.empty:
-                recent_data = self.performance_history
+        cutoff_time = pd.Timestamp.now() - pd.Timedelta(days=30)
+        recent_data = history[history["timestamp"] >= cutoff_time]
 
-            avg_rewards_daily = recent_data["avg_rewards_daily"].mean()
+        if recent_data.empty:
+            recent_data = history
+
+        return float(recent_data["avg_rewards_daily"].mean())
+
+    def calculate_monthly_revenue(self, validator_count: int = 1) -> Dict[str, float]:
+        """Calculate monthly revenue based on historical performance"""
+        avg_rewards_daily = self.average_daily_rewards()
 
         # Calculate monthly revenue
         monthly_rewards_eth = avg_rewards_daily * 30 * validator_count
@@ -346,100 +480,379 @@ class ProfitabilityCalculator:
         }
 
     def forecast_profitability(
-        self, validator_count: int = 1, months: int = 12
+        self,
+        validator_count: int = 1,
+        months: int = 12,
+        eth_price_growth_rate: float = DEFAULT_ETH_PRICE_GROWTH_RATE,
+        reward_decay_rate: float = DEFAULT_REWARD_DECAY_RATE,
     ) -> List[Dict[str, Any]]:
         """Forecast profitability over time"""
-        # Initial profitability calculation
-        initial_calc = self.calculate_profitability(validator_count)
-
-        # Forecast parameters
-        reward_decay_rate = 0.995  # 0.5% reduction in rewards per month
-        eth_price_growth_rate = 1.01  # 1% increase in ETH price per month
-
-        # Initialize forecast
-        forecast = []
-
-        # Current values
-        current_eth_price = self.eth_price
-        current_rewards_daily = initial_calc["revenue"]["avg_rewards_daily_eth"]
-
-        for month in range(1, months + 1):
-            # Update parameters for this month
-            current_rewards_daily *= reward_decay_rate
-            current_eth_price *= eth_price_growth_rate
-
-            # Create temporary calculator with updated values
-            temp_calculator = ProfitabilityCalculator(self.data_dir)
-            temp_calculator.cost_inputs = self.cost_inputs
-            temp_calculator.eth_price = current_eth_price
-
-            # Create temporary performance history with projected rewards
-            temp_df = pd.DataFrame(
-                [
-                    {
-                        "timestamp": pd.Timestamp.now(),
-                        "validator_count": validator_count,
-                        "attestation_rate": 0.99,
-                        "proposal_rate": 0.98,
-                        "avg_balance": 32 + (current_rewards_daily * 30 * month),
-                        "avg_rewards_daily": current_rewards_daily,
-                        "eth_price": current_eth_price,
-                    }
-                ]
+        grid = self.forecast_scenarios(
+            validator_count, months, [eth_price_growth_rate], [reward_decay_rate]
+        )
+        scenario = grid["scenarios"][0]
+        fields = [
+            "eth_price_usd",
+            "avg_rewards_daily_eth",
+            "monthly_profit_eth",
+            "monthly_profit_usd",
+            "cumulative_profit_eth",
+            "cumulative_profit_usd",
+            "roi_percentage",
+        ]
+
+        return [
+            {"month": month, **dict(zip(fields, values))}
+            for month, *values in zip(grid["months"], *(scenario[f] for f in fields))
+        ]
+
+    def forecast_scenarios(
+        self,
+        validator_count: int = 1,
+        months: int = 12,
+        eth_price_growth_rates: Optional[List[float]] = None,
+        reward_decay_rates: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """Forecast every (price growth, reward decay) combination at once.
+
+        All months and scenarios are evaluated as one NumPy broadcast over a
+        (growth, decay, month) grid using the current price and rewards.
+        Raises ValueError when the grid exceeds MAX_SCENARIO_CELLS.
+        """
+        if eth_price_growth_rates is None:
+            eth_price_growth_rates = [DEFAULT_ETH_PRICE_GROWTH_RATE]
+        if reward_decay_rates is None:
+            reward_decay_rates = [DEFAULT_REWARD_DECAY_RATE]
+        months = max(1, min(int(months), MAX_FORECAST_MONTHS))
+        cells = len(eth_price_growth_rates) * len(reward_decay_rates) * months
+        if cells > MAX_SCENARIO_CELLS:
+            raise ValueError(
+                f"growth rates x decay rates x months must be at most "
+                f"{MAX_SCENARIO_CELLS}, got {cells}"
             )
-            temp_calculator.performance_history = temp_df
 
-            # Calculate profitability for this month
-            month_calc = temp_calculator.calculate_profitability(validator_count)
+        month_index = np.arange(1, months + 1, dtype=float)
+        growth = np.asarray(eth_price_growth_rates, dtype=float)[:, None, None]
+        decay = np.asarray(reward_decay_rates, dtype=float)[None, :, None]
 
-            # Add to forecast
-            forecast.append(
-                {
-                    "month": month,
-                    "eth_price_usd": current_eth_price,
-                    "avg_rewards_daily_eth": current_rewards_daily,
-                    "monthly_profit_eth": month_calc["monthly_profit_eth"],
-                    "monthly_profit_usd": month_calc["monthly_profit_usd"],
-                    "cumulative_profit_eth": month_calc["monthly_profit_eth"] * month,
-                    "cumulative_profit_usd": month_calc["monthly_profit_usd"] * month,
-                    "roi_percentage": month_calc["monthly_roi_percentage"] * month,
+        # Compounded price and rewards for every scenario and month
+        eth_price = self.eth_price * growth**month_index
+        rewards_daily = self.average_daily_rewards() * decay**month_index
+        eth_price, rewards_daily = np.broadcast_arrays(eth_price, rewards_daily)
+
+        components = self.cost_components(validator_count)
+        total_cost_usd = (
+            components["fixed_cost_usd"]
+            + components["bond_opportunity_cost_eth"] * eth_price
+        )
+        monthly_rewards_eth = rewards_daily * 30 * validator_count
+        monthly_profit_usd = monthly_rewards_eth * eth_price - total_cost_usd
+        monthly_profit_eth = monthly_rewards_eth - total_cost_usd / eth_price
+        monthly_roi_percentage = monthly_profit_eth / (validator_count * 32) * 100
+
+        series = {
+            "eth_price_usd": eth_price,
+            "avg_rewards_daily_eth": rewards_daily,
+            "monthly_profit_eth": monthly_profit_eth,
+            "monthly_profit_usd": monthly_profit_usd,
+            "cumulative_profit_eth": np.cumsum(monthly_profit_eth, axis=-1),
+            "cumulative_profit_usd": np.cumsum(monthly_profit_usd, axis=-1),
+            "roi_percentage": np.cumsum(monthly_roi_percentage, axis=-1),
+        }
+
+        scenarios = []
+        for i, growth_rate in enumerate(eth_price_growth_rates):
+            for j, decay_rate in enumerate(reward_decay_rates):
+                scenario = {
+                    "eth_price_growth_rate": float(growth_rate),
+                    "reward_decay_rate": float(decay_rate),
                 }
+                scenario.update(
+                    {name: values[i, j].tolist() for name, values in series.items()}
+                )
+                scenarios.append(scenario)
+
+        return {
+            "validator_count": validator_count,
+            "months": month_index.astype(int).tolist(),
+            "scenarios": scenarios,
+        }
+
+    def historical_volatility(self) -> Dict[str, float]:
+        """Monthly log-return volatility of ETH price and rewards from history"""
+        volatility = {
+            "eth_price": DEFAULT_PRICE_VOLATILITY_MONTHLY,
+            "avg_rewards_daily": DEFAULT_REWARD_VOLATILITY_MONTHLY,
+            "correlation": 0.0,
+        }
+        history = self.performance_history
+        if history.empty:
+            return volatility
+
+        daily = (
+            history.set_index("timestamp")[["eth_price", "avg_rewards_daily"]]
+            .astype(float)
+            .resample("D")
+            .mean()
+            .dropna()
+        )
+        daily = daily[(daily > 0).all(axis=1)]
+        returns = np.diff(np.log(daily.to_numpy()), axis=0)
+        if len(returns) < 2:
+            return volatility
+
+        # Scale daily log-return volatility to the monthly forecast step
+        sigma = returns.std(axis=0, ddof=1) * np.sqrt(30)
+        volatility["eth_price"] = float(sigma[0])
+        volatility["avg_rewards_daily"] = float(sigma[1])
+        if sigma.all():
+            volatility["correlation"] = float(np.corrcoef(returns.T)[0, 1])
+        return volatility
+
+    def simulate_profitability(
+        self,
+        validator_count: int = 1,
+        months: int = 60,
+        paths: int = DEFAULT_SIMULATION_PATHS,
+        seed: Optional[int] = None,
+        eth_price_growth_rate: float = DEFAULT_ETH_PRICE_GROWTH_RATE,
+        reward_decay_rate: float = DEFAULT_REWARD_DECAY_RATE,
+    ) -> Dict[str, Any]:
+        """Monte Carlo simulation of profit, ROI and break-even time.
+
+        ETH price and rewards follow correlated geometric random walks whose
+        median matches the deterministic forecast and whose volatility comes
+        from performance_history. Results are cached per (inputs, seed).
+        Raises ValueError when paths x months exceeds MAX_SIMULATION_CELLS.
+        """
+        months = max(1, min(int(months), MAX_FORECAST_MONTHS))
+        paths = max(1, min(int(paths), MAX_SIMULATION_PATHS))
+        if paths * months > MAX_SIMULATION_CELLS:
+            raise ValueError(
+                f"paths x months must be at most {MAX_SIMULATION_CELLS}, "
+                f"got {paths} x {months}"
             )
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % 2**32)
 
-        return forecast
+        inputs = {
+            "validator_count": validator_count,
+            "months": months,
+            "paths": paths,
+            "eth_price_growth_rate": eth_price_growth_rate,
+            "reward_decay_rate": reward_decay_rate,
+            "eth_price_usd": self.eth_price,
+            "avg_rewards_daily_eth": self.average_daily_rewards(),
+            "volatility": self.historical_volatility(),
+            "cost_inputs": self.cost_inputs,
+        }
+        inputs_hash = hashlib.sha256(
+            json.dumps(inputs, sort_keys=True, default=float).encode()
+        ).hexdigest()
+        cache_key = (inputs_hash, seed)
+        with self._cache_lock:
+            if cache_key in self._simulation_cache:
+                self._simulation_cache.move_to_end(cache_key)
+                return self._simulation_cache[cache_key]
+
+        volatility = inputs["volatility"]
+        rng = np.random.default_rng(seed)
+        shocks = rng.standard_normal((2, paths, months))
+        # Correlate reward shocks with price shocks
+        rho = volatility["correlation"]
+        shocks[1] = rho * shocks[0] + np.sqrt(1 - rho**2) * shocks[1]
+
+        eth_price = self.eth_price * np.exp(
+            np.cumsum(
+                np.log(eth_price_growth_rate) + volatility["eth_price"] * shocks[0],
+                axis=1,
+            )
+        )
+        rewards_daily = inputs["avg_rewards_daily_eth"] * np.exp(
+            np.cumsum(
+                np.log(reward_decay_rate) + volatility["avg_rewards_daily"] * shocks[1],
+                axis=1,
+            )
+        )
 
-    def calculate_optimal_validator_count(self) -> Dict[str, Any]:
-        """Calculate the optimal number of validators for maximum profitability"""
-        max_profit_usd = float("-inf")
-        optimal_count = 1
-        results = {}
-
-        # Test different validator counts
-        for count in range(1, 21):  # Test 1-20 validators
-            profit_calc = self.calculate_profitability(count)
-            monthly_profit_usd = profit_calc["monthly_profit_usd"]
-
-            results[count] = {
-                "monthly_profit_usd": monthly_profit_usd,
-                "monthly_profit_eth": profit_calc["monthly_profit_eth"],
-                "roi_percentage": profit_calc["annual_roi_percentage"],
+        components = self.cost_components(validator_count)
+        total_cost_usd = (
+            components["fixed_cost_usd"]
+            + components["bond_opportunity_cost_eth"] * eth_price
+        )
+        monthly_rewards_eth = rewards_daily * 30 * validator_count
+        monthly_profit_usd = monthly_rewards_eth * eth_price - total_cost_usd
+        monthly_profit_eth = monthly_rewards_eth - total_cost_usd / eth_price
+        cumulative_profit_usd = np.cumsum(monthly_profit_usd, axis=1)
+        roi_percentage = (
+            np.cumsum(monthly_profit_eth, axis=1) / (validator_count * 32) * 100
+        )
+
+        # First month in which cumulative profit covers the setup cost
+        setup_cost_usd = (
+            self.cost_inputs.get("validator_setup_cost", 500.0) * validator_count
+        )
+        covered = cumulative_profit_usd >= setup_cost_usd
+        broke_even = covered.any(axis=1)
+        break_even_months = np.where(broke_even, covered.argmax(axis=1) + 1.0, np.inf)
+
+        def bands(values: np.ndarray) -> Dict[str, List[float]]:
+            levels = np.percentile(values, SIMULATION_PERCENTILES, axis=0)
+            return {
+                f"p{q}": level.tolist()
+                for q, level in zip(SIMULATION_PERCENTILES, levels)
             }
 
-            if monthly_profit_usd > max_profit_usd:
-                max_profit_usd = monthly_profit_usd
-                optimal_count = count
+        # inverted_cdf never interpolates, so unreached break-even stays inf
+        break_even_levels = np.percentile(
+            break_even_months, SIMULATION_PERCENTILES, method="inverted_cdf"
+        )
+
+        result = {
+            "validator_count": validator_count,
+            "months": list(range(1, months + 1)),
+            "paths": paths,
+            "seed": seed,
+            "inputs_hash": inputs_hash,
+            "volatility": volatility,
+            "percentiles": list(SIMULATION_PERCENTILES),
+            "bands": {
+                "eth_price_usd": bands(eth_price),
+                "monthly_profit_usd": bands(monthly_profit_usd),
+                "cumulative_profit_usd": bands(cumulative_profit_usd),
+                "roi_percentage": bands(roi_percentage),
+            },
+            "break_even_months": {
+                f"p{q}": float(level) if np.isfinite(level) else None
+                for q, level in zip(SIMULATION_PERCENTILES, break_even_levels)
+            },
+            "break_even_probability": float(broke_even.mean()),
+        }
+
+        with self._cache_lock:
+            self._simulation_cache[cache_key] = result
+            cached_months = sum(
+                len(cached["months"]) for cached in self._simulation_cache.values()
+            )
+            while len(self._simulation_cache) > 1 and (
+                len(self._simulation_cache) > SIMULATION_CACHE_SIZE
+                or cached_months > SIMULATION_CACHE_MONTHS
+            ):
+                _, evicted = self._simulation_cache.popitem(last=False)
+                cached_months -= len(evicted["months"])
+        return result
+
+    def evaluate_validator_counts(
+        self, validator_counts: Any, cost_inputs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Vectorized costs, revenue and ROI for an array of validator counts.
+
+        Cost input overrides may be arrays; they broadcast against the counts,
+        e.g. a (K, 1) override with (N,) counts yields (K, N) results.
+        """
+        counts = np.asarray(validator_counts, dtype=float)
+        inputs = self.cost_input_values(cost_inputs)
+        components = self.cost_components(counts, cost_inputs)
+
+        total_cost_usd = (
+            components["fixed_cost_usd"]
+            + components["bond_opportunity_cost_eth"] * self.eth_price
+        )
+        total_cost_eth = total_cost_usd / self.eth_price
+        monthly_rewards_eth = self.average_daily_rewards() * 30 * counts
+        monthly_rewards_usd = monthly_rewards_eth * self.eth_price
+
+        monthly_profit_eth = monthly_rewards_eth - total_cost_eth
+        monthly_profit_usd = monthly_rewards_usd - total_cost_usd
+        monthly_roi_percentage = monthly_profit_eth / (counts * 32) * 100
+
+        setup_cost_usd = inputs.get("validator_setup_cost", 500.0) * counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            break_even_months = np.where(
+                monthly_profit_usd > 0, setup_cost_usd / monthly_profit_usd, np.inf
+            )
+
+        return {
+            "validator_count": np.broadcast_to(counts, monthly_profit_usd.shape),
+            "total_cost_usd": total_cost_usd,
+            "total_cost_eth": total_cost_eth,
+            "monthly_rewards_eth": monthly_rewards_eth,
+            "monthly_rewards_usd": monthly_rewards_usd,
+            "monthly_profit_eth": monthly_profit_eth,
+            "monthly_profit_usd": monthly_profit_usd,
+            "monthly_roi_percentage": monthly_roi_percentage,
+            "annual_roi_percentage": monthly_roi_percentage * 12,
+            "break_even_months": break_even_months,
+        }
+
+    def calculate_optimal_validator_count(
+        self,
+        min_count: int = 1,
+        max_count: int = 20,
+        cost_inputs: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Calculate the optimal number of validators for maximum profitability"""
+        max_count = min(max(max_count, 1), MAX_OPTIMIZATION_COUNT)
+        min_count = min(max(min_count, 1), max_count)
+        counts = np.arange(min_count, max_count + 1)
+
+        evaluation = self.evaluate_validator_counts(counts, cost_inputs)
+        monthly_profit_usd = evaluation["monthly_profit_usd"]
+        best = int(np.argmax(monthly_profit_usd))
+
+        results = {
+            int(count): {
+                "monthly_profit_usd": profit_usd,
+                "monthly_profit_eth": profit_eth,
+                "roi_percentage": roi,
+            }
+            for count, profit_usd, profit_eth, roi in zip(
+                counts.tolist(),
+                monthly_profit_usd.tolist(),
+                evaluation["monthly_profit_eth"].tolist(),
+                evaluation["annual_roi_percentage"].tolist(),
+            )
+        }
 
         return {
-            "optimal_validator_count": optimal_count,
-            "max_monthly_profit_usd": max_profit_usd,
+            "optimal_validator_count": int(counts[best]),
+            "max_monthly_profit_usd": float(monthly_profit_usd[best]),
             "results_by_count": results,
         }
 
-    def get_profitability_analysis(self, validator_count: int = 1) -> Dict[str, Any]:
-        """Get comprehensive profitability analysis"""
-        # Update performance history with current data
-        self.update_performance_history()
+    def sweep_cost_input(
+        self,
+        name: str,
+        values: List[float],
+        min_count: int = 1,
+        max_count: int = 20,
+    ) -> Dict[str, Any]:
+        """Optimal validator count for each value of one cost input"""
+        max_count = min(max(max_count, 1), MAX_OPTIMIZATION_COUNT)
+        min_count = min(max(min_count, 1), max_count)
+        counts = np.arange(min_count, max_count + 1)
+
+        # One (values, counts) grid instead of an optimization run per value
+        swept = np.asarray(values, dtype=float)[:, None]
+        evaluation = self.evaluate_validator_counts(counts, {name: swept})
+        monthly_profit_usd = evaluation["monthly_profit_usd"]
+        best = np.argmax(monthly_profit_usd, axis=1)
+        rows = np.arange(len(values))
 
+        return {
+            "cost_input": name,
+            "values": swept[:, 0].tolist(),
+            "optimal_validator_count": counts[best].tolist(),
+            "max_monthly_profit_usd": monthly_profit_usd[rows, best].tolist(),
+            "annual_roi_percentage": evaluation["annual_roi_percentage"][
+                rows, best
+            ].tolist(),
+        }
+
+    def get_profitability_analysis(
+        self, validator_count: int = 1, orient: str = ORIENT_RECORDS
+    ) -> Dict[str, Any]:
+        """Get comprehensive profitability analysis"""
         # Calculate current profitability
         profitability = self.calculate_profitability(validator_count)
 
@@ -451,23 +864,15 @@ class ProfitabilityCalculator:
 
         # Get historical performance
         history_data = []
-        if not self.performance_history.empty:
+        history = self.performance_history
+        if not history.empty:
             # Resample to daily data for UI display
             daily_data = (
-                self.performance_history.set_index("timestamp")
-                .resample("D")
-                .mean()
-                .reset_index()
+                history.set_index("timestamp").resample("D").mean().reset_index()
+            )
+            history_data = frame_to_json(
+                daily_data, ["timestamp", "avg_rewards_daily", "eth_price"], orient
             )
-
-            for _, row in daily_data.iterrows():
-                history_data.append(
-                    {
-                        "timestamp": row["timestamp"].isoformat(),
-                        "avg_rewards_daily": row["avg_rewards_daily"],
-                        "eth_price": row["eth_price"],
-                    }
-                )
 
         return {
             "current_profitability": profitability,
@@ -478,8 +883,41 @@ class ProfitabilityCalculator:
         }
 
 
-# Initialize calculator instance
-profitability_calculator = ProfitabilityCalculator()
+# Calculator instance, created on first use or by the blueprint warmup
+profitability_calculator = LazyObject(
+    ProfitabilityCalculator, "profitability_calculator"
+)
+
+
+def collect_performance_data() -> bool:
+    """Scheduled performance sample collection, False when the CSM API is down"""
+    profitability_calculator.update_performance_history()
+    return profitability_calculator.upstream_available
+
+
+def refresh_eth_price() -> bool:
+    """Scheduled ETH price refresh, False while no source is reachable"""
+    oracle = profitability_calculator.price_oracle
+    oracle.refresh_if_stale()
+    return not oracle.is_stale
+
+
+def follow_performance_data() -> None:
+    """Pick up the samples the leader process collected"""
+    profitability_calculator.reload_performance_history()
+
+
+def follow_eth_price() -> None:
+    """Pick up the price the leader process cached on disk"""
+    profitability_calculator.price_oracle.load_cache()
+
+
+@profitability_bp.before_request
+def reload_cost_inputs():
+    """Serve cost inputs saved through another worker process"""
+    # Until the calculator is constructed, it loads the current file anyway
+    if profitability_calculator.ready:
+        profitability_calculator.reload_cost_inputs()
 
 
 @profitability_bp.route("/")
@@ -492,7 +930,11 @@ def index():
 def get_profitability_analysis():
     """API endpoint to get profitability analysis"""
     validator_count = request.args.get("validator_count", 1, type=int)
-    return jsonify(profitability_calculator.get_profitability_analysis(validator_count))
+    return jsonify(
+        profitability_calculator.get_profitability_analysis(
+            validator_count, requested_orient()
+        )
+    )
 
 
 @profitability_bp.route("/api/forecast")
@@ -500,15 +942,137 @@ def get_forecast():
     """API endpoint to get profitability forecast"""
     validator_count = request.args.get("validator_count", 1, type=int)
     months = request.args.get("months", 12, type=int)
+    eth_price_growth_rate = request.args.get(
+        "eth_price_growth_rate", DEFAULT_ETH_PRICE_GROWTH_RATE, type=float
+    )
+    reward_decay_rate = request.args.get(
+        "reward_decay_rate", DEFAULT_REWARD_DECAY_RATE, type=float
+    )
     return jsonify(
-        profitability_calculator.forecast_profitability(validator_count, months)
+        profitability_calculator.forecast_profitability(
+            validator_count, months, eth_price_growth_rate, reward_decay_rate
+        )
+    )
+
+
+def parse_rate_list(name: str, default: float) -> List[float]:
+    """Parse a comma-separated list of rates from the query string.
+
+    Raises ValueError for more than MAX_SCENARIO_RATES rates and for values
+    that are not finite numbers.
+    """
+    raw = request.args.get(name)
+    if not raw:
+        return [default]
+    rates = [float(value) for value in raw.split(",") if value.strip()]
+    if len(rates) > MAX_SCENARIO_RATES:
+        raise ValueError(f"{name} accepts at most {MAX_SCENARIO_RATES} rates")
+    if not all(math.isfinite(rate) for rate in rates):
+        raise ValueError(f"{name} must be finite numbers")
+    return rates
+
+
+@profitability_bp.route("/api/forecast/scenarios")
+def get_forecast_scenarios():
+    """API endpoint to forecast a grid of price growth and reward decay scenarios"""
+    validator_count = request.args.get("validator_count", 1, type=int)
+    months = request.args.get("months", 60, type=int)
+    try:
+        eth_price_growth_rates = parse_rate_list(
+            "eth_price_growth_rates", DEFAULT_ETH_PRICE_GROWTH_RATE
+        )
+        reward_decay_rates = parse_rate_list(
+            "reward_decay_rates", DEFAULT_REWARD_DECAY_RATE
+        )
+        scenarios = profitability_calculator.forecast_scenarios(
+            validator_count, months, eth_price_growth_rates, reward_decay_rates
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(scenarios)
+
+
+@profitability_bp.route("/api/simulation")
+def get_simulation():
+    """API endpoint to run a Monte Carlo profitability simulation"""
+    validator_count = request.args.get("validator_count", 1, type=int)
+    months = request.args.get("months", 60, type=int)
+    paths = request.args.get("paths", DEFAULT_SIMULATION_PATHS, type=int)
+    seed = request.args.get("seed", None, type=int)
+    eth_price_growth_rate = request.args.get(
+        "eth_price_growth_rate", DEFAULT_ETH_PRICE_GROWTH_RATE, type=float
     )
+    reward_decay_rate = request.args.get(
+        "reward_decay_rate", DEFAULT_REWARD_DECAY_RATE, type=float
+    )
+    try:
+        simulation = profitability_calculator.simulate_profitability(
+            validator_count,
+            months,
+            paths,
+            seed,
+            eth_price_growth_rate,
+            reward_decay_rate,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(simulation)
+
+
+@profitability_bp.route("/api/price")
+def get_price():
+    """API endpoint to get the cached ETH price and its source"""
+    return jsonify(profitability_calculator.price_oracle.status())
+
+
+def requested_cost_inputs() -> Dict[str, float]:
+    """Cost input overrides passed as query parameters"""
+    overrides = {}
+    for name in profitability_calculator.cost_inputs:
+        value = request.args.get(name, type=float)
+        if value is not None:
+            overrides[name] = value
+    return overrides
 
 
 @profitability_bp.route("/api/optimization")
 def get_optimization():
     """API endpoint to get optimal validator count"""
-    return jsonify(profitability_calculator.calculate_optimal_validator_count())
+    min_count = request.args.get("min_count", 1, type=int)
+    max_count = request.args.get("max_count", 20, type=int)
+    return jsonify(
+        profitability_calculator.calculate_optimal_validator_count(
+            min_count, max_count, requested_cost_inputs()
+        )
+    )
+
+
+@profitability_bp.route("/api/optimization/sweep")
+def get_optimization_sweep():
+    """API endpoint to sweep one cost input across a range of validator counts"""
+    name = request.args.get("cost_input", "hardware_cost_monthly")
+    if name not in profitability_calculator.cost_inputs:
+        return (
+            jsonify({"status": "error", "message": f"Unknown cost input: {name}"}),
+            400,
+        )
+
+    try:
+        values = [
+            float(value)
+            for value in request.args.get("values", "").split(",")
+            if value.strip()
+        ]
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not values:
+        values = [profitability_calculator.cost_inputs[name]]
+
+    min_count = request.args.get("min_count", 1, type=int)
+    max_count = request.args.get("max_count", 20, type=int)
+    return jsonify(
+        profitability_calculator.sweep_cost_input(name, values, min_count, max_count)
+    )
 
 
 @profitability_bp.route("/api/cost-inputs", methods=["GET", "POST"])
@@ -530,7 +1094,11 @@ def manage_cost_inputs():
 @profitability_bp.route("/api/update", methods=["POST"])
 def update_data():
     """API endpoint to manually trigger data update"""
-    profitability_calculator.update_performance_history()
+    if not ingestion_scheduler.run_now("profitability"):
+        return (
+            jsonify({"status": "error", "message": "Performance data update failed"}),
+            502,
+        )
     return jsonify(
         {"status": "success", "message": "Performance data updated successfully"}
     )
@@ -539,8 +1107,21 @@ def update_data():
 def register_profitability_blueprint(app):
     """Register the profitability blueprint with the Flask app"""
     app.register_blueprint(profitability_bp)
-
-    # Schedule regular updates
-    @app.before_first_request
-    def initialize_data():
-        profitability_calculator.update_performance_history()
+    register_json_provider(app)
+    register_http_cache(app)
+
+    # Load history in the background, samples are taken by the scheduler
+    profitability_calculator.warmup()
+    ingestion_scheduler.register(
+        "eth_price",
+        refresh_eth_price,
+        PRICE_REFRESH_INTERVAL,
+        follow=follow_eth_price,
+    )
+    ingestion_scheduler.register(
+        "profitability",
+        collect_performance_data,
+        PERFORMANCE_REFRESH_INTERVAL,
+        follow=follow_performance_data,
+    )
+    ingestion_scheduler.start()
@@ -4,17 +4,40 @@ Queue Monitoring Visualization Module for Lido CSM
 This module provides advanced visualization and analytics for the CSM stake distribution queue.
 """
 
+from __future__ import annotations
+
+import copy
 import datetime
+import io
 import json
 import logging
+import math
 import os
+import sqlite3
+import threading
 import time
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-import numpy as np
-import pandas as pd
 import requests
+from downsampling import METHOD_LTTB, downsample_frame
 from flask import Blueprint, current_app, jsonify, render_template, request
+from genesis import genesis_tracker
+from http_cache import conditional, register_http_cache
+from ingestion import ingestion_scheduler
+from json_provider import register_json_provider
+from lazy import LazyObject, lazy_import
+from serialization import ORIENT_RECORDS, frame_to_json, requested_orient
+from timeseries import (
+    frame_samples,
+    from_epoch,
+    records_frame,
+    timeseries_store,
+    to_epoch,
+)
+
+# Heavy dependencies are imported on first use to keep startup fast
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 # Configure logging
 logging.basicConfig(
@@ -34,63 +57,339 @@ QUEUE_DATA_DIR = os.environ.get(
 )
 CSM_API_ENDPOINT = os.environ.get("CSM_API_ENDPOINT", "http://localhost:9000")
 
+QUEUE_HISTORY_SERIES = "queue"
+QUEUE_HISTORY_RETENTION_DAYS = int(os.environ.get("QUEUE_HISTORY_RETENTION_DAYS", 365))
+QUEUE_HISTORY_DOWNSAMPLE_AFTER_DAYS = int(
+    os.environ.get("QUEUE_HISTORY_DOWNSAMPLE_AFTER_DAYS", DEFAULT_HISTORY_DAYS)
+)
+QUEUE_HISTORY_DOWNSAMPLE_RULE = os.environ.get("QUEUE_HISTORY_DOWNSAMPLE_RULE", "1h")
+# Trend estimation: two-sided z-score for the activation time interval
+TREND_CONFIDENCE_LEVEL = 0.9
+TREND_CONFIDENCE_Z = 1.645
+QUEUE_HISTORY_COLUMNS = [
+    "timestamp",
+    "queue_length",
+    "position",
+    "wait_time_estimate",
+    "velocity",
+    "acceleration",
+    "stake_rate",
+]
+
+
+class ExponentialTrend:
+    """Exponentially weighted least-squares fit of y = a + b * t.
+
+    Weighted sums are decayed and updated as each sample arrives, so the
+    slope and its standard error are available in O(1) without rescanning
+    the history. Times are in hours.
+    """
+
+    # Re-base the time origin when it drifts this far to keep sums well scaled
+    REBASE_HOURS = 24 * 30
+
+    def __init__(self, half_life_hours: float):
+        self.decay_rate = math.log(2) / half_life_hours
+        self.count = 0
+        self.origin = None
+        self.last_time = None
+        # Sums of w, w*t, w*t^2, w*y, w*t*y, w*y^2 and w^2, w^2*t, w^2*t^2
+        self.sw = self.st = self.stt = self.sy = self.sty = self.syy = 0.0
+        self.sw2 = self.sw2t = self.sw2tt = 0.0
+
+    def add(self, time_hours: float, value: float) -> None:
+        """Add a sample, decaying the weight of everything seen before it"""
+        if self.origin is None:
+            self.origin = self.last_time = time_hours
+
+        weight = 1.0
+        if time_hours >= self.last_time:
+            decay = math.exp(-self.decay_rate * (time_hours - self.last_time))
+            self._scale(decay)
+            self.last_time = time_hours
+        else:
+            # Late sample: weight it by its age instead of decaying the rest
+            weight = math.exp(-self.decay_rate * (self.last_time - time_hours))
+
+        x = time_hours - self.origin
+        self.count += 1
+        self.sw += weight
+        self.st += weight * x
+        self.stt += weight * x * x
+        self.sy += weight * value
+        self.sty += weight * x * value
+        self.syy += weight * value * value
+        self.sw2 += weight * weight
+        self.sw2t += weight * weight * x
+        self.sw2tt += weight * weight * x * x
+
+        if self.last_time - self.origin > self.REBASE_HOURS:
+            self._rebase(self.last_time)
+
+    def _scale(self, decay: float) -> None:
+        """Decay all weighted sums by the given factor"""
+        self.sw *= decay
+        self.st *= decay
+        self.stt *= decay
+        self.sy *= decay
+        self.sty *= decay
+        self.syy *= decay
+        decay_sq = decay * decay
+        self.sw2 *= decay_sq
+        self.sw2t *= decay_sq
+        self.sw2tt *= decay_sq
+
+    def _rebase(self, new_origin: float) -> None:
+        """Shift the time origin without changing the fit"""
+        d = new_origin - self.origin
+        self.stt += -2 * d * self.st + d * d * self.sw
+        self.st -= d * self.sw
+        self.sty -= d * self.sy
+        self.sw2tt += -2 * d * self.sw2t + d * d * self.sw2
+        self.sw2t -= d * self.sw2
+        self.origin = new_origin
+
+    @property
+    def effective_samples(self) -> float:
+        """Kish effective sample size of the current weights"""
+        return self.sw * self.sw / self.sw2 if self.sw2 > 0 else 0.0
+
+    def fit(self) -> Optional[Tuple[float, float]]:
+        """Return (slope, slope standard error), or None with too few samples"""
+        if self.count < 2 or self.sw <= 0:
+            return None
+
+        t_mean = self.st / self.sw
+        y_mean = self.sy / self.sw
+        stt_c = self.stt - self.sw * t_mean * t_mean
+        if stt_c <= 1e-12:
+            return None
+
+        sty_c = self.sty - self.sw * t_mean * y_mean
+        syy_c = self.syy - self.sw * y_mean * y_mean
+        slope = sty_c / stt_c
+
+        n_eff = self.effective_samples
+        if n_eff <= 2:
+            return slope, float("inf")
+
+        # Residual variance with a small-sample correction, then the
+        # sandwich variance of the weighted slope estimate
+        residual_var = max(0.0, syy_c - slope * sty_c) / self.sw
+        residual_var *= n_eff / (n_eff - 2)
+        s2tt_c = self.sw2tt - 2 * t_mean * self.sw2t + t_mean * t_mean * self.sw2
+        slope_se = math.sqrt(residual_var * max(0.0, s2tt_c)) / stt_c
+        return slope, slope_se
+
+
+class QueueTrend:
+    """Incremental velocity and acceleration estimates for the queue position"""
+
+    def __init__(self, days: int):
+        # Half-life giving the same mean sample age as a flat window of `days`
+        half_life_hours = days * 24 * math.log(2) / 2
+        self.position = ExponentialTrend(half_life_hours)
+        self.velocity = ExponentialTrend(half_life_hours)
+        self.last_sample = None
+
+    def add_sample(self, timestamp: pd.Timestamp, position: float) -> None:
+        """Feed a new queue sample into both estimators"""
+        hours = timestamp.timestamp() / 3600
+        self.position.add(hours, position)
+
+        if self.last_sample is not None:
+            last_hours, last_position = self.last_sample
+            hours_diff = hours - last_hours
+            if hours_diff > 0:
+                # Decreasing position is positive velocity
+                velocity = (last_position - position) / hours_diff
+                self.velocity.add((hours + last_hours) / 2, velocity)
+        self.last_sample = (hours, position)
+
+    def copy(self) -> "QueueTrend":
+        """Independent copy, so published estimators are never mutated"""
+        return copy.deepcopy(self)
+
+    def velocity_estimate(self) -> Optional[Tuple[float, float]]:
+        """Return (velocity, standard error) in positions per hour"""
+        fit = self.position.fit()
+        if fit is None:
+            return None
+        slope, slope_se = fit
+        return -slope, slope_se
+
+    def acceleration_estimate(self) -> Optional[Tuple[float, float]]:
+        """Return (acceleration, standard error) in positions per hour^2"""
+        return self.velocity.fit()
+
 
 class QueueAnalytics:
-    """Class for analyzing queue data and generating insights"""
+    """Class for analyzing queue data and generating insights
+
+    `queue_history` and the trend estimators are copy-on-write snapshots:
+    writers build new objects under `_write_lock` and swap them in with a
+    single assignment, so readers never block and never see torn state.
+    Snapshots must not be modified in place.
+
+    Samples are appended to the shared time-series store per genesis; a
+    network reset swaps in an empty history.
+    """
 
     def __init__(self, data_dir: str = QUEUE_DATA_DIR):
         self.data_dir = data_dir
+        self._write_lock = threading.RLock()
         self.ensure_data_dir()
+        # History files written by earlier releases, imported once
+        self.history_files = genesis_tracker.store(
+            data_dir,
+            legacy=("history", "queue_history.csv", "queue_history.csv.migrated"),
+        )
+        # Read first, so samples stored during the load trigger a reload
+        self._history_revision = timeseries_store.revision(QUEUE_HISTORY_SERIES)
         self.queue_history = self.load_queue_history()
+        self._last_compaction_day = None
+        self._trends: Dict[int, QueueTrend] = {}
+        # Whether the last fetch reached the CSM API (vs. placeholder data)
+        self.upstream_available = True
+        genesis_tracker.on_rollover(self.reset_queue_history)
 
     def ensure_data_dir(self) -> None:
         """Ensure the data directory exists"""
         os.makedirs(self.data_dir, exist_ok=True)
 
-    def load_queue_history(self) -> pd.DataFrame:
-        """Load historical queue data from disk"""
-        history_file = os.path.join(self.data_dir, "queue_history.csv")
-
-        if not os.path.exists(history_file):
-            # Create empty dataframe with expected columns
-            df = pd.DataFrame(
-                columns=[
-                    "timestamp",
-                    "queue_length",
-                    "position",
-                    "wait_time_estimate",
-                    "velocity",
-                    "acceleration",
-                    "stake_rate",
-                ]
+    def import_history_files(self) -> None:
+        """Import CSV history written by earlier releases into the time-series store"""
+
+        def importer(genesis: str, files: List[Tuple[str, bytes]]) -> int:
+            frames = [
+                pd.read_csv(io.BytesIO(content), parse_dates=["timestamp"])
+                for _, content in files
+            ]
+            frames = [frame for frame in frames if not frame.empty]
+            if not frames:
+                return 0
+            return timeseries_store.append_frame(
+                QUEUE_HISTORY_SERIES, pd.concat(frames, ignore_index=True), genesis
             )
-            df.to_csv(history_file, index=False)
-            return df
 
+        # Covers queue_history.csv and the daily history/ partitions
+        timeseries_store.migrate_files(
+            self.history_files, "*queue_history*.csv", QUEUE_HISTORY_SERIES, importer
+        )
+
+    def load_queue_history(self) -> pd.DataFrame:
+        """Load queue history of the current genesis within the retention window"""
+        self.import_history_files()
+        cutoff = datetime.datetime.combine(
+            datetime.date.today()
+            - datetime.timedelta(days=QUEUE_HISTORY_RETENTION_DAYS),
+            datetime.time(),
+        )
         try:
-            return pd.read_csv(history_file, parse_dates=["timestamp"])
-        except Exception as e:
+            records = timeseries_store.records(QUEUE_HISTORY_SERIES, start=cutoff)
+        except sqlite3.Error as e:
             logger.error(f"Error loading queue history: {e}")
-            # Return empty dataframe
-            return pd.DataFrame(
-                columns=[
-                    "timestamp",
-                    "queue_length",
-                    "position",
-                    "wait_time_estimate",
-                    "velocity",
-                    "acceleration",
-                    "stake_rate",
-                ]
-            )
+            records = []
+        return records_frame(records, QUEUE_HISTORY_COLUMNS)
+
+    def load_genesis_history(self, genesis: str) -> pd.DataFrame:
+        """Load the queue history of a given genesis"""
+        return records_frame(
+            timeseries_store.records(QUEUE_HISTORY_SERIES, genesis=genesis),
+            QUEUE_HISTORY_COLUMNS,
+        )
+
+    def reset_queue_history(self, previous_genesis: int, genesis: int) -> None:
+        """Start an empty history when the network resets"""
+        with self._write_lock:
+            self.queue_history = pd.DataFrame(columns=QUEUE_HISTORY_COLUMNS)
+            self._trends = {}
+            self._last_compaction_day = None
+
+    def reload_queue_history(self) -> None:
+        """Reload the history if another process changed it in the store"""
+        revision = timeseries_store.revision(QUEUE_HISTORY_SERIES)
+        if revision == self._history_revision:
+            return
+        history = self.load_queue_history()
+        with self._write_lock:
+            self.queue_history = history
+            self._trends = {}
+            self._history_revision = revision
+
+    def compact_queue_history(self) -> None:
+        """Apply retention and downsample samples older than the threshold"""
+        with self._write_lock:
+            self._compact_queue_history()
+
+    def _compact_queue_history(self) -> None:
+        """Compaction body, called with the write lock held"""
+        today = datetime.date.today()
+        retention_cutoff = today - datetime.timedelta(days=QUEUE_HISTORY_RETENTION_DAYS)
+        downsample_cutoff = today - datetime.timedelta(
+            days=QUEUE_HISTORY_DOWNSAMPLE_AFTER_DAYS
+        )
+        retention_start = datetime.datetime.combine(retention_cutoff, datetime.time())
+        downsample_end = datetime.datetime.combine(downsample_cutoff, datetime.time())
 
-    def save_queue_history(self) -> None:
-        """Save queue history to disk"""
-        history_file = os.path.join(self.data_dir, "queue_history.csv")
         try:
-            self.queue_history.to_csv(history_file, index=False)
+            timeseries_store.delete_range(QUEUE_HISTORY_SERIES, end=retention_start)
+
+            # Only aggregate samples that have not been aggregated before
+            marker = (
+                f"downsampled_until:{QUEUE_HISTORY_SERIES}:{timeseries_store.key()}"
+            )
+            downsampled_until = from_epoch(
+                float(timeseries_store.get_meta(marker) or 0)
+            )
+            start = max(retention_start, downsampled_until)
+            if start < downsample_end:
+                frame = records_frame(
+                    timeseries_store.records(
+                        QUEUE_HISTORY_SERIES, start=start, end=downsample_end
+                    ),
+                    QUEUE_HISTORY_COLUMNS,
+                )
+                timeseries_store.replace_range(
+                    QUEUE_HISTORY_SERIES,
+                    start,
+                    downsample_end,
+                    frame_samples(self.downsample(frame)),
+                )
+                timeseries_store.set_meta(marker, str(to_epoch(downsample_end)))
         except Exception as e:
-            logger.error(f"Error saving queue history: {e}")
+            logger.error(f"Error compacting queue history: {e}")
+
+        # Mirror the stored compaction in memory
+        if not self.queue_history.empty:
+            history = self.queue_history
+            days = history["timestamp"].dt.date
+            expired = days < retention_cutoff
+            stale = ~expired & (days < downsample_cutoff)
+            if expired.any() or stale.any():
+                self.queue_history = pd.concat(
+                    [
+                        self.downsample(history[stale]),
+                        history[days >= downsample_cutoff],
+                    ],
+                    ignore_index=True,
+                )
+                self._trends = {}
+
+        self._last_compaction_day = today
+
+    @staticmethod
+    def downsample(frame: pd.DataFrame) -> pd.DataFrame:
+        """Aggregate samples into QUEUE_HISTORY_DOWNSAMPLE_RULE buckets"""
+        if frame.empty:
+            return frame
+        return (
+            frame.set_index("timestamp")
+            .resample(QUEUE_HISTORY_DOWNSAMPLE_RULE)
+            .mean()
+            .dropna(how="all")
+            .reset_index()[QUEUE_HISTORY_COLUMNS]
+        )
 
     def fetch_current_queue_data(self) -> Dict[str, Any]:
         """Fetch current queue data from CSM API"""
@@ -99,9 +398,11 @@ class QueueAnalytics:
                 f"{CSM_API_ENDPOINT}/api/v1/queue/status", timeout=10
             )
             response.raise_for_status()
+            self.upstream_available = True
             return response.json()
         except Exception as e:
             logger.error(f"Error fetching queue data: {e}")
+            self.upstream_available = False
             # Return dummy data for development/testing
             return {
                 "queue_length": 100,
@@ -116,7 +417,11 @@ class QueueAnalytics:
     def update_queue_history(self) -> None:
         """Update queue history with current data"""
         current_data = self.fetch_current_queue_data()
+        with self._write_lock:
+            self._record_sample(current_data)
 
+    def _record_sample(self, current_data: Dict[str, Any]) -> None:
+        """Publish a new history snapshot, called with the write lock held"""
         # Convert timestamp to datetime
         if isinstance(current_data.get("timestamp"), int):
             timestamp = pd.Timestamp.fromtimestamp(current_data["timestamp"])
@@ -124,127 +429,127 @@ class QueueAnalytics:
             timestamp = pd.Timestamp.now()
 
         # Create new row
-        new_row = pd.DataFrame(
-            [
-                {
-                    "timestamp": timestamp,
-                    "queue_length": current_data.get("queue_length", 0),
-                    "position": current_data.get("position", 0),
-                    "wait_time_estimate": current_data.get("wait_time_estimate", 0),
-                    "velocity": current_data.get("velocity", 0),
-                    "acceleration": current_data.get("acceleration", 0),
-                    "stake_rate": current_data.get("stake_rate", 0),
-                }
-            ]
-        )
-
-        # Append to history
-        self.queue_history = pd.concat([self.queue_history, new_row], ignore_index=True)
-
-        # Remove duplicates and sort
-        self.queue_history = self.queue_history.drop_duplicates(
-            subset=["timestamp"]
-        ).sort_values("timestamp")
+        row = {
+            "timestamp": timestamp,
+            "queue_length": current_data.get("queue_length", 0),
+            "position": current_data.get("position", 0),
+            "wait_time_estimate": current_data.get("wait_time_estimate", 0),
+            "velocity": current_data.get("velocity", 0),
+            "acceleration": current_data.get("acceleration", 0),
+            "stake_rate": current_data.get("stake_rate", 0),
+        }
+        new_row = pd.DataFrame([row], columns=QUEUE_HISTORY_COLUMNS)
 
-        # Save updated history
-        self.save_queue_history()
+        history = self.queue_history
+        trends = {days: trend.copy() for days, trend in self._trends.items()}
+        if history.empty:
+            history = new_row
+        else:
+            last_timestamp = history["timestamp"].iloc[-1]
+            if timestamp == last_timestamp or (
+                timestamp < last_timestamp and (history["timestamp"] == timestamp).any()
+            ):
+                # Already recorded, in memory and in the store alike
+                return
+
+            # Append to history; only out-of-order samples need a re-sort
+            history = pd.concat([history, new_row], ignore_index=True)
+            if timestamp < last_timestamp:
+                history = history.sort_values("timestamp", ignore_index=True)
+                # Estimators assume ordered samples, rebuild them lazily
+                trends = {}
+
+        for trend in trends.values():
+            trend.add_sample(timestamp, row["position"])
+
+        # Publish the new snapshot
+        self.queue_history = history
+        self._trends = trends
+
+        # Only the new sample is written
+        try:
+            timeseries_store.append(QUEUE_HISTORY_SERIES, timestamp, row)
+        except sqlite3.Error as e:
+            logger.error(f"Error appending queue history sample: {e}")
+        if self._last_compaction_day != datetime.date.today():
+            self.compact_queue_history()
+
+    def get_trend(self, days: int = 7) -> QueueTrend:
+        """Get the incremental trend estimator for a window, building it once"""
+        trend = self._trends.get(days)
+        if trend is None:
+            trend = QueueTrend(days)
+            history = self.queue_history
+            for timestamp, position in zip(history["timestamp"], history["position"]):
+                trend.add_sample(timestamp, position)
+            # Only publish if no sample arrived while it was being built;
+            # skip caching rather than wait for a writer
+            if self._write_lock.acquire(blocking=False):
+                try:
+                    if self.queue_history is history:
+                        self._trends = {**self._trends, days: trend}
+                finally:
+                    self._write_lock.release()
+        return trend
 
     def calculate_velocity(self, days: int = 7) -> float:
-        """Calculate average queue velocity over the specified period"""
-        if self.queue_history.empty:
-            return 0.0
-
-        # Filter data for the specified period
-        cutoff_time = pd.Timestamp.now() - pd.Timedelta(days=days)
-        recent_data = self.queue_history[self.queue_history["timestamp"] >= cutoff_time]
-
-        if len(recent_data) < 2:
-            return (
-                self.queue_history["velocity"].iloc[-1]
-                if not self.queue_history.empty
-                else 0.0
-            )
-
-        # Calculate position change per hour
-        first_position = recent_data["position"].iloc[0]
-        last_position = recent_data["position"].iloc[-1]
-        first_time = recent_data["timestamp"].iloc[0]
-        last_time = recent_data["timestamp"].iloc[-1]
-
-        hours_diff = (last_time - first_time).total_seconds() / 3600
-        if hours_diff <= 0:
+        """Calculate queue velocity from an exponentially weighted regression"""
+        history = self.queue_history
+        if history.empty:
             return 0.0
 
-        position_change = (
-            first_position - last_position
-        )  # Decreasing position is positive velocity
-        velocity = position_change / hours_diff
+        estimate = self.get_trend(days).velocity_estimate()
+        if estimate is None:
+            return history["velocity"].iloc[-1]
 
-        return max(0.0, velocity)  # Ensure non-negative velocity
+        return max(0.0, estimate[0])  # Ensure non-negative velocity
 
     def calculate_acceleration(self, days: int = 7) -> float:
-        """Calculate queue acceleration over the specified period"""
-        if self.queue_history.empty or len(self.queue_history) < 3:
+        """Calculate queue acceleration from the regression of velocity samples"""
+        history = self.queue_history
+        if history.empty or len(history) < 3:
             return 0.0
 
-        # Filter data for the specified period
-        cutoff_time = pd.Timestamp.now() - pd.Timedelta(days=days)
-        recent_data = self.queue_history[self.queue_history["timestamp"] >= cutoff_time]
-
-        if len(recent_data) < 3:
+        estimate = self.get_trend(days).acceleration_estimate()
+        if estimate is None:
             return 0.0
 
-        # Calculate velocity at different points
-        recent_data = recent_data.sort_values("timestamp")
-        midpoint = len(recent_data) // 2
+        return estimate[0]
 
-        first_half = recent_data.iloc[:midpoint]
-        second_half = recent_data.iloc[midpoint:]
-
-        if len(first_half) < 2 or len(second_half) < 2:
+    @staticmethod
+    def hours_until_activation(
+        position: float, velocity: float, acceleration: float
+    ) -> Optional[float]:
+        """Solve position = v*t + 0.5*a*t^2 for the first t > 0"""
+        if position <= 0:
             return 0.0
-
-        # Calculate velocity for each half
-        first_velocity = (
-            first_half["position"].iloc[0] - first_half["position"].iloc[-1]
-        ) / (
-            (
-                first_half["timestamp"].iloc[-1] - first_half["timestamp"].iloc[0]
-            ).total_seconds()
-            / 3600
-        )
-
-        second_velocity = (
-            second_half["position"].iloc[0] - second_half["position"].iloc[-1]
-        ) / (
-            (
-                second_half["timestamp"].iloc[-1] - second_half["timestamp"].iloc[0]
-            ).total_seconds()
-            / 3600
-        )
-
-        # Calculate time difference between midpoints of each half
-        first_midpoint_time = first_half["timestamp"].mean()
-        second_midpoint_time = second_half["timestamp"].mean()
-        hours_diff = (second_midpoint_time - first_midpoint_time).total_seconds() / 3600
-
-        if hours_diff <= 0:
-            return 0.0
-
-        # Calculate acceleration
-        acceleration = (second_velocity - first_velocity) / hours_diff
-
-        return acceleration
+        if abs(acceleration) < 1e-12:
+            return position / velocity if velocity > 0 else None
+
+        discriminant = velocity * velocity + 2 * acceleration * position
+        if discriminant < 0:
+            return None
+        root = math.sqrt(discriminant)
+        candidates = [
+            t
+            for t in (
+                (-velocity + root) / acceleration,
+                (-velocity - root) / acceleration,
+            )
+            if t > 0
+        ]
+        return min(candidates) if candidates else None
 
     def forecast_queue_position(
         self, days: int = DEFAULT_FORECAST_DAYS
     ) -> List[Dict[str, Any]]:
         """Forecast queue position for the specified number of days"""
-        if self.queue_history.empty:
+        history = self.queue_history
+        if history.empty:
             return []
 
         # Get current position, velocity, and acceleration
-        current_position = self.queue_history["position"].iloc[-1]
+        current_position = history["position"].iloc[-1]
         velocity = self.calculate_velocity()
         acceleration = self.calculate_acceleration()
 
@@ -276,7 +581,8 @@ class QueueAnalytics:
 
     def estimate_activation_time(self) -> Dict[str, Any]:
         """Estimate when the validator will be activated"""
-        if self.queue_history.empty:
+        history = self.queue_history
+        if history.empty:
             return {
                 "activation_time": None,
                 "hours_remaining": None,
@@ -303,54 +609,74 @@ class QueueAnalytics:
         hours_remaining = activation_entry["hour"]
         days_remaining = hours_remaining / 24
 
-        # Determine confidence level based on data quality
-        if len(self.queue_history) < 10:
-            confidence = "low"
-        elif (
-            self.calculate_acceleration() > 0.1
-        ):  # High acceleration means less predictable
-            confidence = "medium"
-        else:
-            confidence = "high"
+        # Derive an interval from the velocity and acceleration uncertainty
+        trend = self.get_trend()
+        interval = {
+            "level": TREND_CONFIDENCE_LEVEL,
+            "hours_min": None,
+            "hours_max": None,
+        }
+        velocity_estimate = trend.velocity_estimate()
+        acceleration_estimate = trend.acceleration_estimate() or (0.0, 0.0)
+
+        confidence = "low"
+        if velocity_estimate is not None and len(history) >= 10:
+            position = history["position"].iloc[-1]
+            velocity, velocity_se = velocity_estimate
+            acceleration, acceleration_se = acceleration_estimate
+            spread_v = TREND_CONFIDENCE_Z * velocity_se
+            spread_a = TREND_CONFIDENCE_Z * acceleration_se
+
+            hours_min = self.hours_until_activation(
+                position, velocity + spread_v, acceleration + spread_a
+            )
+            hours_max = self.hours_until_activation(
+                position, max(0.0, velocity - spread_v), acceleration - spread_a
+            )
+            interval["hours_min"] = hours_min
+            interval["hours_max"] = hours_max
+
+            # Confidence from the relative width of the interval
+            if hours_min is not None and hours_max is not None:
+                relative_width = (hours_max - hours_min) / max(hours_remaining, 1)
+                if relative_width <= 0.25:
+                    confidence = "high"
+                elif relative_width <= 0.75:
+                    confidence = "medium"
 
         return {
             "activation_time": activation_entry["timestamp"],
             "hours_remaining": hours_remaining,
             "days_remaining": round(days_remaining, 1),
             "confidence": confidence,
+            "confidence_interval": interval,
         }
 
-    def get_queue_analytics(self) -> Dict[str, Any]:
+    def get_queue_analytics(self, orient: str = ORIENT_RECORDS) -> Dict[str, Any]:
         """Get comprehensive queue analytics"""
-        # Update history with current data
-        self.update_queue_history()
+        history = self.queue_history
+        # Latest sample recorded by the ingestion scheduler
+        current_data = {"timestamp": pd.Timestamp.now().isoformat()}
+        if not history.empty:
+            current_data = frame_to_json(history.iloc[[-1]])[0]
 
         # Calculate metrics
-        current_data = self.fetch_current_queue_data()
         velocity = self.calculate_velocity()
         acceleration = self.calculate_acceleration()
         activation_estimate = self.estimate_activation_time()
 
         # Get historical trends
         history_data = []
-        if not self.queue_history.empty:
+        if not history.empty:
             # Resample to daily data for UI display
             daily_data = (
-                self.queue_history.set_index("timestamp")
-                .resample("D")
-                .mean()
-                .reset_index()
+                history.set_index("timestamp").resample("D").mean().reset_index()
+            )
+            history_data = frame_to_json(
+                daily_data,
+                ["timestamp", "queue_length", "position", "velocity"],
+                orient,
             )
-
-            for _, row in daily_data.iterrows():
-                history_data.append(
-                    {
-                        "timestamp": row["timestamp"].isoformat(),
-                        "queue_length": row["queue_length"],
-                        "position": row["position"],
-                        "velocity": row["velocity"],
-                    }
-                )
 
         # Generate forecast
         forecast = self.forecast_queue_position()
@@ -366,7 +692,7 @@ class QueueAnalytics:
                 "velocity": velocity,
                 "acceleration": acceleration,
                 "stake_rate": current_data.get("stake_rate", 0),
-                "timestamp": pd.Timestamp.now().isoformat(),
+                "timestamp": current_data["timestamp"],
             },
             "activation_estimate": activation_estimate,
             "history": history_data,
@@ -376,7 +702,8 @@ class QueueAnalytics:
 
     def calculate_queue_efficiency(self) -> Dict[str, Any]:
         """Calculate queue efficiency metrics"""
-        if self.queue_history.empty:
+        history = self.queue_history
+        if history.empty:
             return {
                 "throughput": 0,
                 "consistency": 0,
@@ -385,7 +712,7 @@ class QueueAnalytics:
             }
 
         # Calculate throughput (validators processed per day)
-        recent_data = self.queue_history.sort_values("timestamp")
+        recent_data = history.sort_values("timestamp")
         if len(recent_data) >= 2:
             first_queue_length = recent_data["queue_length"].iloc[0]
             last_queue_length = recent_data["queue_length"].iloc[-1]
@@ -407,9 +734,9 @@ class QueueAnalytics:
             throughput = 0
 
         # Calculate consistency (inverse of velocity standard deviation)
-        if len(self.queue_history) >= 3:
-            velocity_std = self.queue_history["velocity"].std()
-            velocity_mean = self.queue_history["velocity"].mean()
+        if len(history) >= 3:
+            velocity_std = history["velocity"].std()
+            velocity_mean = history["velocity"].mean()
             if velocity_mean > 0:
                 # Coefficient of variation (lower is better)
                 cv = velocity_std / velocity_mean
@@ -439,8 +766,19 @@ class QueueAnalytics:
         }
 
 
-# Initialize analytics instance
-queue_analytics = QueueAnalytics()
+# Analytics instance, created on first use or by the blueprint warmup
+queue_analytics = LazyObject(QueueAnalytics, "queue_analytics")
+
+
+def collect_queue_data() -> bool:
+    """Scheduled queue sample collection, False when the CSM API is down"""
+    queue_analytics.update_queue_history()
+    return queue_analytics.upstream_available
+
+
+def follow_queue_data() -> None:
+    """Pick up the samples the leader process collected"""
+    queue_analytics.reload_queue_history()
 
 
 @queue_bp.route("/")
@@ -452,7 +790,7 @@ def index():
 @queue_bp.route("/api/data")
 def get_queue_data():
     """API endpoint to get queue data"""
-    return jsonify(queue_analytics.get_queue_analytics())
+    return jsonify(queue_analytics.get_queue_analytics(requested_orient()))
 
 
 @queue_bp.route("/api/forecast")
@@ -462,32 +800,49 @@ def get_forecast():
     return jsonify(queue_analytics.forecast_queue_position(days))
 
 
+def history_revision():
+    """Revision of the queue history a request reads"""
+    return timeseries_store.revision(QUEUE_HISTORY_SERIES, request.args.get("genesis"))
+
+
 @queue_bp.route("/api/history")
+@conditional(history_revision)
 def get_history():
     """API endpoint to get queue history"""
     days = request.args.get("days", DEFAULT_HISTORY_DAYS, type=int)
+    max_points = request.args.get("max_points", 0, type=int)
+    method = request.args.get("downsample", METHOD_LTTB)
+    genesis = request.args.get("genesis")
 
     # Filter history for the specified period
-    cutoff_time = pd.Timestamp.now() - pd.Timedelta(days=days)
-    history = queue_analytics.queue_history[
-        queue_analytics.queue_history["timestamp"] >= cutoff_time
-    ]
-
-    # Convert to list of dicts for JSON serialization
-    history_data = []
-    for _, row in history.iterrows():
-        history_data.append(
-            {
-                "timestamp": row["timestamp"].isoformat(),
-                "queue_length": row["queue_length"],
-                "position": row["position"],
-                "velocity": row["velocity"],
-                "acceleration": row["acceleration"],
-                "wait_time_estimate": row["wait_time_estimate"],
-            }
+    end_time = pd.Timestamp.now()
+    history = queue_analytics.queue_history
+    if genesis is not None:
+        try:
+            history = queue_analytics.load_genesis_history(genesis)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if not history.empty:
+            # Prior iterations are windowed back from their last sample
+            end_time = history["timestamp"].iloc[-1]
+    cutoff_time = end_time - pd.Timedelta(days=days)
+    history = history[history["timestamp"] >= cutoff_time]
+    history = downsample_frame(history, max_points, method, value_column="position")
+
+    return jsonify(
+        frame_to_json(
+            history,
+            [
+                "timestamp",
+                "queue_length",
+                "position",
+                "velocity",
+                "acceleration",
+                "wait_time_estimate",
+            ],
+            requested_orient(),
         )
-
-    return jsonify(history_data)
+    )
 
 
 @queue_bp.route("/api/efficiency")
@@ -499,15 +854,26 @@ def get_efficiency():
 @queue_bp.route("/api/update", methods=["POST"])
 def update_data():
     """API endpoint to manually trigger data update"""
-    queue_analytics.update_queue_history()
+    if not ingestion_scheduler.run_now("queue"):
+        return (
+            jsonify({"status": "error", "message": "Queue data update failed"}),
+            502,
+        )
     return jsonify({"status": "success", "message": "Queue data updated successfully"})
 
 
 def register_queue_blueprint(app):
     """Register the queue blueprint with the Flask app"""
     app.register_blueprint(queue_bp)
-
-    # Schedule regular updates
-    @app.before_first_request
-    def initialize_data():
-        queue_analytics.update_queue_history()
+    register_json_provider(app)
+    register_http_cache(app)
+
+    # Load history in the background, samples are taken by the scheduler
+    queue_analytics.warmup()
+    ingestion_scheduler.register(
+        "queue",
+        collect_queue_data,
+        DEFAULT_REFRESH_INTERVAL,
+        follow=follow_queue_data,
+    )
+    ingestion_scheduler.start()
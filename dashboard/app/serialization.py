@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Serialization helpers for the dashboard history endpoints
+Converts pandas frames into JSON-ready records or column arrays without
+Python-level row loops.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+from flask import request
+from lazy import lazy_import
+
+# Heavy dependencies are imported on first use to keep startup fast
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Response orientations accepted through the ?format= query parameter
+ORIENT_RECORDS = "records"
+ORIENT_COLUMNS = "columns"
+ORIENTS = (ORIENT_RECORDS, ORIENT_COLUMNS)
+
+
+def requested_orient(default: str = ORIENT_RECORDS) -> str:
+    """Return the response orientation requested by the current request"""
+    orient = request.args.get("format", default)
+    return orient if orient in ORIENTS else default
+
+
+def column_values(series: pd.Series) -> List[Any]:
+    """Convert a column to a list of JSON-native values, mapping NaN/NaT to None"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[us]")
+        mask = np.isnat(values)
+        # Only include microseconds when some timestamp actually has them
+        micros = values[~mask].astype(np.int64) % 1_000_000
+        strings = np.datetime_as_string(values, unit="us" if micros.any() else "s")
+        return np.where(mask, None, strings).tolist()
+
+    mask = series.isna().to_numpy()
+    if not mask.any():
+        return series.tolist()
+    return np.where(mask, None, series.to_numpy(dtype=object)).tolist()
+
+
+def frame_to_json(
+    frame: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    orient: str = ORIENT_RECORDS,
+) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """Serialize a frame as a list of records or as a dict of column arrays"""
+    if columns is None:
+        columns = list(frame.columns)
+    data = {column: column_values(frame[column]) for column in columns}
+
+    if orient == ORIENT_COLUMNS:
+        return data
+    return [dict(zip(columns, row)) for row in zip(*data.values())]
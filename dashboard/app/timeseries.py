@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Time-Series Storage for the Ephemery Dashboard
+One embedded SQLite database holds every dashboard history (sync status,
+Obol metrics, CSM queue and performance samples). It runs in WAL mode so the
+Flask app, the WebSocket server and the metrics API can read and write it
+concurrently, samples are appended incrementally instead of rewriting whole
+files, and range queries are served from a (series, genesis, time) index.
+"""
+
+from __future__ import annotations
+
+import datetime
+import io
+import json
+import logging
+import os
+import sqlite3
+import tarfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from atomic_io import atomic_write
+from genesis import (
+    ARCHIVE_DIR,
+    ARCHIVE_SUFFIX,
+    GENESIS_ARCHIVE_KEEP,
+    LEGACY_GENESIS,
+    PARTITION_PREFIX,
+    UNKNOWN_GENESIS,
+    GenesisStore,
+    genesis_key,
+    genesis_tracker,
+)
+from instrumentation import KIND_STORE, instrumentation
+from lazy import lazy_import
+from leader import is_leader
+
+# Heavy dependencies are imported on first use to keep startup fast
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Constants
+TIMESERIES_DB_PATH = os.environ.get(
+    "TIMESERIES_DB_PATH",
+    os.path.join(
+        os.environ.get("EPHEMERY_DATA_DIR", "/opt/ephemery/data"),
+        "dashboard_history.db",
+    ),
+)
+# Milliseconds a connection waits for another process holding the write lock
+TIMESERIES_BUSY_TIMEOUT = int(os.environ.get("TIMESERIES_BUSY_TIMEOUT", "5000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    series TEXT NOT NULL,
+    genesis TEXT NOT NULL,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (series, genesis, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_series_ts ON samples (series, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    series TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+"""
+
+# Statements are constant strings so sqlite3's per-connection statement cache
+# keeps them prepared; open range bounds are passed as +/- MAX_TS
+MAX_TS = 1e18
+INSERT_SQL = (
+    "INSERT OR REPLACE INTO samples (series, genesis, ts, data) VALUES (?, ?, ?, ?)"
+)
+RANGE_SQL = (
+    "SELECT ts, data FROM (SELECT ts, data FROM samples"
+    " WHERE series = ? AND genesis = ? AND ts >= ? AND ts < ?"
+    " ORDER BY ts DESC LIMIT ?) ORDER BY ts"
+)
+DELETE_RANGE_SQL = (
+    "DELETE FROM samples WHERE series = ? AND genesis = ? AND ts >= ? AND ts < ?"
+)
+TRIM_SQL = (
+    "DELETE FROM samples WHERE series = ? AND genesis = ? AND ts < ("
+    "SELECT ts FROM samples WHERE series = ? AND genesis = ?"
+    " ORDER BY ts DESC LIMIT 1 OFFSET ?)"
+)
+LATEST_GENESIS_SQL = (
+    "SELECT genesis FROM samples WHERE series = ? ORDER BY ts DESC LIMIT 1"
+)
+COUNT_SQL = "SELECT COUNT(*) FROM samples WHERE series = ? AND genesis = ?"
+# Every write bumps its series' revision inside the same transaction, so
+# revisions are consistent across processes sharing the database
+BUMP_SQL = (
+    "INSERT INTO revisions (series, revision) VALUES (?, 1)"
+    " ON CONFLICT (series) DO UPDATE SET revision = revision + 1"
+)
+BUMP_ALL_SQL = "UPDATE revisions SET revision = revision + 1"
+# Legacy samples taken since a genesis belong to it, as in split_by_genesis
+SPLIT_LEGACY_SQL = (
+    "UPDATE OR REPLACE samples SET genesis = ? WHERE genesis = ? AND ts >= ?"
+)
+REVISION_SQL = "SELECT revision FROM revisions WHERE series = ?"
+ARCHIVE_SQL = (
+    "SELECT series, ts, data FROM samples WHERE genesis = ? ORDER BY series, ts"
+)
+# Archives of deleted iterations, next to those of the genesis stores
+ARCHIVE_PREFIX = f"timeseries-{PARTITION_PREFIX}"
+
+
+def to_epoch(value: Any) -> float:
+    """Unix time of a datetime, pandas Timestamp, ISO-8601 string or number.
+
+    Naive values are UTC, as in genesis.parse_genesis_time, so samples and
+    genesis times compare on one clock. The collectors write and query naive
+    datetime.now() values alike, so ranges relative to now are unaffected.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if hasattr(value, "to_pydatetime"):
+        value = value.to_pydatetime()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def from_epoch(value: float) -> datetime.datetime:
+    """Naive datetime of a unix time, the inverse of to_epoch"""
+    return datetime.datetime.fromtimestamp(value, datetime.timezone.utc).replace(
+        tzinfo=None
+    )
+
+
+def json_default(value: Any) -> Any:
+    """Encode timestamps and numpy scalars stored in samples"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def records_frame(records: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    """DataFrame of sample records with a parsed timestamp column"""
+    if not records:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame.from_records(records, columns=columns)
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    return frame
+
+
+def frame_samples(frame: pd.DataFrame) -> List[Tuple[Any, Dict[str, Any]]]:
+    """(timestamp, record) samples of a DataFrame with a timestamp column"""
+    if frame.empty:
+        return []
+    return [(record["timestamp"], record) for record in frame.to_dict("records")]
+
+
+class TimeSeriesStore:
+    """SQLite-backed store of timestamped JSON samples grouped into series.
+
+    Every sample belongs to a genesis iteration; reads and writes default
+    to the current one. Each thread gets its own connection, and writes are
+    short transactions, so several threads and processes can share the
+    database file.
+    """
+
+    def __init__(
+        self,
+        path: str = TIMESERIES_DB_PATH,
+        tracker: Any = genesis_tracker,
+        keep: int = GENESIS_ARCHIVE_KEEP,
+    ):
+        self.path = path
+        self.tracker = tracker
+        self.keep = keep
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        tracker.attach(self)
+
+    @property
+    def location(self) -> str:
+        """Where this store keeps its iterations"""
+        return os.path.abspath(self.path)
+
+    @property
+    def owner(self) -> bool:
+        """Whether this process migrates and archives the database"""
+        return is_leader()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.location), exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=TIMESERIES_BUSY_TIMEOUT / 1000, isolation_level=None
+            )
+            conn.execute(f"PRAGMA busy_timeout = {TIMESERIES_BUSY_TIMEOUT}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            # WAL makes NORMAL durable against application crashes
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._ensure_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """Create tables once per process"""
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def key(self, genesis: Optional[Any] = None, series: Optional[str] = None) -> str:
+        """Genesis key for reads and writes, the current genesis by default"""
+        if genesis is None:
+            genesis = self.tracker.current
+        if genesis is None and series is not None:
+            # Until this process learns the genesis, follow the newest samples
+            row = self.connection.execute(LATEST_GENESIS_SQL, (series,)).fetchone()
+            if row is not None:
+                return row[0]
+        return genesis_key(genesis)
+
+    def append(
+        self,
+        series: str,
+        timestamp: Any,
+        data: Dict[str, Any],
+        genesis: Optional[Any] = None,
+    ) -> None:
+        """Store one sample, replacing any sample with the same timestamp"""
+        self.append_many(series, [(timestamp, data)], genesis)
+
+    def append_many(
+        self,
+        series: str,
+        samples: Iterable[Tuple[Any, Dict[str, Any]]],
+        genesis: Optional[Any] = None,
+    ) -> int:
+        """Store a batch of (timestamp, data) samples in one transaction"""
+        key = genesis_key(genesis) if genesis is not None else self.key()
+        rows = [
+            (series, key, to_epoch(timestamp), json.dumps(data, default=json_default))
+            for timestamp, data in samples
+        ]
+        if not rows:
+            return 0
+        conn = self.connection
+        with instrumentation.span(KIND_STORE, "timeseries.append", series=series):
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(INSERT_SQL, rows)
+                conn.execute(BUMP_SQL, (series,))
+        return len(rows)
+
+    def append_frame(
+        self, series: str, frame: pd.DataFrame, genesis: Optional[Any] = None
+    ) -> int:
+        """Store every row of a DataFrame with a timestamp column"""
+        return self.append_many(series, frame_samples(frame), genesis)
+
+    def range(
+        self,
+        series: str,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        limit: Optional[int] = None,
+        genesis: Optional[Any] = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """(timestamp, data) samples in [start, end), oldest first; with
+        `limit`, only the newest `limit` samples of the range"""
+        params = (
+            series,
+            self.key(genesis, series),
+            to_epoch(start) if start is not None else -MAX_TS,
+            to_epoch(end) if end is not None else MAX_TS,
+            limit if limit is not None else -1,
+        )
+        with instrumentation.span(KIND_STORE, "timeseries.range", series=series):
+            rows = self.connection.execute(RANGE_SQL, params).fetchall()
+            return [(ts, json.loads(data)) for ts, data in rows]
+
+    def records(self, series: str, *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        """Sample data of a range, see range()"""
+        return [data for _, data in self.range(series, *args, **kwargs)]
+
+    def revision(self, series: str, genesis: Optional[Any] = None) -> Tuple[str, int]:
+        """Genesis key and write counter of a series; changes whenever the
+        samples a read of the same arguments would return may have changed"""
+        key = self.key(genesis, series)
+        row = self.connection.execute(REVISION_SQL, (series,)).fetchone()
+        return key, row[0] if row else 0
+
+    def count(self, series: str, genesis: Optional[Any] = None) -> int:
+        """Number of samples of a series in one genesis"""
+        params = (series, self.key(genesis, series))
+        return self.connection.execute(COUNT_SQL, params).fetchone()[0]
+
+    def delete_range(
+        self,
+        series: str,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        genesis: Optional[Any] = None,
+    ) -> int:
+        """Delete samples in [start, end)"""
+        params = (
+            series,
+            self.key(genesis, series),
+            to_epoch(start) if start is not None else -MAX_TS,
+            to_epoch(end) if end is not None else MAX_TS,
+        )
+        conn = self.connection
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute(DELETE_RANGE_SQL, params).rowcount
+            if deleted:
+                conn.execute(BUMP_SQL, (series,))
+        return deleted
+
+    def replace_range(
+        self,
+        series: str,
+        start: Any,
+        end: Any,
+        samples: Iterable[Tuple[Any, Dict[str, Any]]],
+        genesis: Optional[Any] = None,
+    ) -> int:
+        """Atomically replace the samples in [start, end), e.g. when downsampling"""
+        key = self.key(genesis, series)
+        rows = [
+            (series, key, to_epoch(timestamp), json.dumps(data, default=json_default))
+            for timestamp, data in samples
+        ]
+        conn = self.connection
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                DELETE_RANGE_SQL, (series, key, to_epoch(start), to_epoch(end))
+            )
+            conn.executemany(INSERT_SQL, rows)
+            conn.execute(BUMP_SQL, (series,))
+        return len(rows)
+
+    def trim(self, series: str, keep: int, genesis: Optional[Any] = None) -> int:
+        """Delete all but the newest `keep` samples"""
+        key = self.key(genesis, series)
+        conn = self.connection
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute(
+                TRIM_SQL, (series, key, series, key, keep - 1)
+            ).rowcount
+            if deleted:
+                conn.execute(BUMP_SQL, (series,))
+        return deleted
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a bookkeeping value"""
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        """Write a bookkeeping value"""
+        conn = self.connection
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def migrate_files(
+        self,
+        files: GenesisStore,
+        pattern: str,
+        series: str,
+        importer: Callable[[str, List[Tuple[str, bytes]]], int],
+    ) -> None:
+        """Import file histories of every stored iteration once.
+
+        `importer(genesis, files)` receives the (name, content) pairs matching
+        `pattern` and returns the number of samples it stored. Only the owner
+        imports; other processes read the samples once it has.
+        """
+        if not self.owner:
+            return
+        for info in files.iterations():
+            genesis = info["genesis"]
+            marker = f"migrated:{series}:{files.location}:{genesis}"
+            if self.get_meta(marker) is not None:
+                continue
+            try:
+                contents = files.read_files(pattern, genesis)
+                count = importer(genesis, contents) if contents else 0
+            except Exception as e:
+                logger.error(
+                    f"Error importing {series} history of genesis {genesis}: {e}"
+                )
+                continue
+            self.set_meta(marker, str(count))
+            if count:
+                logger.info(f"Imported {count} {series} samples of genesis {genesis}")
+            if count and genesis == LEGACY_GENESIS:
+                self.split_legacy()
+
+    def iterations(self) -> List[Dict[str, Any]]:
+        """Every stored genesis with its sample count and time span"""
+        rows = self.connection.execute(
+            "SELECT genesis, COUNT(*), MIN(ts), MAX(ts) FROM samples GROUP BY genesis"
+        ).fetchall()
+        current = self.key()
+        return sorted(
+            (
+                {
+                    "genesis": genesis,
+                    "samples": count,
+                    "first": first,
+                    "last": last,
+                    "current": genesis == current,
+                }
+                for genesis, count, first, last in rows
+            ),
+            key=lambda info: info["genesis"],
+        )
+
+    def adopt_unknown(self, genesis: Any) -> None:
+        """Assign samples stored before the genesis was known to it"""
+        conn = self.connection
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE OR REPLACE samples SET genesis = ? WHERE genesis = ?",
+                (genesis_key(genesis), UNKNOWN_GENESIS),
+            )
+            conn.execute(BUMP_ALL_SQL)
+        self.split_legacy()
+
+    def split_legacy(self) -> int:
+        """Move samples imported from files of earlier releases that were
+        taken since the current genesis into its iteration, returning how
+        many moved; until the genesis is known they stay legacy"""
+        genesis = self.tracker.current
+        if genesis is None:
+            return 0
+        conn = self.connection
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            moved = conn.execute(
+                SPLIT_LEGACY_SQL, (genesis_key(genesis), LEGACY_GENESIS, genesis)
+            ).rowcount
+            if moved:
+                conn.execute(BUMP_ALL_SQL)
+        if moved:
+            logger.info(f"Moved {moved} legacy samples to genesis {genesis}")
+        return moved
+
+    def archive_path(self, key: str) -> str:
+        """Path of the archive of an iteration deleted from the database"""
+        return os.path.join(
+            os.path.dirname(self.location),
+            ARCHIVE_DIR,
+            f"{ARCHIVE_PREFIX}{genesis_key(key)}{ARCHIVE_SUFFIX}",
+        )
+
+    def archive_previous(self) -> int:
+        """Move prior iterations beyond `keep`, newest kept first, out of the
+        database into tar.gz archives with one JSON lines file per series,
+        and prune archives beyond `keep`. Returns how many were archived;
+        the current iteration is always kept."""
+        current = self.key()
+        previous = [
+            info
+            for info in self.iterations()
+            if info["genesis"] not in (current, UNKNOWN_GENESIS)
+        ]
+        previous.sort(key=lambda info: info["last"], reverse=True)
+        archived = []
+        for info in previous[self.keep :]:
+            key = info["genesis"]
+            try:
+                self.write_archive(key)
+            except Exception as e:
+                logger.error(f"Error archiving genesis {key} samples: {e}")
+                continue
+            archived.append(key)
+
+        if archived:
+            conn = self.connection
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "DELETE FROM samples WHERE genesis = ?",
+                    [(key,) for key in archived],
+                )
+                conn.execute(BUMP_ALL_SQL)
+            logger.info(f"Archived history of genesis {', '.join(archived)}")
+        self.prune_archives()
+        return len(archived)
+
+    def write_archive(self, key: str) -> None:
+        """Write every sample of an iteration to its archive"""
+        lines: Dict[str, List[str]] = {}
+        rows = self.connection.execute(ARCHIVE_SQL, (key,))
+        for series, ts, data in rows:
+            lines.setdefault(series, []).append(f'{{"ts": {ts!r}, "data": {data}}}\n')
+
+        archive = self.archive_path(key)
+        os.makedirs(os.path.dirname(archive), exist_ok=True)
+        with atomic_write(archive, "wb") as f:
+            with tarfile.open(fileobj=f, mode="w:gz") as tar:
+                for series, series_lines in sorted(lines.items()):
+                    content = "".join(series_lines).encode()
+                    member = tarfile.TarInfo(f"{series}.jsonl")
+                    member.size = len(content)
+                    tar.addfile(member, io.BytesIO(content))
+
+    def prune_archives(self) -> None:
+        """Delete the oldest archives beyond `keep`"""
+        directory = os.path.dirname(self.archive_path(UNKNOWN_GENESIS))
+        if not os.path.isdir(directory):
+            return
+        archives = [
+            entry.path
+            for entry in os.scandir(directory)
+            if entry.name.startswith(ARCHIVE_PREFIX)
+            and entry.name.endswith(ARCHIVE_SUFFIX)
+        ]
+        archives.sort(key=os.path.getmtime)
+        for path in archives[: max(0, len(archives) - self.keep)]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Error pruning archive {path}: {e}")
+
+
+# Shared store used by every dashboard module
+timeseries_store = TimeSeriesStore()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Metrics of Multi-Process Servers
+Every worker process of a gunicorn server keeps its own request histograms
+and collector statistics, and a scrape lands on whichever worker accepts it.
+With METRICS_MULTIPROC_DIR set (gunicorn.conf.py sets one per server), each
+worker writes a snapshot of its metrics to <dir>/<pid>.json every
+METRICS_PUBLISH_INTERVAL seconds and when it exits, and the metrics routes
+merge the snapshots of all workers. Snapshots of exited workers are kept, so
+counters and histograms do not go backwards when a worker is replaced.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Constants
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "")
+METRICS_PUBLISH_INTERVAL = float(os.environ.get("METRICS_PUBLISH_INTERVAL", "5"))
+SNAPSHOT_SUFFIX = ".json"
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkerMetrics:
+    """Snapshots of this process's metrics, shared with the other workers"""
+
+    def __init__(
+        self,
+        path: str = METRICS_MULTIPROC_DIR,
+        interval: float = METRICS_PUBLISH_INTERVAL,
+    ):
+        self.path = path
+        self.interval = interval
+        self._sources: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether metrics are merged across worker processes"""
+        return bool(self.path)
+
+    def register(self, name: str, snapshot: Callable[[], Any]) -> None:
+        """Publish `snapshot()` under `name` with the metrics of this process"""
+        with self._lock:
+            self._sources[name] = snapshot
+        self._start()
+
+    def _start(self) -> None:
+        """Start publishing in this process, once per process"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Not started yet, or started in the parent of a fork
+            self._pid = os.getpid()
+        os.makedirs(self.path, exist_ok=True)
+        threading.Thread(target=self._run, name="worker-metrics", daemon=True).start()
+        atexit.register(self.publish)
+
+    def _run(self) -> None:
+        """Publish periodically until the process exits"""
+        while True:
+            time.sleep(self.interval)
+            self.publish()
+
+    def _collect(self) -> Dict[str, Any]:
+        """Current snapshot of every registered source"""
+        with self._lock:
+            sources = list(self._sources.items())
+        metrics = {}
+        for name, snapshot in sources:
+            try:
+                metrics[name] = snapshot()
+            except Exception as e:
+                logger.error(f"Error taking {name} metrics snapshot: {e}")
+        return metrics
+
+    def publish(self) -> None:
+        """Write the snapshot of this process for the other workers"""
+        if not self.enabled:
+            return
+        data = {"pid": os.getpid(), "updated": time.time(), "metrics": self._collect()}
+        target = os.path.join(self.path, f"{os.getpid()}{SNAPSHOT_SUFFIX}")
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.error(f"Error publishing worker metrics to {self.path}: {e}")
+
+    def snapshots(self, name: str) -> List[Tuple[Any, bool]]:
+        """(snapshot, alive) of `name` for every worker, this one included.
+
+        This process contributes its current state, the others what they
+        published last.
+        """
+        own = self._collect().get(name)
+        result = [(own, True)] if own is not None else []
+        if not self.enabled:
+            return result
+        self._start()
+
+        try:
+            files = os.listdir(self.path)
+        except OSError:
+            return result
+        for filename in files:
+            if not filename.endswith(SNAPSHOT_SUFFIX):
+                continue
+            try:
+                pid = int(filename[: -len(SNAPSHOT_SUFFIX)])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.path, filename), "r") as f:
+                    snapshot = json.load(f)["metrics"].get(name)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping worker metrics {filename}: {e}")
+                continue
+            if snapshot is not None:
+                result.append((snapshot, process_alive(pid)))
+        return result
+
+
+# Shared snapshots of this process
+worker_metrics = WorkerMetrics()
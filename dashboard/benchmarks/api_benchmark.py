@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+"""
+Dashboard API Benchmark
+=======================
+Measures throughput and p50/p99 latency of every read-only route of the
+dashboard app (app/*), validator_metrics_api.py and dashboard_api.py, and
+the broadcast fan-out of sync_websocket.py at several client counts.
+
+The services run unmodified in their own processes, pointed at the local
+stand-ins of fake_upstreams.py and at a throw-away data directory filled by
+fleet_generator.py. Results are written as JSON; pass an earlier result file as
+--baseline to flag regressions. The HTTP services are served by the
+threaded Werkzeug server, or with --server gunicorn by gunicorn with
+app/gunicorn.conf.py and --workers worker processes of --threads threads.
+
+Usage: python api_benchmark.py [--requests 200] [--concurrency 8]
+           [--latency-ms 5] [--validators 1000] [--ws-clients 1,10,100]
+           [--targets app,validator_metrics_api,dashboard_api,websocket]
+           [--server werkzeug|gunicorn] [--workers 2] [--threads 8]
+           [--output FILE] [--baseline FILE] [--tolerance 0.25]
+
+Like the services themselves, the API scripts log to /var/log/ephemery,
+which has to exist and be writable.
+"""
+
+import argparse
+import asyncio
+import datetime
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DASHBOARD_DIR = os.path.dirname(BENCHMARKS_DIR)
+APP_DIR = os.path.join(DASHBOARD_DIR, "app")
+API_DIR = os.path.join(DASHBOARD_DIR, "api")
+
+sys.path.append(BENCHMARKS_DIR)
+from fake_upstreams import GENESIS_TIME, HEAD_SLOT, FakeUpstreams  # noqa: E402
+from fleet_generator import MIN_VALIDATORS, Fleet  # noqa: E402
+
+REQUEST_TIMEOUT = 30
+HISTORY_INTERVAL_MINUTES = 5
+STARTUP_TIMEOUT = 120
+GUNICORN_CONFIG = os.path.join(APP_DIR, "gunicorn.conf.py")
+
+# Read-only routes of each HTTP service; routes that restart clients, run
+# scripts or change settings are left out
+TARGETS = {
+    "app": {
+        "path": os.path.join(APP_DIR, "app.py"),
+        "routes": [
+            "/health",
+            "/api/status",
+            "/api/metrics",
+            "/api/genesis",
+            "/api/ingestion",
+            "/api/history",
+            "/api/history?max_points=200",
+            "/obol/api/metrics",
+            "/obol/api/analysis",
+            "/obol/api/history?max_points=200",
+            "/queue/api/data",
+            "/queue/api/forecast",
+            "/queue/api/history",
+            "/queue/api/efficiency",
+            "/profitability/api/analysis",
+            "/profitability/api/forecast",
+            "/profitability/api/forecast/scenarios",
+            "/profitability/api/simulation",
+            "/profitability/api/price",
+            "/profitability/api/optimization",
+            "/profitability/api/optimization/sweep",
+            "/profitability/api/cost-inputs",
+        ],
+    },
+    "validator_metrics_api": {
+        "path": os.path.join(API_DIR, "validator_metrics_api.py"),
+        "routes": [
+            "/health",
+            "/api/status",
+            "/api/metrics",
+            "/api/metrics/advanced",
+            "/api/history",
+            "/api/alerts",
+            "/api/alert_settings",
+            "/api/validators/live",
+            "/api/validator/1",
+        ],
+    },
+    "dashboard_api": {
+        "path": os.path.join(API_DIR, "dashboard_api.py"),
+        "routes": [
+            "/api/status",
+            "/api/genesis",
+            "/api/history",
+            "/api/history?max_points=200",
+        ],
+    },
+}
+WEBSOCKET_TARGET = "websocket"
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(seconds, elapsed=None):
+    """Latency statistics in milliseconds, with throughput if `elapsed` is set"""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"count": 0}
+    stats = {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+    if elapsed:
+        stats["throughput_rps"] = round(len(ordered) / elapsed, 1)
+    return stats
+
+
+def prepare_workdir(workdir, validators, history, seed=0):
+    """Data directory layout and fixtures shared by all services"""
+    data_dir = os.path.join(workdir, "data")
+    metrics_dir = os.path.join(data_dir, "metrics")
+    # History of the same genesis as the fake beacon node
+    Fleet(
+        validators=validators,
+        days=history * HISTORY_INTERVAL_MINUTES / 1440,
+        seed=seed,
+        interval_minutes=HISTORY_INTERVAL_MINUTES,
+        genesis=GENESIS_TIME,
+    ).write(data_dir)
+    os.makedirs(os.path.join(workdir, "scripts"), exist_ok=True)
+
+    # Every location is set, so nothing from the calling shell leaks in
+    return {
+        "EPHEMERY_BASE_DIR": workdir,
+        "EPHEMERY_CONFIG_PATH": os.path.join(workdir, "ephemery_paths.conf"),
+        "EPHEMERY_DATA_DIR": data_dir,
+        "EPHEMERY_METRICS_DIR": metrics_dir,
+        "EPHEMERY_SCRIPTS_DIR": os.path.join(workdir, "scripts"),
+        "DATA_DIR": os.path.join(workdir, "app"),
+        "QUEUE_DATA_DIR": os.path.join(data_dir, "lido-csm", "queue"),
+        "PROFITABILITY_DATA_DIR": os.path.join(data_dir, "lido-csm", "profitability"),
+        "GENESIS_TIME_FILE": os.path.join(data_dir, "last_genesis_time"),
+        "TIMESERIES_DB_PATH": os.path.join(data_dir, "dashboard_history.db"),
+        "PRICE_SOURCES": "coingecko",
+        "PRICE_FIXTURE_FILE": "",
+        "INGESTION_JITTER_SECONDS": "0",
+    }
+
+
+def sync_history(entries):
+    """Samples shaped like the sync histories of app.py and sync_websocket.py"""
+    now = datetime.datetime.now()
+    for i in reversed(range(entries)):
+        timestamp = (
+            now - datetime.timedelta(minutes=HISTORY_INTERVAL_MINUTES * i)
+        ).isoformat()
+        slot = HEAD_SLOT - i * 25
+        yield timestamp, {
+            "timestamp": timestamp,
+            "lighthouse": {
+                "head_slot": str(slot),
+                "sync_distance": str(i * 25),
+                "is_syncing": i > 0,
+                "data": {"head_slot": str(slot)},
+            },
+            "geth": {"is_syncing": False, "current_block": 7654321 - i * 30},
+        }
+
+
+def enter_service_process(env, log_file):
+    """Environment, import path and log redirection of a service process"""
+    os.environ.update(env)
+    sys.path.insert(0, APP_DIR)
+    # Service logs and the output of commands they run go to the log file
+    fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+
+
+def load_module(path):
+    """Import a service script under its file name"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Flask locates the app's root path through sys.modules
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed_history(env, log_file, entries, conn):
+    """Fill the sync histories of the shared time-series store"""
+    enter_service_process(env, log_file)
+    from timeseries import timeseries_store
+
+    for series in ("sync_history", "sync_websocket"):
+        timeseries_store.append_many(series, sync_history(entries), GENESIS_TIME)
+    conn.send(True)
+
+
+def serve_upstreams(latency_ms, validators, conn):
+    """Run the fake upstreams until the process is terminated"""
+    fakes = FakeUpstreams(latency_ms, validators).start()
+    conn.send(fakes.environment())
+    threading.Event().wait()
+
+
+def serve_target(path, env, log_file, conn):
+    """Serve one Flask service on an ephemeral port"""
+    enter_service_process(env, log_file)
+    from werkzeug.serving import make_server
+
+    module = load_module(path)
+    server = make_server("127.0.0.1", 0, module.app, threaded=True)
+    conn.send(server.port)
+    server.serve_forever()
+
+
+def free_port():
+    """A port that was free a moment ago"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(path, env, log_file, workers, threads):
+    """Serve one Flask service with gunicorn, returning it and its port"""
+    port = free_port()
+    module = os.path.splitext(os.path.basename(path))[0]
+    env = dict(
+        os.environ,
+        **env,
+        SERVING_BIND=f"127.0.0.1:{port}",
+        SERVING_WORKERS=str(workers),
+        SERVING_THREADS=str(threads),
+        SERVING_LOG_LEVEL="warning",
+    )
+    with open(log_file, "a") as log:
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--config",
+                GUNICORN_CONFIG,
+                "--chdir",
+                os.path.dirname(path),
+                "--access-logfile",
+                os.devnull,
+                f"{module}:app",
+            ],
+            env=env,
+            stdout=log,
+            stderr=log,
+        )
+    return process, port
+
+
+def start_process(context, target, *args):
+    """Start a process and return it with the first message it sends"""
+    parent, child = context.Pipe()
+    process = context.Process(target=target, args=args + (child,), daemon=True)
+    process.start()
+    if not parent.poll(STARTUP_TIMEOUT):
+        process.terminate()
+        raise RuntimeError(f"{target.__name__} did not start")
+    return process, parent.recv()
+
+
+def measure_route(url, count, concurrency, warmup):
+    """Latency of `count` GET requests issued by `concurrency` clients"""
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def request_once(_):
+        start = time.perf_counter()
+        try:
+            response = session().get(url, timeout=REQUEST_TIMEOUT)
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        return time.perf_counter() - start, status
+
+    for _ in range(warmup):
+        request_once(None)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(request_once, range(count)))
+        elapsed = time.perf_counter() - start
+
+    stats = summarize([latency for latency, _ in results], elapsed)
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    stats["statuses"] = statuses
+    return stats
+
+
+def wait_until_ready(base_url, route):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + route, timeout=REQUEST_TIMEOUT)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not become ready")
+
+
+def benchmark_target(context, name, env, workdir, args):
+    """Start one HTTP service and measure each of its routes"""
+    target = TARGETS[name]
+    log_file = os.path.join(workdir, f"{name}.log")
+    if args.server == "gunicorn":
+        process, port = start_gunicorn(
+            target["path"], env, log_file, args.workers, args.threads
+        )
+    else:
+        process, port = start_process(
+            context, serve_target, target["path"], env, log_file
+        )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, target["routes"][0])
+        # Let scheduled collectors complete their first run
+        time.sleep(args.settle)
+        results = {}
+        for route in target["routes"]:
+            stats = measure_route(
+                base_url + route, args.requests, args.concurrency, args.warmup
+            )
+            results[route] = stats
+            print_stats(name, route, stats)
+        return results
+    finally:
+        process.terminate()
+        if args.server == "gunicorn":
+            process.wait()
+        else:
+            process.join()
+
+
+def websocket_fanout(env, log_file, client_counts, messages, conn):
+    """Measure status updates and broadcasts of sync_websocket.py"""
+    enter_service_process(env, log_file)
+    module = load_module(os.path.join(API_DIR, "sync_websocket.py"))
+    conn.send(asyncio.run(measure_fanout(module, client_counts, messages)))
+
+
+async def measure_fanout(module, client_counts, messages):
+    import websockets
+
+    async def handler(websocket, path=None):
+        await module.handle_client(websocket, path)
+
+    async def receive(client):
+        await client.recv()
+        return time.perf_counter()
+
+    # Polling the fakes, as the status updater does before each broadcast
+    timings = []
+    for _ in range(messages):
+        start = time.perf_counter()
+        await module.update_sync_status()
+        timings.append(time.perf_counter() - start)
+    results = {"status_update": summarize(timings)}
+    message = json.dumps(module.current_sync_status)
+
+    async with websockets.serve(handler, "127.0.0.1", 0, max_queue=None) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        uri = f"ws://127.0.0.1:{port}"
+        for count in client_counts:
+            clients = await asyncio.gather(
+                *(websockets.connect(uri, max_size=None) for _ in range(count))
+            )
+            # Every client is sent the current status when it connects
+            await asyncio.gather(*(client.recv() for client in clients))
+
+            fanout = []
+            delivery = []
+            for _ in range(messages):
+                start = time.perf_counter()
+                received = await asyncio.gather(
+                    module.broadcast(message), *(receive(client) for client in clients)
+                )
+                delivery.extend(at - start for at in received[1:])
+                fanout.append(max(received[1:]) - start)
+
+            await asyncio.gather(*(client.close() for client in clients))
+            while module.connected_clients:
+                await asyncio.sleep(0.01)
+
+            results[f"clients_{count}"] = {
+                "clients": count,
+                "message_bytes": len(message),
+                "fanout": summarize(fanout),
+                "delivery": summarize(delivery),
+                "deliveries_per_second": round(count * messages / sum(fanout), 1),
+            }
+    return results
+
+
+def benchmark_websocket(context, env, workdir, args):
+    log_file = os.path.join(workdir, "sync_websocket.log")
+    process, results = start_process(
+        context,
+        websocket_fanout,
+        env,
+        log_file,
+        args.ws_clients,
+        args.ws_messages,
+    )
+    process.join()
+    print_stats(WEBSOCKET_TARGET, "status update", results["status_update"])
+    for count in args.ws_clients:
+        result = results[f"clients_{count}"]
+        print_stats(WEBSOCKET_TARGET, f"fan-out to {count}", result["fanout"])
+    return results
+
+
+def print_stats(target, route, stats):
+    errors = sum(
+        count
+        for status, count in stats.get("statuses", {}).items()
+        if not status.isdigit() or int(status) >= 500
+    )
+    throughput = stats.get("throughput_rps")
+    print(
+        f"{target:<22}{route:<40}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        f"{throughput if throughput is not None else '':>10}{errors:>8}"
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Print latency changes against a baseline; returns the regressions"""
+    rows = []
+    for target, routes in results.get("http", {}).items():
+        for route, stats in routes.items():
+            before = baseline.get("http", {}).get(target, {}).get(route)
+            if before:
+                rows.append((target, route, before, stats))
+    for key, result in results.get("websocket", {}).items():
+        before = baseline.get("websocket", {}).get(key)
+        if key == "status_update":
+            if before:
+                rows.append((WEBSOCKET_TARGET, key, before, result))
+        elif before:
+            rows.append((WEBSOCKET_TARGET, key, before["fanout"], result["fanout"]))
+
+    regressions = []
+    print(f"\n{'target':<22}{'route':<40}{'p50 change':>12}{'p99 change':>12}")
+    for target, route, before, after in rows:
+        changes = []
+        for key in ("p50_ms", "p99_ms"):
+            if before.get(key) and after.get(key) is not None:
+                change = after[key] / before[key] - 1
+                changes.append(f"{change:>+11.0%}")
+                if change > tolerance:
+                    regressions.append((target, route, key, before[key], after[key]))
+            else:
+                changes.append(f"{'n/a':>11}")
+        print(f"{target:<22}{route:<40}{changes[0]:>12}{changes[1]:>12}")
+
+    for target, route, key, before, after in regressions:
+        print(f"Regression: {target} {route} {key} {before:.2f} -> {after:.2f} ms")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Concurrent HTTP clients"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=3, help="Untimed requests per route"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=5.0, help="Latency of the fake upstreams"
+    )
+    parser.add_argument(
+        "--validators", type=int, default=1000, help="Validators in upstream payloads"
+    )
+    parser.add_argument(
+        "--history", type=int, default=2000, help="Samples in each seeded history"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the generated fleet data"
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds to wait after startup for background collectors",
+    )
+    parser.add_argument(
+        "--server",
+        choices=("werkzeug", "gunicorn"),
+        default="werkzeug",
+        help="Server of the HTTP services",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=2, help="gunicorn worker processes"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads per gunicorn worker"
+    )
+    parser.add_argument(
+        "--ws-clients",
+        default="1,10,100",
+        help="Comma-separated WebSocket client counts",
+    )
+    parser.add_argument(
+        "--ws-messages", type=int, default=20, help="Broadcasts per client count"
+    )
+    parser.add_argument(
+        "--targets",
+        default=",".join(list(TARGETS) + [WEBSOCKET_TARGET]),
+        help="Comma-separated services to measure",
+    )
+    parser.add_argument(
+        "--output",
+        default=f"api_benchmark_{datetime.datetime.now():%Y%m%d_%H%M%S}.json",
+        help="Result file",
+    )
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative p50/p99 increase over the baseline",
+    )
+    args = parser.parse_args()
+    args.ws_clients = [int(count) for count in args.ws_clients.split(",") if count]
+    args.targets = [target for target in args.targets.split(",") if target]
+    if args.validators < MIN_VALIDATORS:
+        parser.error(f"--validators must be at least {MIN_VALIDATORS}")
+    unknown = set(args.targets) - set(TARGETS) - {WEBSOCKET_TARGET}
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main():
+    args = parse_args()
+    context = multiprocessing.get_context("spawn")
+    results = {
+        "meta": {
+            "started": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "json_encoder": os.environ.get("JSON_ENCODER", "auto"),
+            "settings": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "baseline")
+            },
+        },
+        "http": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="dashboard-benchmark-") as workdir:
+        os.makedirs(os.path.join(workdir, "data"))
+        env = prepare_workdir(workdir, args.validators, args.history, args.seed)
+        upstreams, upstream_env = start_process(
+            context, serve_upstreams, args.latency_ms, args.validators
+        )
+        env.update(upstream_env)
+        try:
+            seeder, _ = start_process(
+                context,
+                seed_history,
+                env,
+                os.path.join(workdir, "seed.log"),
+                args.history,
+            )
+            seeder.join()
+
+            print(
+                f"{'target':<22}{'route':<40}{'p50 ms':>10}{'p99 ms':>10}"
+                f"{'req/s':>10}{'errors':>8}"
+            )
+            for name in args.targets:
+                if name == WEBSOCKET_TARGET:
+                    results["websocket"] = benchmark_websocket(
+                        context, env, workdir, args
+                    )
+                else:
+                    results["http"][name] = benchmark_target(
+                        context, name, env, workdir, args
+                    )
+        finally:
+            upstreams.terminate()
+            upstreams.join()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
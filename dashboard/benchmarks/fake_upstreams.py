@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Fake Upstream Services
+======================
+Local stand-ins for the services the dashboard polls: the Lighthouse beacon
+and validator APIs, Geth JSON-RPC, Charon /metrics, the Lido CSM API and the
+CoinGecko price API. Every response is delayed by a configurable latency and
+sized by the number of validators, so the dashboard can be measured against
+slow or large upstreams without a running node.
+
+Usage: python fake_upstreams.py [--latency-ms 20] [--validators 1000]
+
+The environment variables printed on startup point the dashboard services at
+the fakes.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENESIS_TIME = 1700000000
+HEAD_SLOT = 123456
+BLOCK_NUMBER = 7654321
+
+
+def beacon_validators(count):
+    """Body of /eth/v1/beacon/states/head/validators"""
+    return {
+        "execution_optimistic": False,
+        "finalized": False,
+        "data": [beacon_validator(index) for index in range(count)],
+    }
+
+
+def beacon_validator(index):
+    """One validator as the beacon API returns it"""
+    return {
+        "index": str(index),
+        "balance": str(32000000000 + (index * 7919) % 100000000),
+        "status": "active_ongoing",
+        "validator": {
+            "pubkey": "0x" + f"{index:096x}",
+            "withdrawal_credentials": "0x" + f"{index:064x}",
+            "effective_balance": "32000000000",
+            "slashed": False,
+            "activation_eligibility_epoch": "0",
+            "activation_epoch": "0",
+            "exit_epoch": "18446744073709551615",
+            "withdrawable_epoch": "18446744073709551615",
+        },
+    }
+
+
+def validator_metrics(count):
+    """Prometheus text of a Lighthouse validator client"""
+    lines = [
+        "# TYPE validator_active_validators gauge",
+        f"validator_active_validators {count}",
+        "# TYPE validator_attestation_effectiveness gauge",
+        "validator_attestation_effectiveness 0.97",
+        "# TYPE validator_balance_average gauge",
+        "validator_balance_average 32.01",
+        "# TYPE validator_effectiveness gauge",
+        "validator_effectiveness 0.97",
+        "# TYPE validator_attestations_missed_total counter",
+        "validator_attestations_missed_total 3",
+    ]
+    lines.append("# TYPE validator_balance_gwei gauge")
+    lines.extend(
+        f'validator_balance_gwei{{index="{index}"}} {32000000000 + index}'
+        for index in range(count)
+    )
+    return "\n".join(lines) + "\n"
+
+
+def charon_metrics(count):
+    """Prometheus text of a Charon distributed validator client"""
+    lines = [
+        "# TYPE charon_consensus_count counter",
+        'charon_consensus_count{result="success"} 9870',
+        'charon_consensus_count{result="failure"} 130',
+        "# TYPE charon_peers_connected gauge",
+        "charon_peers_connected 3",
+    ]
+    lines.append("# TYPE core_validator_duty_total counter")
+    lines.extend(
+        f'core_validator_duty_total{{duty="attester",pubkey="0x{index:08x}"}} '
+        f"{1000 + index % 17}"
+        for index in range(count)
+    )
+    return "\n".join(lines) + "\n"
+
+
+class FakeUpstreams:
+    """Runs one HTTP server per upstream on ephemeral local ports"""
+
+    def __init__(self, latency_ms=0.0, validators=100, host="127.0.0.1", seed=0):
+        self.latency = latency_ms / 1000.0
+        self.validators = validators
+        self.host = host
+        self.random = random.Random(seed)
+        self.servers = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+        # Large payloads are rendered once, the fakes only pay for I/O
+        self._bodies = {}
+
+    def body(self, name, build):
+        """Cached response body"""
+        if name not in self._bodies:
+            self._bodies[name] = build()
+        return self._bodies[name]
+
+    def start(self):
+        """Start every server in a daemon thread"""
+        routes = {
+            "lighthouse": self.lighthouse,
+            "validator": self.validator_client,
+            "geth": self.geth,
+            "charon": self.charon,
+            "csm": self.csm,
+        }
+        for name, route in routes.items():
+            server = ThreadingHTTPServer((self.host, 0), self._handler(name, route))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers[name] = server
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def url(self, name):
+        host, port = self.servers[name].server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self):
+        """Environment variables pointing the dashboard services at the fakes"""
+        lighthouse = self.url("lighthouse")
+        geth = self.url("geth")
+        return {
+            # app/app.py
+            "LIGHTHOUSE_API_URL": lighthouse,
+            "GETH_API_URL": geth,
+            # api/sync_websocket.py and api/dashboard_api.py
+            "LIGHTHOUSE_API_ENDPOINT": lighthouse,
+            "GETH_API_ENDPOINT": geth,
+            # api/validator_metrics_api.py
+            "BEACON_NODE_ENDPOINT": lighthouse,
+            "VALIDATOR_ENDPOINT": self.url("validator"),
+            # genesis tracker, Obol and profitability modules
+            "BEACON_API_ENDPOINT": lighthouse,
+            "CHARON_METRICS_ENDPOINT": f"{self.url('charon')}/metrics",
+            "VALIDATOR_METRICS_ENDPOINT": f"{self.url('validator')}/metrics",
+            "CSM_API_ENDPOINT": self.url("csm"),
+            "COINGECKO_PRICE_URL": (
+                f"{self.url('csm')}/api/v3/simple/price?ids=ethereum&vs_currencies=usd"
+            ),
+        }
+
+    def request_counts(self):
+        with self._lock:
+            return dict(self.requests)
+
+    def _handler(self, name, route):
+        fakes = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._respond(None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self._respond(self.rfile.read(length) if length else b"")
+
+            def _respond(self, body):
+                with fakes._lock:
+                    fakes.requests[name] = fakes.requests.get(name, 0) + 1
+                if fakes.latency:
+                    time.sleep(fakes.latency)
+                status, content_type, payload = route(self.path.split("?")[0], body)
+                if not isinstance(payload, bytes):
+                    payload = payload.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def json(data, status=200):
+        return status, "application/json", json.dumps(data)
+
+    def lighthouse(self, path, body):
+        """Beacon API of a Lighthouse node"""
+        if path == "/eth/v1/node/syncing":
+            return self.json(
+                {
+                    "data": {
+                        "head_slot": str(HEAD_SLOT),
+                        "sync_distance": "0",
+                        "is_syncing": False,
+                        "is_optimistic": False,
+                        "el_offline": False,
+                    }
+                }
+            )
+        if path == "/eth/v1/beacon/genesis":
+            return self.json(
+                {
+                    "data": {
+                        "genesis_time": str(GENESIS_TIME),
+                        "genesis_validators_root": "0x" + "00" * 32,
+                        "genesis_fork_version": "0x1000101b",
+                    }
+                }
+            )
+        if path == "/eth/v1/beacon/states/head/validators":
+            payload = self.body(
+                "validators",
+                lambda: json.dumps(beacon_validators(self.validators)),
+            )
+            return 200, "application/json", payload
+        prefix = "/eth/v1/beacon/states/head/validators/"
+        if path.startswith(prefix):
+            index = path[len(prefix) :]
+            if not index.isdigit() or int(index) >= self.validators:
+                return self.json({"code": 404, "message": "Unknown validator"}, 404)
+            return self.json({"data": beacon_validator(int(index))})
+        return self.json({"code": 404, "message": "Not found"}, 404)
+
+    def validator_client(self, path, body):
+        """Prometheus endpoint of the Lighthouse validator client"""
+        if path == "/metrics":
+            payload = self.body(
+                "validator_metrics", lambda: validator_metrics(self.validators)
+            )
+            return 200, "text/plain; version=0.0.4", payload
+        return 404, "text/plain", "Not found"
+
+    def geth(self, path, body):
+        """Geth JSON-RPC"""
+        try:
+            call = json.loads(body or b"{}")
+        except ValueError:
+            return self.json({"jsonrpc": "2.0", "error": {"code": -32700}}, 400)
+        results = {
+            "eth_syncing": False,
+            "eth_blockNumber": hex(BLOCK_NUMBER),
+            "net_peerCount": hex(25),
+        }
+        method = call.get("method")
+        if method not in results:
+            error = {"code": -32601, "message": f"the method {method} does not exist"}
+            return self.json({"jsonrpc": "2.0", "id": call.get("id"), "error": error})
+        return self.json(
+            {"jsonrpc": "2.0", "id": call.get("id"), "result": results[method]}
+        )
+
+    def charon(self, path, body):
+        """Prometheus endpoint of a Charon node"""
+        if path == "/metrics":
+            payload = self.body("charon", lambda: charon_metrics(self.validators))
+            return 200, "text/plain; version=0.0.4", payload
+        return 404, "text/plain", "Not found"
+
+    def csm(self, path, body):
+        """Lido CSM API, and the CoinGecko price API on the same server"""
+        now = int(time.time())
+        if path == "/api/v1/queue/status":
+            return self.json(
+                {
+                    "queue_length": 5000 + self.random.randint(-50, 50),
+                    "position": 1200 + self.random.randint(-10, 10),
+                    "wait_time_estimate": 72.0,
+                    "velocity": 1.2,
+                    "acceleration": 0.05,
+                    "stake_rate": 32.0,
+                    "timestamp": now,
+                }
+            )
+        if path == "/api/v1/validators/performance":
+            return self.json(
+                {
+                    "validator_count": self.validators,
+                    "attestation_rate": 0.99,
+                    "proposal_rate": 0.98,
+                    "avg_balance": 32.5,
+                    "avg_rewards_daily": 0.00175,
+                    "timestamp": now,
+                }
+            )
+        if path == "/api/v3/simple/price":
+            return self.json({"ethereum": {"usd": 3000.0}})
+        return self.json({"error": "Not found"}, 404)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Delay of every response"
+    )
+    parser.add_argument(
+        "--validators", type=int, default=100, help="Validators in each payload"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    args = parser.parse_args()
+
+    fakes = FakeUpstreams(args.latency_ms, args.validators, args.host).start()
+    for name, value in fakes.environment().items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,713 @@
+#!/usr/bin/env python3
+"""
+Synthetic Fleet Data
+====================
+Generates the files the dashboard reads for a fleet of 10 to 100k validators
+over any number of days: validator_metrics.json, the validator history and
+alert files written by advanced_validator_monitoring.sh, the queue and
+performance CSV histories of the Lido CSM modules and the Obol metrics
+history. Values follow random walks around realistic levels, with attestation
+incidents, missed proposals and activations spread over the period, and the
+same seed and end time always produce byte-identical files.
+
+Usage: python fleet_generator.py --output-dir DIR [--validators 10000]
+       [--days 30] [--seed 0] [--end 2024-01-31T00:00:00]
+
+The environment variables printed at the end point the dashboard services at
+the generated files.
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MIN_VALIDATORS = 10
+MAX_VALIDATORS = 100000
+
+SECONDS_PER_EPOCH = 384
+SLOTS_PER_DAY = 7200
+# Validators of the whole network, proposals are shared among them
+NETWORK_VALIDATORS = 200000
+# Consensus rewards of a perfectly performing validator, in ETH per day
+DAILY_REWARD = 0.00175
+SLASHING_PENALTY = 1.0
+
+STATUSES = (
+    "active_ongoing",
+    "pending_queued",
+    "active_exiting",
+    "exited_unslashed",
+    "active_slashed",
+)
+STATUS_WEIGHTS = (0.94, 0.03, 0.01, 0.015, 0.005)
+ACTIVE_STATUSES = (0, 2, 4)
+PENDING_STATUS = 1
+EXITED_STATUS = 3
+SLASHED_STATUS = 4
+
+# Default attestation threshold of validator_metrics_api.py's alert settings
+ATTESTATION_THRESHOLD = 95
+# Validators listed in one alert, the count covers all of them
+ALERT_VALIDATOR_LIMIT = 100
+
+# Independent random stream of every dataset, so changing how one is
+# generated does not change the others
+STREAMS = {
+    "fleet": 0,
+    "history": 1,
+    "alerts": 2,
+    "queue": 3,
+    "performance": 4,
+    "obol": 5,
+}
+
+# Samples of the performance history, profitability_calculator.py collects
+# them every PERFORMANCE_REFRESH_INTERVAL
+PERFORMANCE_INTERVAL = datetime.timedelta(hours=1)
+OBOL_CLUSTER_PEERS = 3
+
+
+def random_walk(rng, size, scale):
+    """Gaussian random walk starting at 0"""
+    steps = rng.normal(0, scale, size)
+    steps[0] = 0
+    return np.cumsum(steps)
+
+
+def bridge(rng, size, scale):
+    """Random walk pinned to 0 at both ends"""
+    walk = random_walk(rng, size, scale)
+    return walk - walk[-1] * np.linspace(0, 1, size)
+
+
+def ar1(rng, size, scale, phi=0.95):
+    """Mean-reverting noise around 0"""
+    noise = rng.normal(0, scale, size)
+    for i in range(1, size):
+        noise[i] += phi * noise[i - 1]
+    return noise
+
+
+def unique_seconds(offsets):
+    """Sorted integer second offsets made strictly increasing, so that the
+    timestamps of the alert file names never collide"""
+    offsets = np.sort(np.asarray(offsets, dtype=np.int64))
+    steps = np.arange(len(offsets))
+    return np.maximum.accumulate(offsets - steps) + steps
+
+
+def age(seconds):
+    """Age as the dashboard shows it, e.g. 2m ago"""
+    if seconds < 60:
+        return f"{seconds}s ago"
+    if seconds < 3600:
+        return f"{seconds // 60}m ago"
+    if seconds < 86400:
+        return f"{seconds // 3600}h ago"
+    return f"{seconds // 86400}d ago"
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+class Fleet:
+    """A synthetic validator fleet and its history.
+
+    Every dataset is derived from the per-validator state drawn in the
+    constructor and from its own seeded random stream.
+    """
+
+    def __init__(
+        self,
+        validators=1000,
+        days=30.0,
+        seed=0,
+        interval_minutes=5,
+        end=None,
+        genesis=None,
+        obol_validators=None,
+    ):
+        if not MIN_VALIDATORS <= validators <= MAX_VALIDATORS:
+            raise ValueError(
+                f"validators must be between {MIN_VALIDATORS} and {MAX_VALIDATORS}"
+            )
+        if days <= 0 or interval_minutes <= 0:
+            raise ValueError("days and interval_minutes must be positive")
+
+        self.validators = validators
+        self.days = days
+        self.seed = seed
+        self.interval = datetime.timedelta(minutes=interval_minutes)
+        self.samples = max(2, round(days * 1440 / interval_minutes))
+        # Naive local time, like the timestamps of the collectors
+        if end is None:
+            end = datetime.datetime.now().replace(second=0, microsecond=0)
+        self.end = end
+        self.start = end - self.interval * (self.samples - 1)
+        self.genesis = int(self.start.timestamp()) if genesis is None else genesis
+        if obol_validators is None:
+            obol_validators = min(validators, 32)
+        self.obol_validators = min(obol_validators, validators)
+
+        # Elapsed days of every history sample
+        self.elapsed = np.arange(self.samples) * (interval_minutes / 1440)
+        self._draw_validators()
+        self._draw_history()
+        self._alerts = None
+
+    def rng(self, stream):
+        return np.random.default_rng([self.seed, STREAMS[stream]])
+
+    def timestamp(self, index):
+        """ISO timestamp of history sample `index`"""
+        return (self.start + self.interval * int(index)).isoformat()
+
+    def _draw_validators(self):
+        rng = self.rng("fleet")
+        count = self.validators
+
+        self.status = rng.choice(len(STATUSES), size=count, p=STATUS_WEIGHTS)
+        self.active = np.isin(self.status, ACTIVE_STATUSES)
+        # Most validators attest almost perfectly, a long tail does not, and
+        # a few are offline
+        effectiveness = 100 - rng.gamma(0.6, 2.5, count)
+        offline = rng.random(count) < 0.01
+        effectiveness[offline] = rng.uniform(0, 50, offline.sum())
+        self.effectiveness = np.clip(effectiveness, 0, 100)
+        self.effectiveness[~self.active] = 0
+
+        # A share of the active validators was activated during the period
+        activated = self.active & (rng.random(count) < 0.05)
+        self.activation = np.full(count, -1.0)
+        self.activation[activated] = rng.uniform(0, self.days, activated.sum())
+        earning_days = np.where(activated, self.days - self.activation, self.days)
+
+        balance = (
+            32
+            + rng.normal(0.01, 0.003, count)
+            + earning_days * DAILY_REWARD * self.effectiveness / 100
+        )
+        balance[self.status == SLASHED_STATUS] -= SLASHING_PENALTY
+        balance[self.status == PENDING_STATUS] = 32
+        balance[self.status == EXITED_STATUS] = 0
+        self.balance = balance
+
+        proposal_rate = SLOTS_PER_DAY / max(NETWORK_VALIDATORS, count)
+        self.proposals = np.where(
+            self.active, rng.poisson(proposal_rate * earning_days), 0
+        )
+        self.missed_proposals = rng.binomial(
+            self.proposals, np.clip((100 - self.effectiveness) / 100, 0, 1)
+        )
+        # Day of every missed proposal, by validator
+        self.missed_proposal_days = {
+            index: np.sort(
+                rng.uniform(
+                    self.days - earning_days[index],
+                    self.days,
+                    self.missed_proposals[index],
+                )
+            )
+            for index in np.flatnonzero(self.missed_proposals).tolist()
+        }
+
+        self.sync_participation = np.clip(
+            self.effectiveness - rng.gamma(1.0, 0.5, count), 0, 100
+        )
+        # Seconds since the last attestation, hours for offline validators
+        self.last_attestation = np.where(
+            offline,
+            rng.integers(3600, 86400, count),
+            rng.integers(0, SECONDS_PER_EPOCH, count),
+        )
+
+    def _draw_history(self):
+        rng = self.rng("history")
+        samples = self.samples
+        active = self.active.sum()
+
+        activations = np.sort(self.activation[self.activation >= 0])
+        self.history_active = (
+            active
+            - len(activations)
+            + np.searchsorted(activations, self.elapsed, side="right")
+        )
+
+        mean_effectiveness = self.effectiveness[self.active].mean() if active else 100.0
+        average_balance = self.balance[self.active].mean() if active else 32.0
+        # Rewards accrue over the period and end at the current balances
+        self.history_balance = (
+            average_balance
+            - (self.days - self.elapsed) * DAILY_REWARD * mean_effectiveness / 100
+            + bridge(rng, samples, 0.00002)
+        )
+
+        rate = mean_effectiveness + ar1(rng, samples, 0.05)
+        # Attestation incidents: client bugs, restarts, network splits
+        incidents = []
+        for _ in range(rng.poisson(max(self.days / 7, 1))):
+            start = int(rng.integers(0, samples))
+            length = int(rng.integers(3, 36))
+            depth = float(rng.uniform(5, 40))
+            rate[start : start + length] -= depth
+            incidents.append((start, min(length, samples - start), depth))
+        self.history_rate = np.clip(rate, 0, 100)
+        self.incidents = sorted(incidents)
+
+        epochs = self.interval.total_seconds() / SECONDS_PER_EPOCH
+        self.history_missed = np.rint(
+            self.history_active * (100 - self.history_rate) / 100 * epochs
+        ).astype(int)
+
+    def validator_history(self):
+        """validator_history.json of advanced_validator_monitoring.sh"""
+        balances = np.round(self.history_balance, 6).tolist()
+        rates = np.round(self.history_rate, 2).tolist()
+        return [
+            {
+                "timestamp": self.timestamp(i),
+                "active_validators": active,
+                "average_balance": balance,
+                "balance": round(balance * active, 6),
+                "attestation_rate": rate,
+                "missed_attestations": missed,
+            }
+            for i, (active, balance, rate, missed) in enumerate(
+                zip(
+                    self.history_active.tolist(),
+                    balances,
+                    rates,
+                    self.history_missed.tolist(),
+                )
+            )
+        ]
+
+    def alerts(self):
+        """Alerts as advanced_validator_monitoring.sh writes them, oldest first"""
+        if self._alerts is not None:
+            return self._alerts
+
+        rng = self.rng("alerts")
+        period = self.samples * self.interval.total_seconds()
+        interval = self.interval.total_seconds()
+        active = np.flatnonzero(self.active)
+        events = []
+
+        for start, length, depth in self.incidents:
+            rate = float(self.history_rate[start : start + length].min())
+            if rate >= ATTESTATION_THRESHOLD or not len(active):
+                continue
+            affected = rng.choice(
+                active, size=max(1, int(len(active) * depth / 100)), replace=False
+            )
+            events.append(
+                (
+                    start * interval + rng.uniform(0, interval),
+                    {
+                        "alert_type": "attestation_rate",
+                        "title": "Low attestation rate",
+                        "severity": "critical" if rate < 80 else "warning",
+                        "message": (
+                            f"Attestation rate dropped to {rate:.2f}% "
+                            f"(threshold {ATTESTATION_THRESHOLD}%)"
+                        ),
+                        "threshold": ATTESTATION_THRESHOLD,
+                    },
+                    np.sort(affected),
+                )
+            )
+
+        # Daily check of validators that stay below the threshold
+        underperforming = np.flatnonzero(
+            self.active & (self.effectiveness < ATTESTATION_THRESHOLD)
+        )
+        if len(underperforming):
+            for day in range(int(np.ceil(self.days))):
+                events.append(
+                    (
+                        day * 86400
+                        + rng.uniform(0, max(1, min(86400, period - day * 86400))),
+                        {
+                            "alert_type": "validator_effectiveness",
+                            "title": "Underperforming validators",
+                            "severity": "warning",
+                            "message": (
+                                f"{len(underperforming)} validators below "
+                                f"{ATTESTATION_THRESHOLD}% effectiveness"
+                            ),
+                            "threshold": ATTESTATION_THRESHOLD,
+                        },
+                        underperforming,
+                    )
+                )
+
+        for index, days in self.missed_proposal_days.items():
+            for day in days.tolist():
+                events.append(
+                    (
+                        day * 86400,
+                        {
+                            "alert_type": "missed_proposal",
+                            "title": "Missed block proposal",
+                            "severity": "critical",
+                            "message": f"Validator {index} missed a block proposal",
+                            "threshold": 0,
+                        },
+                        np.array([index]),
+                    )
+                )
+
+        events.sort(key=lambda event: event[0])
+        seconds = unique_seconds([min(event[0], period - 1) for event in events])
+        alerts = []
+        for second, (_, alert, affected) in zip(seconds.tolist(), events):
+            moment = self.start + datetime.timedelta(seconds=second)
+            sample = min(int(second // interval), self.samples - 1)
+            alert = dict(
+                alert,
+                timestamp=moment.isoformat(),
+                average_balance=round(float(self.history_balance[sample]), 6),
+                affected_count=len(affected),
+                affected_validators=affected[:ALERT_VALIDATOR_LIMIT].tolist(),
+            )
+            alerts.append((moment, alert))
+        self._alerts = alerts
+        return alerts
+
+    def validator_metrics(self):
+        """validator_metrics.json as the validator dashboard reads it"""
+        active = int(self.active.sum())
+        proposals = int(self.proposals.sum())
+        missed_proposals = int(self.missed_proposals.sum())
+        per_day = round(1440 / (self.interval.total_seconds() / 60))
+        week = max(0, self.samples - 1 - 7 * per_day)
+        day = max(0, self.samples - 1 - per_day)
+
+        daily = range(self.samples - 1, -1, -per_day)
+        balance_history = [
+            {
+                "date": (self.start + self.interval * i).date().isoformat(),
+                "value": round(float(self.history_balance[i]), 6),
+            }
+            for i in reversed(daily)
+        ]
+        attestation_history = [
+            {
+                "date": (self.start + self.interval * i).date().isoformat(),
+                "value": round(float(self.history_rate[i]), 2),
+            }
+            for i in reversed(daily)
+        ]
+
+        validators = [
+            {
+                "index": index,
+                "pubkey": f"0x{index:096x}",
+                "status": STATUSES[status],
+                "balance": balance,
+                "effectiveness": effectiveness,
+                "last_attestation": age(last) if status in ACTIVE_STATUSES else "-",
+                "proposals": f"{total - missed}/{total}",
+                "sync_participation": sync,
+            }
+            for index, status, balance, effectiveness, last, total, missed, sync in zip(
+                range(self.validators),
+                self.status.tolist(),
+                np.round(self.balance, 6).tolist(),
+                np.round(self.effectiveness, 2).tolist(),
+                self.last_attestation.tolist(),
+                self.proposals.tolist(),
+                self.missed_proposals.tolist(),
+                np.round(self.sync_participation, 1).tolist(),
+            )
+        ]
+
+        rate = round(float(self.history_rate[-1]), 2)
+        return {
+            "timestamp": self.end.isoformat(),
+            "total_validators": self.validators,
+            "active_validators": active,
+            "attestation_rate": rate,
+            "participation_rate": rate,
+            "missed_attestations": int(self.history_missed[-1]),
+            "avg_balance": round(float(self.history_balance[-1]), 6),
+            "average_balance": round(float(self.history_balance[-1]), 6),
+            "recent_proposals": int(round(proposals / self.days)),
+            "proposal_rate": (
+                round(100 * (proposals - missed_proposals) / proposals, 2)
+                if proposals
+                else 100.0
+            ),
+            "validator_trend": int(self.history_active[-1] - self.history_active[week]),
+            "balance_trend": round(
+                float(self.history_balance[-1] - self.history_balance[day]), 6
+            ),
+            "network_sync": 100.0,
+            "inclusion_distance": round(1 + (100 - rate) / 50, 2),
+            "validators": validators,
+            "alerts": [
+                {
+                    "title": alert["title"],
+                    "severity": alert["severity"],
+                    "timestamp": alert["timestamp"],
+                    "message": alert["message"],
+                }
+                for _, alert in reversed(self.alerts()[-10:])
+            ],
+            "balance_history": balance_history,
+            "attestation_history": attestation_history,
+        }
+
+    def queue_history(self):
+        """Rows of queue_history.csv: one deposit moving through the CSM queue,
+        re-entering at the back after every activation"""
+        rng = self.rng("queue")
+        samples = self.samples
+        hours = self.interval.total_seconds() / 3600
+
+        queue_length = np.rint(5000 * np.exp(random_walk(rng, samples, 0.002)))
+        velocity = np.clip(8 + ar1(rng, samples, 0.2, phi=0.99), 0.5, None)
+        position = np.empty(samples)
+        current = queue_length[0] * rng.uniform(0.3, 0.9)
+        for i in range(samples):
+            current -= velocity[i] * hours
+            if current <= 0:
+                current = queue_length[i]
+            position[i] = current
+        acceleration = np.diff(velocity, prepend=velocity[0]) / hours
+
+        return pd.DataFrame(
+            {
+                "timestamp": pd.date_range(
+                    self.start, periods=samples, freq=self.interval
+                ),
+                "queue_length": queue_length.astype(int),
+                "position": np.ceil(position).astype(int),
+                "wait_time_estimate": np.round(position / velocity, 2),
+                "velocity": np.round(velocity, 4),
+                "acceleration": np.round(acceleration, 4),
+                "stake_rate": np.round(velocity * 32, 4),
+            }
+        )
+
+    def performance_history(self):
+        """Rows of performance_history.csv, sampled hourly"""
+        rng = self.rng("performance")
+        step = max(1, round(PERFORMANCE_INTERVAL / self.interval))
+        indices = np.arange(0, self.samples, step)
+        rows = len(indices)
+
+        rate = self.history_rate[indices] / 100
+        proposals = int(self.proposals.sum())
+        proposal_rate = (
+            (proposals - int(self.missed_proposals.sum())) / proposals
+            if proposals
+            else 1.0
+        )
+        # Geometric Brownian motion with a daily volatility of 3%
+        hourly = step * self.interval.total_seconds() / 86400
+        eth_price = 3000 * np.exp(random_walk(rng, rows, 0.03 * np.sqrt(hourly)))
+
+        return pd.DataFrame(
+            {
+                "timestamp": pd.date_range(
+                    self.start, periods=rows, freq=self.interval * step
+                ),
+                "validator_count": self.history_active[indices],
+                "attestation_rate": np.round(rate, 4),
+                "proposal_rate": np.round(
+                    np.clip(proposal_rate + rng.normal(0, 0.002, rows), 0, 1), 4
+                ),
+                "avg_balance": np.round(self.history_balance[indices], 6),
+                "avg_rewards_daily": np.round(
+                    DAILY_REWARD * rate * rng.lognormal(0, 0.05, rows), 8
+                ),
+                "eth_price": np.round(eth_price, 2),
+            }
+        )
+
+    def obol_history(self):
+        """obol_metrics_history.json of obol_integration.py for the
+        distributed validators of the fleet"""
+        rng = self.rng("obol")
+        samples = self.samples
+        count = self.obol_validators
+        epochs = self.interval.total_seconds() / SECONDS_PER_EPOCH
+
+        # Consensus rounds follow the cluster's attestation duties
+        rate = self.history_rate / 100
+        duties = rng.poisson(count * epochs, samples)
+        failures = rng.binomial(duties, np.clip(1 - rate, 0, 1) / 2)
+        success = np.cumsum(duties - failures).tolist()
+        failure = np.cumsum(failures).tolist()
+        peers = np.where(
+            rng.random(samples) < 0.01,
+            rng.integers(0, OBOL_CLUSTER_PEERS, samples),
+            OBOL_CLUSTER_PEERS,
+        ).tolist()
+        pubkeys = [f"0x{index:08x}" for index in range(count)]
+        attested = np.cumsum(rng.poisson(epochs, (samples, count)), axis=0).tolist()
+        missed_attestations = np.cumsum(
+            rng.binomial(rng.poisson(count * epochs, samples), 1 - rate)
+        ).tolist()
+        missed_blocks = np.cumsum(rng.random(samples) < 0.001).tolist()
+        effectiveness = np.round(rate, 4).tolist()
+        balances = np.round(self.history_balance, 6).tolist()
+
+        charon, validator = [], []
+        for i in range(samples):
+            timestamp = self.timestamp(i)
+            charon.append(
+                {
+                    "timestamp": timestamp,
+                    "metrics": {
+                        "charon_consensus_count": [
+                            {"labels": {"result": "success"}, "value": success[i]},
+                            {"labels": {"result": "failure"}, "value": failure[i]},
+                        ],
+                        "charon_peers_connected": [{"labels": {}, "value": peers[i]}],
+                        "core_validator_duty_total": [
+                            {
+                                "labels": {"duty": "attester", "pubkey": pubkey},
+                                "value": value,
+                            }
+                            for pubkey, value in zip(pubkeys, attested[i])
+                        ],
+                    },
+                }
+            )
+            validator.append(
+                {
+                    "timestamp": timestamp,
+                    "metrics": {
+                        "validator_active_validators": [{"labels": {}, "value": count}],
+                        "validator_effectiveness": [
+                            {"labels": {}, "value": effectiveness[i]}
+                        ],
+                        "validator_balance_average": [
+                            {"labels": {}, "value": balances[i]}
+                        ],
+                        "validator_missed_attestations": [
+                            {"labels": {}, "value": missed_attestations[i]}
+                        ],
+                        "validator_missed_blocks": [
+                            {"labels": {}, "value": missed_blocks[i]}
+                        ],
+                    },
+                }
+            )
+        return {"charon": charon, "validator": validator}
+
+    def write(self, data_dir):
+        """Write every dataset below `data_dir`, laid out like the data
+        directory of a node; returns the environment pointing at them"""
+        metrics_dir = os.path.join(data_dir, "metrics")
+        queue_dir = os.path.join(data_dir, "lido-csm", "queue")
+        profitability_dir = os.path.join(data_dir, "lido-csm", "profitability")
+        genesis_file = os.path.join(data_dir, "last_genesis_time")
+
+        os.makedirs(data_dir, exist_ok=True)
+        with open(genesis_file, "w") as f:
+            f.write(str(self.genesis))
+
+        write_json(
+            os.path.join(metrics_dir, "validator_metrics.json"),
+            self.validator_metrics(),
+        )
+        write_json(
+            os.path.join(metrics_dir, "history", "validator_history.json"),
+            self.validator_history(),
+        )
+        for moment, alert in self.alerts():
+            write_json(
+                os.path.join(
+                    metrics_dir, "alerts", f"alert_{moment:%Y%m%d%H%M%S}.json"
+                ),
+                alert,
+            )
+        write_json(
+            os.path.join(metrics_dir, "obol_metrics_history.json"),
+            self.obol_history(),
+        )
+
+        for directory, name, frame in (
+            (queue_dir, "queue_history.csv", self.queue_history()),
+            (profitability_dir, "performance_history.csv", self.performance_history()),
+        ):
+            os.makedirs(directory, exist_ok=True)
+            frame.to_csv(os.path.join(directory, name), index=False)
+
+        return {
+            "EPHEMERY_DATA_DIR": data_dir,
+            "EPHEMERY_METRICS_DIR": metrics_dir,
+            "QUEUE_DATA_DIR": queue_dir,
+            "PROFITABILITY_DATA_DIR": profitability_dir,
+            "GENESIS_TIME_FILE": genesis_file,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--output-dir", required=True, help="Data directory to write the files to"
+    )
+    parser.add_argument(
+        "--validators",
+        type=int,
+        default=1000,
+        help=f"Fleet size, {MIN_VALIDATORS} to {MAX_VALIDATORS}",
+    )
+    parser.add_argument("--days", type=float, default=30, help="Length of the history")
+    parser.add_argument(
+        "--interval", type=float, default=5, help="Minutes between history samples"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--end",
+        type=datetime.datetime.fromisoformat,
+        help="Local time of the last sample (default: now); fix it for "
+        "byte-identical output",
+    )
+    parser.add_argument(
+        "--genesis",
+        type=int,
+        help="Unix time of the current genesis (default: start of the history)",
+    )
+    parser.add_argument(
+        "--obol-validators",
+        type=int,
+        help="Distributed validators in the Obol history (default: up to 32)",
+    )
+    args = parser.parse_args()
+    if not MIN_VALIDATORS <= args.validators <= MAX_VALIDATORS:
+        parser.error(
+            f"--validators must be between {MIN_VALIDATORS} and {MAX_VALIDATORS}"
+        )
+
+    fleet = Fleet(
+        validators=args.validators,
+        days=args.days,
+        seed=args.seed,
+        interval_minutes=args.interval,
+        end=args.end,
+        genesis=args.genesis,
+        obol_validators=args.obol_validators,
+    )
+    environment = fleet.write(os.path.abspath(args.output_dir))
+    print(
+        f"Generated {fleet.validators} validators, {fleet.samples} history samples "
+        f"and {len(fleet.alerts())} alerts"
+    )
+    for name, value in environment.items():
+        print(f"export {name}={value}")
+
+
+if __name__ == "__main__":
+    main()
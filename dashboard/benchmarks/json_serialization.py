@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization Benchmark
+============================
+Compares Flask's default JSON provider with the dashboard provider (orjson
+and its standard library fallback) on history-sized payloads.
+
+Usage: python json_serialization.py [--rows 10000] [--repeat 20] [--output FILE]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+# Shared dashboard helpers live next to the Flask app modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from json_provider import DashboardJSONProvider, orjson  # noqa: E402
+
+
+def sync_history(rows):
+    """Records shaped like /api/history"""
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "timestamp": (start + datetime.timedelta(minutes=5 * i)).isoformat(),
+            "lighthouse": {
+                "head_slot": str(1000 + i),
+                "sync_distance": str(max(0, 500 - i)),
+                "is_syncing": i < 500,
+                "is_optimistic": False,
+            },
+            "geth": {
+                "is_syncing": i < 400,
+                "current_block": 20000 + i,
+                "highest_block": 20400,
+                "sync_percentage": min(100.0, i / 4),
+            },
+        }
+        for i in range(rows)
+    ]
+
+
+def queue_records(rows):
+    """Records shaped like /queue/api/history"""
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "timestamp": (start + datetime.timedelta(minutes=5 * i)).isoformat(),
+            "queue_length": 5000 - i % 100,
+            "position": 1200 - i % 50,
+            "velocity": 0.5 + (i % 7) / 10,
+            "acceleration": -0.01 * (i % 3),
+            "wait_time_estimate": 24.0 + i % 11,
+        }
+        for i in range(rows)
+    ]
+
+
+def queue_columns(rows):
+    """Column arrays shaped like /queue/api/history?format=columns"""
+    records = queue_records(rows)
+    return {key: [record[key] for record in records] for key in records[0]}
+
+
+def numpy_forecast(rows):
+    """Forecast payload holding numpy scalars and arrays, as the profitability
+    and queue analytics compute them"""
+    days = np.arange(rows)
+    return {
+        "days": days,
+        "daily_reward": np.full(rows, 0.0021),
+        "cumulative_reward": np.cumsum(np.full(rows, 0.0021)),
+        "roi_percent": np.float64(4.2),
+        "break_even_day": np.int64(730),
+        "activated": np.bool_(True),
+    }
+
+
+PAYLOADS = {
+    "sync_history": sync_history,
+    "queue_records": queue_records,
+    "queue_columns": queue_columns,
+    "numpy_forecast": numpy_forecast,
+}
+
+
+def measure(encode, payload, repeat):
+    """Median and best milliseconds per encode, None if unsupported"""
+    try:
+        size = len(encode(payload))
+    except TypeError:
+        return None
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "best_ms": round(min(timings), 3),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per payload")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per encoder")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    flask_default = DefaultJSONProvider(app)
+    fallback = DashboardJSONProvider(app, encoder="json")
+    encoders = {
+        "flask_default": lambda obj: flask_default.response(obj).get_data(),
+        "dashboard_json": lambda obj: fallback.response(obj).get_data(),
+    }
+    if orjson is not None:
+        fast = DashboardJSONProvider(app, encoder="auto")
+        encoders["dashboard_orjson"] = lambda obj: fast.response(obj).get_data()
+    else:
+        print("orjson is not installed, only the fallback encoder is measured")
+
+    results = {}
+    print(
+        f"{'payload':<16}{'encoder':<18}{'median ms':>11}{'best ms':>10}{'speedup':>9}"
+    )
+    for name, build in PAYLOADS.items():
+        payload = build(args.rows)
+        results[name] = {}
+        baseline = None
+        for encoder, encode in encoders.items():
+            result = measure(encode, payload, args.repeat)
+            results[name][encoder] = result
+            if result is None:
+                print(f"{name:<16}{encoder:<18}{'unsupported':>11}")
+                continue
+            if baseline is None:
+                baseline = result["median_ms"]
+            speedup = baseline / result["median_ms"] if result["median_ms"] else 0
+            print(
+                f"{name:<16}{encoder:<18}{result['median_ms']:>11.2f}"
+                f"{result['best_ms']:>10.2f}{speedup:>8.1f}x"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -106,7 +106,8 @@ function requestHistoricalData(days) {
     if (webSocket && webSocket.readyState === WebSocket.OPEN) {
         webSocket.send(JSON.stringify({
             action: 'get_history',
-            days: days
+            days: days,
+            max_points: 500
         }));
     }
 }
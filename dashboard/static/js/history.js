@@ -33,7 +33,7 @@ function loadHistoryData(days) {
     buttons[clickedIndex].classList.add('active', 'btn-primary');
 
     // Fetch data from the API
-    fetch(`/api/history?days=${days}`)
+    fetch(`/api/history?days=${days}&max_points=500`)
         .then(response => response.json())
         .then(data => {
             syncData = data;
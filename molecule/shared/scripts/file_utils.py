@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+File helpers shared by the molecule maintenance scripts.
+"""
+
+import os
+import tempfile
+
+
+def write_if_changed(path, content):
+    """Atomically replace a file unless it already holds `content`.
+
+    Returns True if the file was written. Unchanged files keep their
+    modification time, and replaced files keep their mode.
+    """
+    try:
+        with open(path, "r") as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            # mkstemp creates 0600 files, use the usual mode for new files
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
@@ -4,75 +4,186 @@ Script to fix file extensions in the molecule directory:
 1. Rename all .yaml files to .yml
 2. Update references within files to use .yml extension
 
+A single directory walk builds the rename plan and lists the YAML files;
+their contents are then indexed (optionally in parallel) for references to
+.yaml playbooks, and only the files that hold references are rewritten.
+
 Usage:
-  python3 fix_extensions.py
+  python3 fix_extensions.py [--check] [--jobs N] [--report FILE]
+
+  --check        Report the renames and rewrites without changing anything;
+                 exits with 1 if anything would change
+  --jobs N       Number of worker threads reading files (default: 1)
+  --report FILE  Write a JSON report of the renames and rewrites to FILE
 """
 
+import argparse
+import json
 import os
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from file_utils import write_if_changed
+
 # Define project root
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 MOLECULE_DIR = PROJECT_ROOT / "molecule"
 
-
-def fix_yaml_extensions():
-    """Rename all .yaml files to .yml"""
-    yaml_files = []
-    for root, dirs, files in os.walk(MOLECULE_DIR):
-        for file in files:
-            if file.endswith(".yaml"):
-                yaml_path = Path(root) / file
-                yml_path = yaml_path.with_suffix(".yml")
-                yaml_files.append((yaml_path, yml_path))
-
-    # Rename files
-    for yaml_path, yml_path in yaml_files:
-        if not yml_path.exists():
-            print(f"Renaming {yaml_path} → {yml_path}")
-            yaml_path.rename(yml_path)
+REFERENCE_PATTERN = re.compile(r"(verify|converge|prepare|molecule|cleanup)\.yaml")
+
+
+def scan_tree(root=MOLECULE_DIR):
+    """Walk `root` once.
+
+    Returns the rename plan as (.yaml path, .yml path) pairs, the renames
+    that conflict with an existing .yml file, and every file that is a .yml
+    file once the plan is applied, keyed by its path before the rename.
+    """
+    renames = []
+    conflicts = []
+    yml_files = {}
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        names = set()
+        yaml_names = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                names.add(entry.name)
+                if entry.name.endswith(".yml"):
+                    yml_files[entry.path] = entry.path
+                elif entry.name.endswith(".yaml"):
+                    yaml_names.append(entry.name)
+
+        # A conflict is only known once the whole directory has been listed
+        for name in sorted(yaml_names):
+            yaml_path = os.path.join(directory, name)
+            yml_path = yaml_path[: -len(".yaml")] + ".yml"
+            if os.path.basename(yml_path) in names:
+                conflicts.append((yaml_path, yml_path))
+            else:
+                renames.append((yaml_path, yml_path))
+                yml_files[yaml_path] = yml_path
+    return sorted(renames), sorted(conflicts), yml_files
+
+
+def find_references(path):
+    """Sorted .yaml playbook names a file refers to"""
+    try:
+        with open(path, "r") as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Warning: Couldn't read {path}: {e}")
+        return []
+    # Most files have no .yaml reference at all, skip the regex for them
+    if ".yaml" not in content:
+        return []
+    return sorted({f"{name}.yaml" for name in REFERENCE_PATTERN.findall(content)})
+
+
+def index_references(paths, jobs=1):
+    """Map every file holding a reference to the names it refers to"""
+    paths = sorted(paths)
+    if jobs > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            found = list(executor.map(find_references, paths))
+    else:
+        found = [find_references(path) for path in paths]
+    return {path: names for path, names in zip(paths, found) if names}
+
+
+def fix_yaml_extensions(renames, check=False):
+    """Rename all .yaml files of the plan to .yml"""
+    for yaml_path, yml_path in renames:
+        if check:
+            print(f"Would rename {yaml_path} → {yml_path}")
+            continue
+        print(f"Renaming {yaml_path} → {yml_path}")
+        os.rename(yaml_path, yml_path)
+
+
+def update_file_references(references, yml_files, check=False):
+    """Rewrite the references of the indexed files; returns the files whose
+    content changed, by their path after the renames"""
+    updated = []
+    for path in sorted(references):
+        target = path if check else yml_files[path]
+        with open(target, "r") as f:
+            content = f.read()
+        content = REFERENCE_PATTERN.sub(r"\1.yml", content)
+        if check:
+            print(f"  Would update references in {yml_files[path]}")
+        elif write_if_changed(target, content):
+            print(f"  Updating references in {target}")
         else:
-            print(
-                f"Warning: Cannot rename {yaml_path} because {yml_path} already exists"
-            )
-
+            continue
+        updated.append(yml_files[path])
+    return updated
 
-def update_file_references():
-    """Update references to .yaml files within all molecule files"""
-    yml_files = []
-    for root, dirs, files in os.walk(MOLECULE_DIR):
-        for file in files:
-            if file.endswith(".yml"):
-                yml_files.append(Path(root) / file)
 
-    for file_path in yml_files:
-        print(f"Checking references in {file_path}")
+def relative(path):
+    """Path relative to the project root, as used in the report"""
+    return os.path.relpath(path, PROJECT_ROOT)
 
-        # Read file content
-        with open(file_path, "r") as f:
-            content = f.read()
-
-        # Replace .yaml references with .yml
-        original_content = content
-        content = re.sub(
-            r"(verify|converge|prepare|molecule|cleanup)\.yaml", r"\1.yml", content
-        )
 
-        # Only write if content changed
-        if content != original_content:
-            print(f"  Updating references in {file_path}")
-            with open(file_path, "w") as f:
-                f.write(content)
+def write_report(destination, renames, conflicts, references, yml_files, updated):
+    """Write the machine-readable report"""
+    by_name = {}
+    for path, names in references.items():
+        for name in names:
+            by_name.setdefault(name, []).append(relative(yml_files[path]))
+    report = {
+        "renamed": [[relative(old), relative(new)] for old, new in renames],
+        "conflicts": [[relative(old), relative(new)] for old, new in conflicts],
+        "references": {name: sorted(files) for name, files in sorted(by_name.items())},
+        "updated": [relative(path) for path in updated],
+    }
+    with open(destination, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Rename .yaml files in the molecule directory to .yml"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Report the changes without renaming or rewriting any file",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of worker threads reading files"
+    )
+    parser.add_argument("--report", help="Write a JSON report to this file")
+    args = parser.parse_args()
+
     print("Fixing file extensions in molecule directory...")
-    fix_yaml_extensions()
+    renames, conflicts, yml_files = scan_tree()
+    for yaml_path, yml_path in conflicts:
+        print(f"Warning: Cannot rename {yaml_path} because {yml_path} already exists")
+
+    references = index_references(yml_files, args.jobs)
+    fix_yaml_extensions(renames, args.check)
+
     print("\nUpdating file references...")
-    update_file_references()
+    updated = update_file_references(references, yml_files, args.check)
+    print(
+        f"\n{len(renames)} files renamed, {len(updated)} files updated, "
+        f"{len(references)} of {len(yml_files)} files referencing .yaml playbooks"
+    )
+
+    if args.report:
+        write_report(args.report, renames, conflicts, references, yml_files, updated)
+
     print("\nDone!")
+    return 1 if args.check and (renames or updated) else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -3,103 +3,259 @@
 Script to generate molecule scenario configurations.
 This helps ensure consistency across testing scenarios.
 
+A single scenario is generated from command line options; a whole matrix of
+scenarios (for example every execution x consensus client pair) is generated
+in one process from a matrix spec, reusing one compiled template and
+optionally rendering in parallel. Files are only written when they change.
+
 Usage:
   python3 generate_scenario.py --name validator --node-name ethereum-validator
+  python3 generate_scenario.py --matrix client_matrix.yml [--jobs N]
+
+Matrix spec (YAML or JSON):
+  name: "{el}-{cl}"                   # scenario name pattern
+  node_name: "ephemery-{el}-{cl}"     # node name pattern
+  output_dir: molecule/client-matrix  # relative to the project root
+  template: scenario_molecule.yml.j2  # optional
+  vars:                               # custom variables of every scenario
+    network: ephemery
+  label_vars: [el, cl]                # optional, see below
+  matrix:                             # every combination is one scenario
+    el: [geth, nethermind]
+    cl: [lighthouse, teku]
+    resources:                        # mappings need a name, other keys
+      - name: default                 # are added to the custom variables
+        el_memory_limit: 3072M
+  scenarios:                          # optional extra scenarios
+    - {name: validator, node_name: ethereum-validator, vars: {}}
+
+Scalar matrix values only name the scenario; those of the keys listed in
+label_vars are also added to the custom variables under their key.
+
+Existing molecule.yml files in the output directory are replaced, so point
+output_dir at scenarios generated from the same spec, not at hand-maintained
+ones such as molecule/clients.
 """
 
 import argparse
+import functools
+import itertools
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import jinja2
 import yaml
+from file_utils import write_if_changed
 
 # Define project root
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 MOLECULE_DIR = PROJECT_ROOT / "molecule"
 SHARED_DIR = MOLECULE_DIR / "shared"
 TEMPLATES_DIR = SHARED_DIR / "templates"
+DEFAULT_TEMPLATE = "scenario_molecule.yml.j2"
+
+CONVERGE_PLAYBOOK = """---
+- name: Converge
+  hosts: all
+  become: true
+  tasks:
+    - name: "Include ansible-ephemery role"
+      include_role:
+        name: "ansible-ephemery"
+"""
+
+VERIFY_PLAYBOOK = """---
+- name: Verify
+  hosts: all
+  become: true
+  tasks:
+    - name: Gather service facts
+      service_facts:
+
+    - name: Check that required Docker containers are running
+      shell: docker ps --format '{% raw %}{{.Names}}{% endraw %}'
+      register: docker_containers
+      changed_when: false
+"""
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Generate molecule scenario config")
-    parser.add_argument("--name", required=True, help="Scenario name")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--name", help="Scenario name")
+    target.add_argument("--matrix", help="Matrix spec file (YAML or JSON)")
     parser.add_argument("--node-name", default="ethereum-node", help="Node name")
     parser.add_argument("--vars", default="{}", help="Custom variables as JSON string")
     parser.add_argument(
         "--output-dir", help="Output directory, defaults to molecule/{name}"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes used to render a matrix, 1 to render serially",
+    )
     return parser.parse_args()
 
 
-def generate_scenario(scenario_name, node_name, custom_vars, output_dir=None):
-    # Set up template environment
-    env = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATES_DIR))
-    template = env.get_template("scenario_molecule.yml.j2")
+@functools.lru_cache(maxsize=None)
+def get_template(name=DEFAULT_TEMPLATE):
+    """Compiled template, loaded once per process"""
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR), auto_reload=False
+    )
+    return env.get_template(name)
+
 
+def generate_scenario(
+    scenario_name, node_name, custom_vars, output_dir=None, template=DEFAULT_TEMPLATE
+):
+    """Render one scenario; returns the files written, unchanged files excluded"""
     # Render template
-    rendered = template.render(
+    rendered = get_template(template).render(
         scenario_name=scenario_name, node_name=node_name, custom_vars=custom_vars
     )
 
     # Create output directory if it doesn't exist
     if not output_dir:
         output_dir = MOLECULE_DIR / scenario_name
+    output_dir = Path(output_dir)
     os.makedirs(output_dir, exist_ok=True)
 
+    written = []
+
     # Write output file
     output_file = output_dir / "molecule.yml"
-    with open(output_file, "w") as f:
-        f.write(rendered)
-
-    print(f"Generated scenario configuration: {output_file}")
+    if write_if_changed(output_file, rendered):
+        written.append(str(output_file))
+        print(f"Generated scenario configuration: {output_file}")
 
     # Create minimal converge.yaml if it doesn't exist
     converge_file = output_dir / "converge.yml"
     if not converge_file.exists():
-        with open(converge_file, "w") as f:
-            f.write(
-                """---
-- name: Converge
-  hosts: all
-  become: true
-  tasks:
-    - name: "Include ansible-ephemery role"
-      include_role:
-        name: "ansible-ephemery"
-"""
-            )
+        write_if_changed(converge_file, CONVERGE_PLAYBOOK)
+        written.append(str(converge_file))
         print(f"Generated converge playbook: {converge_file}")
 
     # Create minimal verify.yaml if it doesn't exist
     verify_file = output_dir / "verify.yml"
     if not verify_file.exists():
-        with open(verify_file, "w") as f:
-            f.write(
-                """---
-- name: Verify
-  hosts: all
-  become: true
-  tasks:
-    - name: Gather service facts
-      service_facts:
+        write_if_changed(verify_file, VERIFY_PLAYBOOK)
+        written.append(str(verify_file))
+        print(f"Generated verify playbook: {verify_file}")
 
-    - name: Check that required Docker containers are running
-      shell: docker ps --format '{% raw %}{{.Names}}{% endraw %}'
-      register: docker_containers
-      changed_when: false
-"""
+    return written
+
+
+def load_matrix(path):
+    """Read a matrix spec from a YAML or JSON file"""
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Matrix spec {path} must be a mapping")
+    return spec
+
+
+def expand_matrix(spec):
+    """List the (name, node_name, custom_vars, output_dir, template) of every
+    scenario a matrix spec describes"""
+    output_root = PROJECT_ROOT / spec.get("output_dir", "molecule")
+    template = spec.get("template", DEFAULT_TEMPLATE)
+    base_vars = spec.get("vars") or {}
+    name_pattern = spec.get("name")
+    node_pattern = spec.get("node_name", "ethereum-node")
+    label_vars = set(spec.get("label_vars") or ())
+
+    scenarios = []
+    dimensions = spec.get("matrix") or {}
+    if dimensions:
+        if not name_pattern:
+            raise ValueError("A matrix spec needs a name pattern")
+        keys = list(dimensions)
+        for values in itertools.product(*(dimensions[key] for key in keys)):
+            labels = {}
+            custom_vars = dict(base_vars)
+            for key, value in zip(keys, values):
+                if isinstance(value, dict):
+                    settings = dict(value)
+                    labels[key] = settings.pop("name")
+                    custom_vars.update(settings)
+                else:
+                    labels[key] = value
+                    if key in label_vars:
+                        custom_vars[key] = value
+            name = name_pattern.format(**labels)
+            scenarios.append(
+                (
+                    name,
+                    node_pattern.format(**labels),
+                    custom_vars,
+                    output_root / name,
+                    template,
+                )
             )
-        print(f"Generated verify playbook: {verify_file}")
+
+    for entry in spec.get("scenarios") or []:
+        scenarios.append(
+            (
+                entry["name"],
+                entry.get("node_name", "ethereum-node"),
+                {**base_vars, **(entry.get("vars") or {})},
+                output_root / entry["name"],
+                entry.get("template", template),
+            )
+        )
+
+    names = [scenario[0] for scenario in scenarios]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate scenario names: {', '.join(duplicates)}")
+    return scenarios
+
+
+def render_scenario(scenario):
+    """Worker entry point for one expanded scenario"""
+    return generate_scenario(*scenario)
+
+
+def generate_matrix(spec, jobs=1):
+    """Generate every scenario of a matrix spec; returns the files written"""
+    scenarios = expand_matrix(spec)
+    print(f"Rendering {len(scenarios)} scenarios")
+
+    if jobs > 1 and len(scenarios) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(scenarios) // (jobs * 4))
+            results = list(
+                executor.map(render_scenario, scenarios, chunksize=chunksize)
+            )
+    else:
+        results = [render_scenario(scenario) for scenario in scenarios]
+
+    written = [path for files in results for path in files]
+    print(
+        f"{len(written)} files written, "
+        f"{len(scenarios)} scenarios checked in {spec.get('output_dir', 'molecule')}"
+    )
+    return written
 
 
 if __name__ == "__main__":
     args = parse_args()
 
-    # Parse custom vars
-    import json
+    if args.matrix:
+        try:
+            matrix_spec = load_matrix(args.matrix)
+            generate_matrix(matrix_spec, args.jobs)
+        except (OSError, ValueError, KeyError, yaml.YAMLError) as e:
+            print(f"Error: Invalid matrix spec {args.matrix}: {e}")
+            sys.exit(1)
+        sys.exit(0)
 
+    # Parse custom vars
     try:
         custom_vars_dict = json.loads(args.vars)
     except json.JSONDecodeError:
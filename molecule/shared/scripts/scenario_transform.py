@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+YAML-aware transformer for molecule scenario files.
+
+Applies the rules of molecule/shared/scenario_rules.yml to molecule and
+verify playbooks. Each file is composed into a YAML node graph once; a
+single traversal looks every mapping key up in the variable mapping and
+collects edits at the source positions of the nodes, which are then spliced
+into the original text. Comments, quoting, key order and indentation are
+preserved byte for byte, and adding rules does not add passes.
+"""
+
+import re
+from pathlib import Path
+
+import yaml
+
+# libyaml's composer when available, it reports the same source marks but
+# an empty instead of a None style for plain scalars
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Paths of the shared verification templates as seen from a scenario
+COMMON_VERIFY_TEMPLATE = "../shared/templates/verify/common.yaml"
+SCENARIO_VERIFY_TEMPLATE = "../shared/templates/verify/{name}.yaml"
+HEADER_MARKER = "# Imports base configuration"
+HEADER = (
+    "# {title} scenario configuration\n"
+    "# Imports base configuration from shared/base_molecule.yaml\n\n"
+)
+ADDITIONAL_TASKS_COMMENT = "Additional scenario-specific verification tasks"
+VERIFIER_PLAYBOOKS = ("verify.yml", "verify.yaml")
+
+# A bare condition variable followed by further "and" clauses
+BARE_CONDITION_PATTERN = re.compile(r"^(\w+)(\s+and\b.*)$", re.DOTALL)
+
+
+def load_rules(path, default_mapping):
+    """Variable mapping of a rules file, `default_mapping` if it does not exist"""
+    path = Path(path)
+    if not path.exists():
+        return dict(default_mapping)
+    with open(path, "r") as f:
+        rules = yaml.safe_load(f) or {}
+    mapping = rules.get("variable_mapping") or {}
+    if not isinstance(mapping, dict):
+        raise ValueError(f"variable_mapping in {path} must be a mapping")
+    return {str(old): str(new) for old, new in mapping.items()}
+
+
+def bool_condition(condition):
+    """Add `| bool` to the variable leading an `X and ...` condition, else None"""
+    match = BARE_CONDITION_PATTERN.match(condition)
+    if not match:
+        return None
+    return f"{match.group(1)} | bool{match.group(2)}"
+
+
+def line_start(content, index):
+    """Index of the first character of the line containing `index`"""
+    return content.rfind("\n", 0, index) + 1
+
+
+def line_end(content, index):
+    """Index just past the newline ending the line containing `index`"""
+    end = content.find("\n", index)
+    return len(content) if end == -1 else end + 1
+
+
+def apply_edits(content, edits):
+    """Splice non-overlapping (start, end, text) edits into `content`"""
+    for start, end, text in sorted(edits, reverse=True):
+        content = content[:start] + text + content[end:]
+    return content
+
+
+def mapping_pairs(node):
+    """Every (key, value) node pair of all mappings below `node`"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, yaml.MappingNode):
+            for key, value in node.value:
+                yield key, value
+                stack.append(value)
+        elif isinstance(node, yaml.SequenceNode):
+            stack.extend(node.value)
+
+
+def scalar(node):
+    """Value of a scalar node, None for any other node"""
+    return node.value if isinstance(node, yaml.ScalarNode) else None
+
+
+class ScenarioTransformer:
+    """Rewrites molecule.yml and verify.yml content according to the rules"""
+
+    def __init__(self, variable_mapping, verify_templates_dir=None):
+        self.variable_mapping = dict(variable_mapping)
+        self.verify_templates_dir = verify_templates_dir
+
+    def molecule(self, scenario, content):
+        """Standardized molecule.yml content of a scenario"""
+        # Add import comment if not present
+        if HEADER_MARKER not in content and content.startswith("---\n"):
+            title = Path(scenario).name.title()
+            content = "---\n" + HEADER.format(title=title) + content[4:]
+
+        roots = self._compose(scenario, content)
+        if roots is None:
+            return content
+
+        edits = []
+        for root in roots:
+            edits.extend(self._node_edits(content, root))
+            edits.extend(self._verifier_edits(content, root))
+        return apply_edits(content, edits)
+
+    def verify(self, scenario, content):
+        """Standardized verify.yml content of a scenario, unchanged if it
+        already uses the common templates or has no tasks section"""
+        if f"include_tasks: {COMMON_VERIFY_TEMPLATE}" in content:
+            return content
+
+        roots = self._compose(scenario, content)
+        if roots is None:
+            return content
+
+        includes = self._includes(scenario)
+        for root in roots:
+            tasks_edit = self._tasks_edit(content, root, includes)
+            if tasks_edit is not None:
+                break
+        else:
+            return content
+
+        # Edits inside the replaced tasks section are superseded by it
+        start, end, _ = tasks_edit
+        edits = [tasks_edit]
+        for root in roots:
+            edits.extend(
+                edit
+                for edit in self._node_edits(content, root, conditions=True)
+                if edit[1] <= start or edit[0] >= end
+            )
+        return apply_edits(content, edits)
+
+    def _compose(self, scenario, content):
+        """Node graphs of every document, None if the file is not valid YAML"""
+        try:
+            return [root for root in yaml.compose_all(content, Loader=Loader) if root]
+        except yaml.YAMLError as e:
+            print(f"Warning: Couldn't parse YAML of {scenario}, skipping: {e}")
+            return None
+
+    def _includes(self, scenario):
+        """(task name, template path) of the verification templates to include"""
+        includes = [("Include common verification tasks", COMMON_VERIFY_TEMPLATE)]
+        name = Path(scenario).name
+        if (
+            self.verify_templates_dir is not None
+            and (Path(self.verify_templates_dir) / f"{name}.yaml").exists()
+        ):
+            includes.append(
+                (
+                    f"Include {name}-specific verification tasks",
+                    SCENARIO_VERIFY_TEMPLATE.format(name=name),
+                )
+            )
+        return includes
+
+    def _node_edits(self, content, root, conditions=False):
+        """Variable renames and, with `conditions`, `| bool` additions"""
+        edits = []
+        for key, value in mapping_pairs(root):
+            name = scalar(key)
+            new_name = self.variable_mapping.get(name) if name else None
+            if new_name is not None:
+                # Keep the quotes of quoted keys
+                quote = key.style if key.style in ("'", '"') else ""
+                edits.append(
+                    (key.start_mark.index, key.end_mark.index, quote + new_name + quote)
+                )
+
+            if conditions and name == "when" and scalar(value):
+                start, end = value.start_mark.index, value.end_mark.index
+                if not value.style and "\n" not in content[start:end]:
+                    updated = bool_condition(value.value)
+                    if updated is not None:
+                        edits.append((start, end, updated))
+        return edits
+
+    def _verifier_edits(self, content, root):
+        """Remove `playbooks: {verify: verify.yml}` from an ansible verifier"""
+        if not isinstance(root, yaml.MappingNode):
+            return []
+        for key, verifier in root.value:
+            if scalar(key) != "verifier" or not isinstance(verifier, yaml.MappingNode):
+                continue
+            fields = {scalar(k): (k, v) for k, v in verifier.value}
+            if "name" not in fields or scalar(fields["name"][1]) != "ansible":
+                return []
+            playbooks_key, playbooks = fields.get("playbooks", (None, None))
+            if (
+                isinstance(playbooks, yaml.MappingNode)
+                and len(playbooks.value) == 1
+                and scalar(playbooks.value[0][0]) == "verify"
+                and scalar(playbooks.value[0][1]) in VERIFIER_PLAYBOOKS
+            ):
+                start = line_start(content, playbooks_key.start_mark.index)
+                end = line_end(content, playbooks.value[0][1].end_mark.index)
+                return [(start, end, "")]
+        return []
+
+    def _tasks_edit(self, content, root, includes):
+        """Edit replacing the tasks of the first play that has any"""
+        if not isinstance(root, yaml.SequenceNode):
+            return None
+        for index, play in enumerate(root.value):
+            if not isinstance(play, yaml.MappingNode):
+                continue
+            keys = [scalar(key) for key, _ in play.value]
+            if "tasks" not in keys:
+                continue
+
+            position = keys.index("tasks")
+            tasks_key = play.value[position][0]
+            # The section ends where the play's next key or the next play starts
+            if position + 1 < len(play.value):
+                following = play.value[position + 1][0].start_mark
+            elif index + 1 < len(root.value):
+                following = root.value[index + 1].start_mark
+            else:
+                following = None
+            if following is None:
+                end = len(content)
+            else:
+                end = self._before_comments(
+                    content, line_start(content, following.index), following.column
+                )
+
+            block = self._tasks_block(includes, tasks_key.start_mark.column + 2)
+            if end < len(content):
+                block += "\n"
+            return (tasks_key.start_mark.index, end, "tasks:\n" + block)
+        return None
+
+    @staticmethod
+    def _before_comments(content, end, column):
+        """Move `end` back over the comment lines directly above it that are
+        indented no deeper than the following section, which they belong to"""
+        while end > 0:
+            start = line_start(content, end - 1)
+            line = content[start:end]
+            if not line.lstrip().startswith("#"):
+                break
+            if len(line) - len(line.lstrip(" ")) > column:
+                break
+            end = start
+        return end
+
+    @staticmethod
+    def _tasks_block(includes, indent):
+        """YAML text of the include tasks, indented by `indent` spaces"""
+        pad = " " * indent
+        block = []
+        for index, (name, path) in enumerate(includes):
+            if index:
+                block.append("\n")
+            block.append(f"{pad}# {name}\n")
+            block.append(f"{pad}- name: {name}\n")
+            block.append(f"{pad}  include_tasks: {path}\n")
+        block.append(f"\n{pad}# {ADDITIONAL_TASKS_COMMENT}\n")
+        return "".join(block)
@@ -7,23 +7,47 @@ This script:
 3. Updates variable references to use namespaced variables
 4. Removes playbooks property from verifier section for compatibility
 
+Files are transformed by scenario_transform.py according to the rules in
+molecule/shared/scenario_rules.yml. Scenarios are processed in parallel. A
+content-hash manifest records the files already in the standardized format,
+so unchanged files are skipped on later runs, and files are only written
+when their content changes.
+
 Usage:
-  python3 update_all_scenarios.py
+  python3 update_all_scenarios.py [--check] [--jobs N] [--rules FILE] [--no-manifest]
+
+  --check        Report the changes as a diff without writing; exits with 1
+                 if any file would change
+  --jobs N       Number of worker processes (default: CPU count, 1 = serial)
+  --rules FILE   Rules file (default: molecule/shared/scenario_rules.yml)
+  --no-manifest  Process every file, ignoring and not updating the manifest
 """
 
+import argparse
+import difflib
+import functools
+import hashlib
+import json
 import os
-import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import scenario_transform
 import yaml
+from file_utils import write_if_changed
+from scenario_transform import ScenarioTransformer, load_rules
 
 # Define project root
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 MOLECULE_DIR = PROJECT_ROOT / "molecule"
 SHARED_DIR = MOLECULE_DIR / "shared"
+MANIFEST_FILE = SHARED_DIR / ".update_manifest.json"
+MANIFEST_VERSION = 1
+RULES_FILE = SHARED_DIR / "scenario_rules.yml"
 
-# Variable mapping (old name -> new name)
+# Default variable mapping (old name -> new name), used when the rules file
+# does not exist
 VARIABLE_MAPPING = {
     "prometheus_port": "monitoring_prometheus_port",
     "grafana_port": "monitoring_grafana_port",
@@ -36,158 +60,289 @@ VARIABLE_MAPPING = {
 
 
 def get_scenarios():
-    """Get all scenario directories"""
+    """Get all scenario directories, including nested ones such as the
+    client matrix under clients/"""
     scenarios = []
-    for item in os.listdir(MOLECULE_DIR):
-        if os.path.isdir(MOLECULE_DIR / item) and item != "shared":
-            scenarios.append(item)
+    for item in sorted(os.listdir(MOLECULE_DIR)):
+        if not os.path.isdir(MOLECULE_DIR / item) or item == "shared":
+            continue
+        scenarios.append(item)
+        for child in sorted(os.listdir(MOLECULE_DIR / item)):
+            if find_molecule_file(f"{item}/{child}") is not None:
+                scenarios.append(f"{item}/{child}")
     return scenarios
 
 
-def update_scenario_molecule_yaml(scenario):
-    """Update molecule.yaml for a scenario"""
+def find_molecule_file(scenario):
+    """Path of a scenario's molecule configuration, None if it has none"""
     # Check for both .yaml and .yml extensions
     for ext in [".yaml", ".yml"]:
         molecule_file = MOLECULE_DIR / scenario / f"molecule{ext}"
         if molecule_file.exists():
-            break
-    else:
-        print(
-            f"Warning: molecule configuration for {scenario} doesn't exist, skipping..."
+            return molecule_file
+    return None
+
+
+def rules_fingerprint(rules_file=RULES_FILE):
+    """Hash of everything besides a file's content that affects its update.
+
+    A change to this script, the transformer, the rules file or the set of
+    scenario verification templates invalidates the manifest.
+    """
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(Path(scenario_transform.__file__).read_bytes())
+    if os.path.exists(rules_file):
+        digest.update(Path(rules_file).read_bytes())
+    verify_templates = SHARED_DIR / "templates" / "verify"
+    if verify_templates.is_dir():
+        for name in sorted(os.listdir(verify_templates)):
+            digest.update(name.encode())
+    return digest.hexdigest()
+
+
+def load_manifest(fingerprint):
+    """Per-file records of the last run, empty if the rules changed since"""
+    try:
+        with open(MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("fingerprint") != fingerprint
+    ):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(fingerprint, files):
+    """Write the manifest atomically"""
+    write_if_changed(
+        MANIFEST_FILE,
+        json.dumps(
+            {"version": MANIFEST_VERSION, "fingerprint": fingerprint, "files": files},
+            indent=2,
+            sort_keys=True,
         )
-        return
+        + "\n",
+    )
 
-    print(f"Updating {molecule_file}...")
 
-    # Read current content
-    with open(molecule_file, "r") as f:
+def file_record(path, content):
+    """Manifest record of a file in the standardized format"""
+    stat = os.stat(path)
+    return {
+        "sha256": hashlib.sha256(content.encode()).hexdigest(),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def is_unchanged(path, record):
+    """Whether a file still matches its manifest record, by stat and then
+    by content hash when only its timestamp changed"""
+    if record is None:
+        return False
+    stat = os.stat(path)
+    if stat.st_size != record["size"]:
+        return False
+    if stat.st_mtime_ns == record["mtime_ns"]:
+        return True
+    with open(path, "r") as f:
+        return hashlib.sha256(f.read().encode()).hexdigest() == record["sha256"]
+
+
+@functools.lru_cache(maxsize=None)
+def get_transformer(rules_file):
+    """Transformer for a rules file, built once per process"""
+    mapping = load_rules(rules_file, VARIABLE_MAPPING)
+    return ScenarioTransformer(mapping, SHARED_DIR / "templates" / "verify")
+
+
+def update_file(path, scenario, transform, record, check):
+    """Apply `transform` to one file.
+
+    Returns a result dict with the file's status ("skipped", "unchanged",
+    "updated" or "would update"), its new manifest record and, in check
+    mode, a unified diff.
+    """
+    relative = str(path.relative_to(PROJECT_ROOT))
+    if is_unchanged(path, record):
+        return {"path": relative, "status": "skipped", "record": record}
+
+    with open(path, "r") as f:
         content = f.read()
-
-    # Add import comment if not present
-    if "# Imports base configuration" not in content:
-        content = re.sub(
-            r"^---\n",
-            "---\n# "
-            + scenario.title()
-            + " scenario configuration\n# Imports base configuration from shared/base_molecule.yaml\n\n",
-            content,
+    updated = transform(scenario, content)
+
+    if updated == content:
+        return {
+            "path": relative,
+            "status": "unchanged",
+            "record": file_record(path, content),
+        }
+
+    if check:
+        diff = "".join(
+            difflib.unified_diff(
+                content.splitlines(keepends=True),
+                updated.splitlines(keepends=True),
+                fromfile=f"a/{relative}",
+                tofile=f"b/{relative}",
+            )
         )
+        return {"path": relative, "status": "would update", "diff": diff}
 
-    # Update variable references
-    for old_var, new_var in VARIABLE_MAPPING.items():
-        content = re.sub(f"(\\s+){old_var}:", f"\\1{new_var}:", content)
+    write_if_changed(path, updated)
+    return {"path": relative, "status": "updated", "record": file_record(path, updated)}
 
-    # Remove playbooks property from verifier section
-    content = re.sub(
-        r"verifier:\s+name:\s+ansible\s+playbooks:\s+verify:\s+verify\.ya?ml",
-        "verifier:\n  name: ansible",
-        content,
-    )
 
-    # Write updated content
-    with open(molecule_file, "w") as f:
-        f.write(content)
-
-    print(f"Updated {molecule_file}")
+def update_scenario(scenario, records, check=False, rules_file=RULES_FILE):
+    """Update molecule.yaml and verify.yaml of one scenario"""
+    transformer = get_transformer(str(rules_file))
+    results = []
 
+    molecule_file = find_molecule_file(scenario)
+    if molecule_file is None:
+        print(
+            f"Warning: molecule configuration for {scenario} doesn't exist, skipping..."
+        )
+    else:
+        relative = str(molecule_file.relative_to(PROJECT_ROOT))
+        results.append(
+            update_file(
+                molecule_file,
+                scenario,
+                transformer.molecule,
+                records.get(relative),
+                check,
+            )
+        )
 
-def update_scenario_verify_yaml(scenario):
-    """Update verify.yaml for a scenario to use common templates"""
     verify_file = MOLECULE_DIR / scenario / "verify.yaml"
+    if verify_file.exists():
+        relative = str(verify_file.relative_to(PROJECT_ROOT))
+        results.append(
+            update_file(
+                verify_file,
+                scenario,
+                transformer.verify,
+                records.get(relative),
+                check,
+            )
+        )
 
-    if not verify_file.exists():
-        print(f"Warning: {verify_file} doesn't exist, skipping...")
-        return
-
-    print(f"Updating {verify_file}...")
-
-    # Read current content
-    with open(verify_file, "r") as f:
-        content = f.read()
-
-    # Check if we've already updated this file
-    if "include_tasks: ../shared/templates/verify/common.yaml" in content:
-        print(f"File {verify_file} already updated, skipping...")
-        return
-
-    # Extract the tasks section
-    match = re.search(r"tasks:(.*?)(?:\n\w+:|$)", content, re.DOTALL)
-    if not match:
-        print(f"Warning: Couldn't find tasks section in {verify_file}, skipping...")
-        return
-
-    tasks_section = match.group(1)
-
-    # Create new tasks section with imports
-    new_tasks_section = "\n    # Include common verification tasks\n    - name: Include common verification tasks\n      include_tasks: ../shared/templates/verify/common.yaml\n"
-
-    # Add scenario-specific template if available
-    if os.path.exists(SHARED_DIR / "templates" / "verify" / f"{scenario}.yaml"):
-        new_tasks_section += f"\n    # Include {scenario}-specific verification tasks\n    - name: Include {scenario}-specific verification tasks\n      include_tasks: ../shared/templates/verify/{scenario}.yaml\n"
-
-    new_tasks_section += "\n    # Additional scenario-specific verification tasks"
-
-    # Replace old tasks section with new one
-    updated_content = content.replace(tasks_section, new_tasks_section)
-
-    # Update variable references
-    for old_var, new_var in VARIABLE_MAPPING.items():
-        updated_content = re.sub(f"(\\s+){old_var}:", f"\\1{new_var}:", updated_content)
-
-    # Update boolean conditions
-    updated_content = re.sub(
-        r"(\s+when:\s+)(\w+)(\s+and)", r"\1\2 | bool\3", updated_content
-    )
-    updated_content = re.sub(
-        r"(\s+when:\s+)(\w+)($)", r"\1\2 | bool\3", updated_content
-    )
-
-    # Write updated content
-    with open(verify_file, "w") as f:
-        f.write(updated_content)
-
-    print(f"Updated {verify_file}")
+    return results
 
 
-def rename_molecule_files():
+def rename_molecule_files(check=False):
     """Rename all molecule.yaml files to molecule.yml"""
+    renamed = 0
     for scenario in get_scenarios():
         yaml_file = MOLECULE_DIR / scenario / "molecule.yaml"
         yml_file = MOLECULE_DIR / scenario / "molecule.yml"
 
         if yaml_file.exists() and not yml_file.exists():
+            renamed += 1
+            if check:
+                print(f"Would rename {yaml_file} to {yml_file}")
+                continue
             yaml_file.rename(yml_file)
             print(f"Renamed {yaml_file} to {yml_file}")
+    return renamed
 
 
 def make_script_executable():
     """Make this script and generate_scenario.py executable"""
-    os.chmod(__file__, 0o755)
-
-    generate_script = SHARED_DIR / "scripts" / "generate_scenario.py"
-    if generate_script.exists():
-        os.chmod(generate_script, 0o755)
-        print(f"Made {generate_script} executable")
+    for script in (Path(__file__), SHARED_DIR / "scripts" / "generate_scenario.py"):
+        # Only touch the mode when it actually changes
+        if script.exists() and not os.access(script, os.X_OK):
+            os.chmod(script, 0o755)
+            print(f"Made {script} executable")
 
 
 def main():
-    # Make scripts executable
-    make_script_executable()
+    parser = argparse.ArgumentParser(
+        description="Update all molecule scenarios to the standardized format"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Report the changes as a diff without writing any file",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes, 1 to run serially",
+    )
+    parser.add_argument(
+        "--rules",
+        default=str(RULES_FILE),
+        help="Rules file with the variable mapping",
+    )
+    parser.add_argument(
+        "--no-manifest",
+        action="store_true",
+        help="Process every file, ignoring the content-hash manifest",
+    )
+    args = parser.parse_args()
+
+    if not args.check:
+        # Make scripts executable
+        make_script_executable()
 
     # Rename molecule.yaml to molecule.yml if needed
-    rename_molecule_files()
+    pending = rename_molecule_files(args.check)
 
     # Get all scenarios
     scenarios = get_scenarios()
     print(f"Found {len(scenarios)} scenarios: {', '.join(scenarios)}")
 
-    # Update each scenario
-    for scenario in scenarios:
-        print(f"\nUpdating {scenario} scenario...")
-        update_scenario_molecule_yaml(scenario)
-        update_scenario_verify_yaml(scenario)
+    fingerprint = rules_fingerprint(args.rules)
+    records = {} if args.no_manifest else load_manifest(fingerprint)
+
+    # Update each scenario, in worker processes when there is enough work
+    if args.jobs > 1 and len(scenarios) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [
+                executor.submit(
+                    update_scenario, scenario, records, args.check, args.rules
+                )
+                for scenario in scenarios
+            ]
+            scenario_results = [future.result() for future in futures]
+    else:
+        scenario_results = [
+            update_scenario(scenario, records, args.check, args.rules)
+            for scenario in scenarios
+        ]
+
+    counts = {}
+    files = {}
+    for results in scenario_results:
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if result["status"] == "updated":
+                print(f"Updated {result['path']}")
+            elif result["status"] == "would update":
+                pending += 1
+                sys.stdout.write(result["diff"])
+            if "record" in result:
+                files[result["path"]] = result["record"]
+
+    if not args.check and not args.no_manifest:
+        save_manifest(fingerprint, files)
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\nProcessed {sum(counts.values())} files: {summary or 'none'}")
+    return 1 if args.check and pending else 0
 
 
 if __name__ == "__main__":
-    main()
-    print("\nDone! All scenarios have been updated to use the standardized format.")
+    status = main()
+    if "--check" in sys.argv[1:]:
+        if status == 0:
+            print("\nAll scenarios already use the standardized format.")
+    else:
+        print("\nDone! All scenarios have been updated to use the standardized format.")
+    sys.exit(status)